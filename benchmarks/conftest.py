@@ -0,0 +1,77 @@
+import os
+import uuid
+from types import SimpleNamespace
+
+import nevermined_contracts
+import pytest
+from web3 import EthereumTesterProvider, Web3
+
+from benchmarks.deployment import deploy_artifacts, find_artifacts
+from contracts_lib_py.account import Account
+from contracts_lib_py.contract_handler import ContractHandler
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.web3_provider import Web3Provider
+
+
+def get_artifacts_path():
+    return os.getenv('BENCHMARK_ARTIFACTS_PATH') or nevermined_contracts.get_artifacts_path()
+
+
+@pytest.fixture(scope='session')
+def local_chain(tmp_path_factory):
+    """
+    Deploy the contracts of the artifacts to an in-process eth-tester chain, and point the
+    `Web3Provider` and the `ContractHandler` to it.
+
+    The artifacts are read from `BENCHMARK_ARTIFACTS_PATH`, defaulting to the ones of the
+    `nevermined-contracts` package, for the network `BENCHMARK_ARTIFACTS_NETWORK`, defaulting
+    to the network with the most artifacts.
+    """
+    artifacts = find_artifacts(get_artifacts_path(), os.getenv('BENCHMARK_ARTIFACTS_NETWORK'))
+    if not artifacts:
+        pytest.skip(f'No artifacts with a bytecode in {get_artifacts_path()}, set '
+                    f'BENCHMARK_ARTIFACTS_PATH to the deployed nevermined-contracts artifacts, '
+                    f'see the Benchmarks section of the README.')
+
+    web3 = Web3(EthereumTesterProvider())
+    Web3Provider.set_web3(web3)
+    network_name = Keeper.get_network_name(Web3Provider.get_network_id(web3))
+    artifacts_path = str(tmp_path_factory.mktemp('artifacts'))
+    addresses = deploy_artifacts(web3, artifacts, web3.eth.accounts[0], artifacts_path,
+                                 network_name)
+
+    ContractHandler.artifacts_path = artifacts_path
+    ContractHandler.cache_dir = str(tmp_path_factory.mktemp('cache'))
+    return SimpleNamespace(
+        web3=web3,
+        artifacts_path=artifacts_path,
+        addresses=addresses,
+        abis={name: artifacts[name]['abi'] for name in addresses},
+    )
+
+
+@pytest.fixture(scope='session')
+def keeper(local_chain):
+    return Keeper(local_chain.artifacts_path, web3=local_chain.web3)
+
+
+@pytest.fixture(scope='session')
+def publisher_account(local_chain):
+    return Account(local_chain.web3.eth.accounts[0])
+
+
+@pytest.fixture(scope='session')
+def consumer_account(local_chain):
+    return Account(local_chain.web3.eth.accounts[1])
+
+
+def clear_contract_caches():
+    """Forget the loaded contracts and parsed artifacts, as in a new process."""
+    ContractHandler._contracts.clear()
+    ContractHandler._bound_contracts.clear()
+    ContractHandler._artifact_indexes.clear()
+    ContractHandler._definition_caches.clear()
+
+
+def new_did_seed():
+    return Web3.keccak(text=str(uuid.uuid4()))
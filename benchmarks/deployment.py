@@ -0,0 +1,172 @@
+import glob
+import json
+import os
+import re
+from collections import Counter
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+# contracts initialized by the benchmarks, in order, the others are only deployed
+INITIALIZED_CONTRACTS = (
+    'NeverminedToken',
+    'NFTUpgradeable',
+    'NFT721Upgradeable',
+    'DIDRegistry',
+    'TemplateStoreManager',
+    'ConditionStoreManager',
+    'AgreementStoreManager',
+    'LockPaymentCondition',
+    'AccessCondition',
+    'EscrowPaymentCondition',
+    'AccessTemplate',
+)
+APPROVED_TEMPLATES = ('AccessTemplate',)
+
+# contract addresses of the `initialize` arguments, by argument name
+INITIALIZE_ARGUMENTS = {
+    '_conditionStoreManagerAddress': 'ConditionStoreManager',
+    '_templateStoreManagerAddress': 'TemplateStoreManager',
+    '_agreementStoreManagerAddress': 'AgreementStoreManager',
+    '_didRegistryAddress': 'DIDRegistry',
+    '_accessConditionAddress': 'AccessCondition',
+    '_lockConditionAddress': 'LockPaymentCondition',
+    '_lockPaymentConditionAddress': 'LockPaymentCondition',
+    '_escrowConditionAddress': 'EscrowPaymentCondition',
+    '_escrowPaymentAddress': 'EscrowPaymentCondition',
+    '_tokenAddress': 'NeverminedToken',
+    '_erc1155': 'NFTUpgradeable',
+    '_erc721': 'NFT721Upgradeable',
+    '_ercAddress': 'NFTUpgradeable',
+}
+# the creator of the conditions is the agreement store
+CONTRACT_ARGUMENTS = {
+    ('ConditionStoreManager', '_creator'): 'AgreementStoreManager',
+}
+
+
+def find_artifacts(artifacts_path, network_name=None):
+    """
+    Return the artifacts with a bytecode of a network.
+
+    :param artifacts_path: str path of the `<contract>.<network>.json` artifacts
+    :param network_name: str network of the artifacts, defaults to the network with the most
+        artifacts
+    :return: dict of the artifact dicts by contract name
+    """
+    files = glob.glob(os.path.join(artifacts_path, '*.*.json'))
+    if network_name is None:
+        networks = Counter(os.path.basename(path).split('.')[1] for path in files)
+        if not networks:
+            return {}
+        network_name = networks.most_common(1)[0][0]
+
+    artifacts = {}
+    for path in files:
+        name, network = os.path.basename(path).split('.')[:2]
+        if network.lower() != network_name.lower():
+            continue
+        with open(path) as f:
+            artifact = json.load(f)
+        if artifact.get('bytecode', '0x') not in ('', '0x') and 'abi' in artifact:
+            artifacts[name] = artifact
+    return artifacts
+
+
+def deploy_artifacts(web3, artifacts, owner, output_path, network_name):
+    """
+    Deploy the contracts of the artifacts, initialize the ones used by the benchmarks and
+    write their artifacts with the new addresses.
+
+    :param web3: Web3 instance of the local chain
+    :param artifacts: dict of the artifact dicts by contract name
+    :param owner: hex str address deploying and owning the contracts
+    :param output_path: str directory of the new artifacts
+    :param network_name: str network name of the new artifacts
+    :return: dict of the contract addresses by name
+    """
+    transaction = {'from': owner, 'gas': 12000000}
+    addresses = {}
+    libraries = {name for artifact in artifacts.values()
+                 for name in artifact.get('libraries') or {}}
+    # the libraries are deployed first to be linked in the contracts using them
+    for name, artifact in sorted(artifacts.items(), key=lambda item: item[0] not in libraries):
+        if any(item['type'] == 'constructor' and item['inputs'] for item in artifact['abi']):
+            continue
+        bytecode = _link_bytecode(name, artifact, addresses)
+        if bytecode is None:
+            continue
+        factory = web3.eth.contract(abi=artifact['abi'], bytecode=bytecode)
+        receipt = web3.eth.wait_for_transaction_receipt(
+            factory.constructor().transact(transaction))
+        if receipt.status == 1:
+            addresses[name] = receipt.contractAddress
+
+    for name in INITIALIZED_CONTRACTS:
+        if name not in addresses:
+            continue
+        contract = web3.eth.contract(address=addresses[name], abi=artifacts[name]['abi'])
+        fn_abi = next((item for item in artifacts[name]['abi']
+                       if item['type'] == 'function' and item['name'] == 'initialize'), None)
+        if fn_abi is None:
+            continue
+        args = [_get_initialize_argument(name, item, owner, addresses)
+                for item in fn_abi['inputs']]
+        _transact(web3, contract.functions.initialize(*args), transaction)
+
+    if 'TemplateStoreManager' in addresses:
+        template_manager = web3.eth.contract(address=addresses['TemplateStoreManager'],
+                                             abi=artifacts['TemplateStoreManager']['abi'])
+        for name in APPROVED_TEMPLATES:
+            if name in addresses:
+                _transact(web3, template_manager.functions.proposeTemplate(addresses[name]),
+                          transaction)
+                _transact(web3, template_manager.functions.approveTemplate(addresses[name]),
+                          transaction)
+
+    os.makedirs(output_path, exist_ok=True)
+    for name, address in addresses.items():
+        artifact = dict(artifacts[name], address=address)
+        with open(os.path.join(output_path, f'{name}.{network_name}.json'), 'w') as f:
+            json.dump(artifact, f)
+    return addresses
+
+
+def _link_bytecode(name, artifact, addresses):
+    """
+    Replace the `__$<hash>$__` placeholders of the libraries in the bytecode by their
+    addresses. The artifacts only give the library names, not the hashed source paths, so a
+    contract can only be linked to a single library.
+    """
+    bytecode = artifact['bytecode']
+    placeholders = set(re.findall(r'__\$[0-9a-fA-F]{34}\$__', bytecode))
+    if not placeholders:
+        return bytecode
+    library_names = list(artifact.get('libraries') or {})
+    if len(placeholders) != 1 or len(library_names) != 1 or library_names[0] not in addresses:
+        return None
+    return bytecode.replace(placeholders.pop(), addresses[library_names[0]][2:].lower())
+
+
+def _get_initialize_argument(contract_name, fn_input, owner, addresses):
+    name, abi_type = fn_input['name'], fn_input['type']
+    contract = CONTRACT_ARGUMENTS.get((contract_name, name)) or INITIALIZE_ARGUMENTS.get(name)
+    if contract:
+        return addresses.get(contract, ZERO_ADDRESS)
+    if abi_type == 'address':
+        # `_owner`, `_creator`, `_initialMinter`
+        return owner if name in ('_owner', '_creator', '_initialMinter') else ZERO_ADDRESS
+    if abi_type == 'string':
+        return ''
+    if abi_type == 'bool':
+        return False
+    if abi_type.endswith(']'):
+        return []
+    if abi_type.startswith('bytes'):
+        return b'' if abi_type == 'bytes' else bytes(int(abi_type[5:]))
+    return 0
+
+
+def _transact(web3, contract_function, transaction):
+    receipt = web3.eth.wait_for_transaction_receipt(contract_function.transact(transaction))
+    assert receipt.status == 1, f'{contract_function.fn_name} failed: {receipt}'
+    return receipt
@@ -0,0 +1,71 @@
+import pytest
+from web3 import Web3
+
+from benchmarks.conftest import new_did_seed
+
+PRICE = 10
+
+
+@pytest.fixture(scope='module')
+def asset(keeper, local_chain, publisher_account, consumer_account):
+    manager_abi = local_chain.abis['AgreementStoreManager']
+    escrow_abi = local_chain.abis['EscrowPaymentCondition']
+    if not any(item.get('name') == 'agreementId' for item in manager_abi):
+        pytest.skip('The agreement store of the artifacts does not derive the agreement ids '
+                    'from a seed, the agreement wrappers need nevermined-contracts >= 2.0')
+    if not any(i['name'] == '_returnAddress' for item in escrow_abi
+               if item.get('name') == 'fulfill' for i in item['inputs']):
+        pytest.skip('The escrow condition of the artifacts has no return address, the escrow '
+                    'wrapper needs nevermined-contracts >= 2.0')
+
+    did_seed = new_did_seed()
+    keeper.did_registry.register(did_seed, Web3.toBytes(0), 'http://localhost:5000',
+                                 publisher_account, providers=[publisher_account.address])
+    token = local_chain.web3.eth.contract(address=keeper.token.address,
+                                          abi=local_chain.abis['NeverminedToken'])
+    receipt = local_chain.web3.eth.wait_for_transaction_receipt(
+        token.functions.mint(consumer_account.address, PRICE * 1000).transact(
+            {'from': publisher_account.address}))
+    assert receipt.status == 1
+    return keeper.did_registry.hash_did(did_seed, publisher_account.address)
+
+
+def run_access_flow(keeper, did, publisher_account, consumer_account):
+    """Create an access agreement, lock the payment, grant the access and release the payment."""
+    lock_condition = keeper.lock_payment_condition
+    access_condition = keeper.access_condition
+    escrow_condition = keeper.escrow_payment_condition
+    token_address = keeper.token.address
+    amounts, receivers = [PRICE], [publisher_account.address]
+
+    agreement_id_seed = new_did_seed().hex()
+    agreement_id = keeper.agreement_manager.hash_id(agreement_id_seed, consumer_account.address)
+    access_seed = access_condition.hash_values(did, consumer_account.address)
+    access_id = access_condition.contract.caller.generateId(agreement_id, access_seed)
+    lock_seed = lock_condition.hash_values(did, escrow_condition.address, token_address,
+                                           amounts, receivers)
+    lock_id = lock_condition.contract.caller.generateId(agreement_id, lock_seed)
+    escrow_seed = escrow_condition.hash_values(did, amounts, receivers, consumer_account.address,
+                                               lock_condition.address, token_address, lock_id,
+                                               access_id)
+    escrow_id = escrow_condition.contract.caller.generateId(agreement_id, escrow_seed)
+
+    assert keeper.access_template.create_agreement(
+        agreement_id_seed, did, [access_seed, lock_seed, escrow_seed], [0, 0, 0], [0, 0, 0],
+        consumer_account.address, consumer_account)
+    keeper.token.token_approve(lock_condition.address, PRICE, consumer_account)
+    lock_condition.fulfill(agreement_id, did, escrow_condition.address, token_address, amounts,
+                           receivers, consumer_account)
+    access_condition.fulfill(agreement_id, did, consumer_account.address, publisher_account)
+    escrow_condition.fulfill(agreement_id, did, amounts, receivers, consumer_account.address,
+                             lock_condition.address, token_address, lock_id, access_id,
+                             publisher_account)
+    return escrow_id
+
+
+def test_access_flow(benchmark, keeper, asset, publisher_account, consumer_account):
+    escrow_id = benchmark.pedantic(run_access_flow,
+                                   args=(keeper, asset, publisher_account, consumer_account),
+                                   rounds=10)
+    # fulfilled
+    assert keeper.condition_manager.get_condition_state(escrow_id) == 2
@@ -0,0 +1,25 @@
+import pytest
+from web3 import Web3
+
+from benchmarks.conftest import new_did_seed
+from contracts_lib_py.account import Account
+
+
+def test_register(benchmark, keeper, publisher_account):
+    def setup():
+        return (new_did_seed(), Web3.toBytes(0), 'http://localhost:5000', publisher_account), {}
+
+    assert benchmark.pedantic(keeper.did_registry.register, setup=setup, rounds=20)
+
+
+# a fresh owner per parameter, so it owns exactly `registrations` assets
+@pytest.mark.parametrize('registrations, owner_index', [(10, 2), (100, 3)])
+def test_get_owner_asset_ids(benchmark, keeper, local_chain, registrations, owner_index):
+    owner = Account(local_chain.web3.eth.accounts[owner_index])
+    for _ in range(registrations):
+        keeper.did_registry.register(new_did_seed(), Web3.toBytes(0), 'http://localhost:5000',
+                                     owner)
+
+    asset_ids = benchmark.pedantic(keeper.did_registry.get_owner_asset_ids, args=(owner.address,),
+                                   rounds=5)
+    assert len(asset_ids) == registrations
@@ -0,0 +1,32 @@
+import threading
+
+from web3 import Web3
+
+from benchmarks.conftest import new_did_seed
+from contracts_lib_py.didregistry import DIDRegistry
+from contracts_lib_py.event_listener import EventListener
+
+
+def test_event_listener_latency(benchmark, keeper, publisher_account):
+    """
+    Time from the block of a `DIDAttributeRegistered` event to its listener callback.
+
+    The listener starts at the current block, the default `latest` backfills from genesis.
+    """
+    received = threading.Event()
+
+    def setup():
+        received.clear()
+        did_seed = new_did_seed()
+        did = keeper.did_registry.hash_did(did_seed, publisher_account.address)
+        listener = EventListener(DIDRegistry.CONTRACT_NAME, DIDRegistry.DID_REGISTRY_EVENT_NAME,
+                                 filters={'_did': Web3.toBytes(hexstr=did)},
+                                 from_block=keeper.web3.eth.block_number, web3=keeper.web3)
+        listener.listen_once(lambda event: received.set(), timeout=30)
+        keeper.did_registry.register(did_seed, Web3.toBytes(0), 'http://localhost:5000',
+                                     publisher_account)
+
+    def wait_for_event():
+        return received.wait(30)
+
+    assert benchmark.pedantic(wait_for_event, setup=setup, rounds=10)
@@ -0,0 +1,26 @@
+import pytest
+from web3 import Web3
+
+from contracts_lib_py.utils import generate_multi_value_hash, generate_multi_value_hashes
+
+# the values hashed for an escrow payment condition
+TYPES = ['bytes32', 'address', 'address', 'uint256[]', 'address[]', 'bytes32', 'address']
+ROWS = [
+    [Web3.keccak(i), Web3.toChecksumAddress('0x' + f'{i:040x}'),
+     '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e', [10, 2], [
+         '0x068Ed00cF0441e4829D9784fCBe7b9e26D4BD8d0', '0x1D7B3EC46d3c0b81c2E7d85b62B2abB0b3CB5Bd0'
+     ], Web3.keccak(i + 1), '0x0000000000000000000000000000000000000000']
+    for i in range(1000)
+]
+
+
+def _hash_rows(types, rows):
+    return [generate_multi_value_hash(types, values) for values in rows]
+
+
+@pytest.mark.benchmark(group='multi-value-hash')
+@pytest.mark.parametrize('hash_rows', [_hash_rows, generate_multi_value_hashes],
+                         ids=['per-row', 'batch'])
+def test_multi_value_hashes(benchmark, hash_rows):
+    hashes = benchmark(hash_rows, TYPES, ROWS)
+    assert hashes == _hash_rows(TYPES, ROWS)
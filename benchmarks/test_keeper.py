@@ -0,0 +1,42 @@
+import glob
+import os
+
+import pytest
+
+from benchmarks.conftest import clear_contract_caches
+from contracts_lib_py.contract_handler import ContractHandler
+from contracts_lib_py.keeper import Keeper
+
+
+def _contract_names(local_chain):
+    names = [getattr(Keeper, name).contract_class.CONTRACT_NAME
+             for name in Keeper.CONTRACT_ATTRIBUTES]
+    return [name for name in names if name in local_chain.addresses]
+
+
+def _clear_artifacts_cache():
+    clear_contract_caches()
+    for path in glob.glob(os.path.join(ContractHandler.cache_dir, '*.pickle')):
+        os.remove(path)
+
+
+def test_keeper_cold_start(benchmark, local_chain):
+    def cold_start():
+        return Keeper(local_chain.artifacts_path, web3=local_chain.web3).preload()
+
+    keeper = benchmark.pedantic(cold_start, setup=clear_contract_caches, rounds=10)
+    assert keeper.did_registry.address == local_chain.addresses['DIDRegistry']
+
+
+@pytest.mark.parametrize('cache', ['cold', 'cached'])
+def test_artifact_loading(benchmark, local_chain, cache):
+    names = _contract_names(local_chain)
+
+    def load_artifacts():
+        return [ContractHandler.get_contract_definition(name, local_chain.artifacts_path)
+                for name in names]
+
+    load_artifacts()
+    setup = _clear_artifacts_cache if cache == 'cold' else clear_contract_caches
+    definitions = benchmark.pedantic(load_artifacts, setup=setup, rounds=20)
+    assert [d['address'] for d in definitions] == [local_chain.addresses[n] for n in names]
@@ -4,3 +4,4 @@ from .didregistry import DIDRegistry
 from .dispenser import Dispenser
 from .keeper import Keeper
 from .token import Token
+from .async_keeper import AsyncKeeper
@@ -0,0 +1,121 @@
+import logging
+import threading
+
+import lru
+from web3 import Web3
+
+from contracts_lib_py.event_filter import EventFilter
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+_deployment_blocks = {}
+_deployment_blocks_lock = threading.Lock()
+
+
+def find_deployment_block(address, web3=None):
+    """
+    Return the block a contract was deployed at, searching the first block where the address
+    has code. The result is cached per chain id and address.
+
+    Clients that do not keep the state of old blocks cannot answer the search, in which case
+    0 is returned.
+
+    :param address: hex str contract address
+    :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+    :return: int block number
+    """
+    web3 = web3 or Web3Provider.get_web3()
+    address = Web3.toChecksumAddress(address)
+    key = (Web3Provider.get_chain_id(web3), address)
+    with _deployment_blocks_lock:
+        if key in _deployment_blocks:
+            return _deployment_blocks[key]
+
+    low, high = 0, web3.eth.block_number
+    try:
+        if not web3.eth.get_code(address, high):
+            return 0
+        while low < high:
+            middle = (low + high) // 2
+            if web3.eth.get_code(address, middle):
+                high = middle
+            else:
+                low = middle + 1
+    except ValueError as e:
+        logger.debug(f'Could not search the deployment block of {address}: {e}')
+        low = 0
+
+    with _deployment_blocks_lock:
+        _deployment_blocks[key] = low
+    return low
+
+
+class AgreementLookup:
+    """
+    Resolve the `AgreementCreated` events of agreements by id.
+
+    The agreement id is an indexed argument of the event, so the logs are queried with a
+    topic filter on the ids, from the block the template was deployed at. Several ids of the
+    same template are resolved with one query. Agreements cannot change once created, so the
+    events found are kept in an LRU cache.
+    """
+    CACHE_SIZE = 1024
+
+    def __init__(self, cache_size=None, web3=None):
+        """
+
+        :param cache_size: int number of agreement events kept
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+        """
+        self._web3 = web3 or Web3Provider.get_web3()
+        self._cache = lru.LRU(cache_size or self.CACHE_SIZE)
+        self._lock = threading.Lock()
+
+    def get_agreement_created(self, template, agreement_id):
+        """
+        Return the `AgreementCreated` event of an agreement.
+
+        :param template: TemplateBase of the agreement
+        :param agreement_id: id of the agreement, hex str
+        :return: event log, or None if the agreement was not found
+        """
+        return self.get_agreements_created(template, [agreement_id])[0]
+
+    def get_agreements_created(self, template, agreement_ids):
+        """
+        Return the `AgreementCreated` events of several agreements created with the same
+        template, querying the logs of the missing ones at once.
+
+        :param template: TemplateBase of the agreements
+        :param agreement_ids: list of agreement ids, hex str
+        :return: list of event logs, None for the agreements not found
+        """
+        keys = [Web3.toHex(Web3.toBytes(hexstr=agreement_id)) for agreement_id in agreement_ids]
+        with self._lock:
+            found = {key: self._cache[key] for key in keys if self._cache.has_key(key)}
+
+        missing = sorted(set(keys) - set(found))
+        if missing:
+            event = getattr(template.events, template.AGREEMENT_CREATED_EVENT)
+            event_filter = EventFilter(
+                template.AGREEMENT_CREATED_EVENT,
+                event,
+                {'_agreementId': [Web3.toBytes(hexstr=key) for key in missing]},
+                from_block=find_deployment_block(template.address, self._web3),
+                to_block='latest'
+            )
+            logs = event_filter.get_entries_in_range(
+                event_filter.cursor, self._web3.eth.block_number)
+            with self._lock:
+                for log in logs:
+                    key = Web3.toHex(log.args._agreementId)
+                    found[key] = log
+                    self._cache[key] = log
+
+        return [found.get(key) for key in keys]
+
+    def clear(self):
+        """Drop the cached agreement events."""
+        with self._lock:
+            self._cache.clear()
@@ -3,6 +3,7 @@ from collections import namedtuple
 from eth_utils import add_0x_prefix
 
 from contracts_lib_py import ContractBase
+from contracts_lib_py.agreements.agreement_lookup import AgreementLookup
 
 AgreementValues = namedtuple(
     'AgreementValues',
@@ -13,6 +14,7 @@ AgreementValues = namedtuple(
 class AgreementStoreManager(ContractBase):
     """Class representing the AgreementStoreManager contract."""
     CONTRACT_NAME = 'AgreementStoreManager'
+    _agreement_lookup = None
 
     def create_agreement(self, agreement_id, did, condition_types, condition_ids, time_locks,
                          time_outs):
@@ -54,9 +56,50 @@ class AgreementStoreManager(ContractBase):
         template = self.contract.caller.getAgreementTemplate(agreement_id)
         if template not in self.templates:
             raise Exception(f'Template with address "{template}" does not exist.')
-        event = self.templates[template].subscribe_agreement_created(
-            agreement_id, 15, None, (), wait=True, from_block=0
-        )
+        event = self.agreement_lookup.get_agreement_created(self.templates[template], agreement_id)
+        if event is None:
+            # the client may not return the logs of the latest block yet, wait for the event
+            event = self.templates[template].subscribe_agreement_created(
+                agreement_id, 15, None, (), wait=True, from_block=0
+            )
+        return self._agreement_values(template, event)
+
+    def get_agreements(self, agreement_ids):
+        """
+        Retrieve the agreements of several agreement ids, resolving the templates with a
+        multicall and the events of each template with one query.
+
+        :param agreement_ids: list of agreement ids, hex str
+        :return: list of the agreement attributes, None for the agreements not found
+        """
+        agreement_ids = list(agreement_ids)
+        templates = self.call_batch('getAgreementTemplate', [(_id,) for _id in agreement_ids])
+        ids_by_template = {}
+        agreements = {}
+        for agreement_id, template in zip(agreement_ids, templates):
+            if template == self.ZERO_ADDRESS:
+                # the agreement store has no agreement with this id
+                agreements[agreement_id] = None
+                continue
+            if template not in self.templates:
+                raise Exception(f'Template with address "{template}" does not exist.')
+            ids_by_template.setdefault(template, []).append(agreement_id)
+
+        for template, ids in ids_by_template.items():
+            events = self.agreement_lookup.get_agreements_created(self.templates[template], ids)
+            for agreement_id, event in zip(ids, events):
+                agreements[agreement_id] = \
+                    self._agreement_values(template, event) if event else None
+        return [agreements[agreement_id] for agreement_id in agreement_ids]
+
+    @property
+    def agreement_lookup(self):
+        if self._agreement_lookup is None:
+            self._agreement_lookup = AgreementLookup(web3=self.web3)
+        return self._agreement_lookup
+
+    @staticmethod
+    def _agreement_values(template, event):
         agreement = event.args
         did = add_0x_prefix(agreement._did.hex())
         cond_ids = [add_0x_prefix(_id.hex()) for _id in agreement._conditionIds]
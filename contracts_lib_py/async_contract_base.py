@@ -0,0 +1,165 @@
+"""
+    Async Keeper Contract Base
+
+    Asyncio mirror of `ContractBase` used by `AsyncKeeper`.
+"""
+import asyncio
+import logging
+
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+
+from contracts_lib_py.fee_oracle import get_fee_oracle
+from contracts_lib_py.nonce_manager import NonceManager
+from contracts_lib_py.wallet import Wallet
+from contracts_lib_py.web3.contract import decode_function_output
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger('keeper')
+
+
+class AsyncContractBase(object):
+    """
+    Asyncio counterpart of a `ContractBase` instance.
+
+    The synchronous wrapper is only used for its contract ABI and address: calls are encoded
+    and decoded locally and every request to the ethereum client goes through the asyncio
+    web3 instance, so a single event loop can drive many calls concurrently.
+    """
+
+    def __init__(self, contract_base, web3=None):
+        """
+
+        :param contract_base: ContractBase instance to mirror
+        :param web3: asyncio Web3 instance, defaults to `Web3Provider.get_async_web3()`
+        """
+        self.contract_base = contract_base
+        self.contract = contract_base.contract
+        self.web3 = web3 or Web3Provider.get_async_web3()
+
+    @property
+    def name(self):
+        return self.contract_base.name
+
+    @property
+    def address(self):
+        return self.contract.address
+
+    async def call(self, fn_name, *args, block_identifier='latest'):
+        """
+        Call a read-only smart contract function.
+
+        :param fn_name: str the smart contract function name
+        :param args: arguments to pass to the function
+        :param block_identifier: block number or tag to read at
+        :return: the decoded result of the function
+        """
+        contract_fn = getattr(self.contract.functions, fn_name)(*args)
+        return_data = await self.web3.eth.call(
+            {'to': self.address, 'data': contract_fn._encode_transaction_data()},
+            block_identifier
+        )
+        return decode_function_output(self.web3.codec, contract_fn, return_data)
+
+    async def send_transaction(self, fn_name, fn_args, transact=None):
+        """
+        Send a transaction to a smart contract function. Mirrors `ContractBase.send_transaction`:
+        the transaction is signed locally when `passphrase` and `keyfile` are given in
+        `transact`, otherwise it is sent with `eth_sendTransaction`.
+
+        :param fn_name: str the smart contract function name
+        :param fn_args: tuple arguments to pass to function above
+        :param transact: dict arguments for the transaction such as from, gas, etc.
+        :return: transaction hash, HexBytes
+        """
+        tx = dict(transact or {})
+        passphrase = tx.pop('passphrase', None)
+        key_file = tx.pop('keyfile', None)
+
+        contract_fn = getattr(self.contract.functions, fn_name)(*fn_args)
+        tx['to'] = self.address
+        tx['data'] = contract_fn._encode_transaction_data()
+        if 'chainId' not in tx:
+            tx['chainId'] = await self.web3.eth.chain_id
+        if 'gas' not in tx:
+            tx['gas'] = await self.web3.eth.estimate_gas(tx)
+
+        if not (passphrase and key_file):
+            return await self.web3.eth.send_transaction(tx)
+
+        nonce_allocated = 'nonce' not in tx
+        await self._set_nonce_and_fees(tx)
+        wallet = Wallet(self.contract_base.web3, key_file, passphrase)
+        try:
+            # decrypting the keyfile is CPU bound, keep it out of the event loop
+            raw_tx = await asyncio.get_running_loop().run_in_executor(
+                None, wallet.sign_prepared_tx, tx)
+        except Exception:
+            if nonce_allocated:
+                Wallet.nonce_manager.release(self.contract_base.web3, tx['from'], tx['nonce'])
+            raise
+
+        try:
+            tx_hash = await self.web3.eth.send_raw_transaction(raw_tx)
+        except ValueError as e:
+            if NonceManager.is_known_transaction_error(e):
+                # the client already has this exact transaction, it must not be sent again
+                tx_hash = Web3.keccak(raw_tx)
+            else:
+                await self._reclaim_nonce(tx, nonce_allocated, e)
+                raise
+        except Exception as e:
+            await self._reclaim_nonce(tx, nonce_allocated, e)
+            raise
+
+        if nonce_allocated:
+            Wallet.nonce_manager.track(self.contract_base.web3, tx['from'], tx['nonce'], tx_hash)
+        return tx_hash
+
+    async def _reclaim_nonce(self, tx, nonce_allocated, error):
+        # a nonce allocated for a transaction that was not broadcast must not leave a gap
+        if not nonce_allocated:
+            return
+        if isinstance(error, ValueError) and NonceManager.is_nonce_error(error):
+            # like the synchronous path, the counter restarts from the chain and the nonces
+            # of the transactions still in flight stay reserved
+            await Wallet.nonce_manager.async_resync(self.web3, tx['from'], tx['chainId'])
+        else:
+            Wallet.nonce_manager.release(self.contract_base.web3, tx['from'], tx['nonce'])
+
+    async def _set_nonce_and_fees(self, tx):
+        if 'nonce' not in tx:
+            tx['nonce'] = await Wallet.nonce_manager.async_next_nonce(
+                self.web3, tx['from'], tx['chainId'])
+        if 'gasPrice' in tx or 'maxFeePerGas' in tx:
+            return
+        # the fees come from the same oracle, and strategy, as the synchronous transactions of
+        # the network, refreshing its fee data may query the client so it is kept out of the
+        # event loop
+        oracle = get_fee_oracle(self.contract_base.web3)
+        tx.update(await asyncio.get_running_loop().run_in_executor(None, oracle.get_fees))
+
+    async def get_tx_receipt(self, tx_hash, timeout=20):
+        """
+        Get the receipt of a tx.
+
+        :param tx_hash: hash of the transaction
+        :param timeout: float seconds to wait for the receipt
+        :return: Tx receipt
+        """
+        try:
+            receipt = await self.web3.eth.wait_for_transaction_receipt(
+                tx_hash, timeout=timeout, poll_latency=0.5)
+            Wallet.nonce_manager.report_receipt(receipt)
+            return receipt
+        except TimeExhausted:
+            logger.info('Waiting for transaction receipt timed out.')
+        except ValueError as e:
+            logger.error(f'Waiting for transaction receipt failed: {e}')
+
+    async def is_tx_successful(self, tx_hash):
+        receipt = await self.get_tx_receipt(tx_hash)
+        return bool(receipt and receipt.status == 1)
+
+    def __str__(self):
+        return f'{self.name} at {self.address}'
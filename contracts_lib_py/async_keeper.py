@@ -0,0 +1,76 @@
+import logging
+
+from contracts_lib_py.async_contract_base import AsyncContractBase
+from contracts_lib_py.contract_base import ContractBase
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.web3.request import close_async_sessions
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncKeeper(object):
+    """
+    Asyncio counterpart of `Keeper`.
+
+    Contract wrappers are exposed with the same attribute names as in `Keeper` and provide
+    `async` mirrors of the network calls, e.g.:
+
+        keeper = AsyncKeeper()
+        owner = await keeper.did_registry.call('getDIDOwner', did)
+        tx_hash = await keeper.token.send_transaction('approve', (spender, amount), transact)
+        receipt = await keeper.token.get_tx_receipt(tx_hash)
+    """
+
+    def __init__(self, keeper=None, web3=None):
+        """
+
+        :param keeper: Keeper instance providing the contract ABIs and addresses,
+            defaults to `Keeper.get_instance()`
+        :param web3: asyncio Web3 instance, defaults to `Web3Provider.get_async_web3()`
+        """
+        self.keeper = keeper or Keeper.get_instance()
+        self.web3 = web3 or Web3Provider.get_async_web3()
+        self._contracts = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name not in self._contracts:
+            contract = getattr(self.keeper, name)
+            if not isinstance(contract, ContractBase):
+                raise AttributeError(f'{name} is not a keeper contract.')
+            self._contracts[name] = AsyncContractBase(contract, self.web3)
+        return self._contracts[name]
+
+    def get_contract(self, contract_name):
+        """
+        Return the async wrapper of a contract by its contract name.
+
+        :param contract_name: str
+        :return: AsyncContractBase or None
+        """
+        contract = self.keeper.get_contract(contract_name)
+        return AsyncContractBase(contract, self.web3) if contract else None
+
+    async def get_network_id(self):
+        """
+        Return the ethereum network id.
+
+        :return: Network id, int
+        """
+        return int(await self.web3.net.version)
+
+    async def get_ether_balance(self, address):
+        """
+        Get balance of an ethereum address.
+
+        :param address: address, bytes32
+        :return: balance, int
+        """
+        return await self.web3.eth.get_balance(address, block_identifier='latest')
+
+    @staticmethod
+    async def close():
+        """Close the pooled connections opened from the running event loop."""
+        await close_async_sessions()
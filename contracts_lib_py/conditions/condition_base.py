@@ -1,6 +1,10 @@
 import logging
 
 from web3 import Web3
+from web3._utils.abi import abi_to_signature, get_abi_input_types, map_abi_data, \
+    merge_args_and_kwargs
+from web3._utils.contracts import find_matching_fn_abi
+from web3._utils.normalizers import abi_address_to_hex, abi_bytes_to_bytes, abi_string_to_text
 
 from contracts_lib_py import ContractBase, utils
 from contracts_lib_py.event_filter import EventFilter
@@ -10,9 +14,28 @@ logger = logging.getLogger('accessTemplate')
 
 
 class ConditionBase(ContractBase):
-    """Base class for all the Condition contract objects."""
+    """
+    Base class for all the Condition contract objects.
+
+    The pure `hashValues` functions of the conditions are computed locally, encoding the
+    values as the contracts do. The first local hash of every function is checked against
+    the contract, if they differ the function is always called on-chain.
+    """
     FULFILLED_EVENT = 'Fulfilled'
     ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+    local_hash_values = True
+    # (contract address, function signature) -> True if the local hash matches the contract
+    _verified_hash_functions = {}
+
+    @staticmethod
+    def enable_local_hash_values():
+        """Compute the pure `hashValues` functions of the conditions locally."""
+        ConditionBase.local_hash_values = True
+
+    @staticmethod
+    def disable_local_hash_values():
+        """Call the `hashValues` functions of the conditions on-chain."""
+        ConditionBase.local_hash_values = False
 
     def generate_id(self, agreement_id, types, values):
         """
@@ -29,6 +52,23 @@ class ConditionBase(ContractBase):
             [agreement_id, int(self.address, 16), values_hash.hex()]
         )
 
+    def generate_ids(self, agreement_ids, types, values_list):
+        """
+        Generate the ids of the condition for many agreements at once.
+
+        :param agreement_ids: list of agreement ids, hex str
+        :param types: list of types
+        :param values_list: list of the lists of values of every agreement
+        :return: list of ids, bytes
+        """
+        values_hashes = utils.generate_multi_value_hashes(types, values_list)
+        address = int(self.address, 16)
+        return utils.generate_multi_value_hashes(
+            ['bytes32', 'uint256', 'bytes32'],
+            [(agreement_id, address, values_hash)
+             for agreement_id, values_hash in zip(agreement_ids, values_hashes)]
+        )
+
     def _fulfill(self, *args, method='fulfill', **kwargs):
         """
         Fulfill the condition.
@@ -53,6 +93,68 @@ class ConditionBase(ContractBase):
         tx_hash = self.contract.caller.abortByTimeOut(condition_id)
         return self.is_tx_successful(tx_hash)
 
+    def compute_hash_values(self, fn_name, *args, **kwargs):
+        """
+        Compute the hash of a pure `hashValues` function of the contract locally.
+
+        :param fn_name: name of the function, e.g. 'hashValues'
+        :param args: values of the function
+        :param kwargs: values of the function by name
+        :return: hash, bytes
+        """
+        fn_abi = self._get_hash_function_abi(fn_name, args, kwargs)
+        return self._compute_hash_values(fn_name, fn_abi, args, kwargs)
+
+    def _compute_hash_values(self, fn_name, fn_abi, args, kwargs):
+        types = get_abi_input_types(fn_abi)
+        values = map_abi_data(
+            [abi_address_to_hex, abi_bytes_to_bytes, abi_string_to_text],
+            types,
+            merge_args_and_kwargs(fn_abi, args, kwargs)
+        )
+        types, values = self._hash_values_layout(fn_name, list(types), list(values))
+        return bytes(Web3.keccak(self.contract.web3.codec.encode_abi(types, values)))
+
+    def _hash_values_layout(self, fn_name, types, values):
+        """
+        Return the types and values the contract encodes to hash the values of a function.
+        Conditions that do not hash `abi.encode` of the function arguments override it.
+
+        :param fn_name: name of the function
+        :param types: list of solidity types of the function arguments
+        :param values: list of normalized values
+        :return: tuple of the list of types and the list of values
+        """
+        return types, values
+
+    def _get_hash_function_abi(self, fn_name, args, kwargs):
+        return find_matching_fn_abi(self.contract.abi, self.contract.web3.codec, fn_name, args,
+                                    kwargs)
+
+    def _call_hash_function(self, fn_name, *args, **kwargs):
+        if not ConditionBase.local_hash_values:
+            return getattr(self.contract.caller, fn_name)(*args, **kwargs)
+
+        fn_abi = self._get_hash_function_abi(fn_name, args, kwargs)
+        if fn_abi.get('stateMutability') != 'pure':
+            # the hash depends on the contract state
+            return getattr(self.contract.caller, fn_name)(*args, **kwargs)
+
+        key = (self.address, abi_to_signature(fn_abi))
+        verified = ConditionBase._verified_hash_functions.get(key)
+        if verified is None:
+            local_hash = self._compute_hash_values(fn_name, fn_abi, args, kwargs)
+            contract_hash = getattr(self.contract.caller, fn_name)(*args, **kwargs)
+            verified = local_hash == contract_hash
+            if not verified:
+                logger.warning(f'The local hash of {self.name}.{key[1]} does not match the '
+                               f'contract, calling the contract instead.')
+            ConditionBase._verified_hash_functions[key] = verified
+            return contract_hash
+        if not verified:
+            return getattr(self.contract.caller, fn_name)(*args, **kwargs)
+        return self._compute_hash_values(fn_name, fn_abi, args, kwargs)
+
     def _hash_values(self, *args, **kwargs):
         """
 
@@ -60,7 +162,7 @@ class ConditionBase(ContractBase):
         :param kwargs:
         :return:
         """
-        return self.contract.caller.hashValues(*args, **kwargs)
+        return self._call_hash_function('hashValues', *args, **kwargs)
 
     def _hash_values_multi(self, *args, **kwargs):
         """
@@ -69,7 +171,7 @@ class ConditionBase(ContractBase):
         :param kwargs:
         :return:
         """
-        return self.contract.caller.hashValuesMulti(*args, **kwargs)
+        return self._call_hash_function('hashValuesMulti', *args, **kwargs)
 
     def _hash_values_marked(self, *args, **kwargs):
         """
@@ -78,7 +180,7 @@ class ConditionBase(ContractBase):
         :param kwargs:
         :return:
         """
-        return self.contract.caller.hashValuesMarked(*args, **kwargs)
+        return self._call_hash_function('hashValuesMarked', *args, **kwargs)
 
     def _get_nft_default_address(self, *args, **kwargs):
         """
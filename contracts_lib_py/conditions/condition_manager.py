@@ -24,6 +24,16 @@ class ConditionStoreManager(ContractBase):
 
         return None
 
+    def get_conditions(self, condition_ids):
+        """Retrieve the conditions for a list of condition ids in a single request.
+
+        :param condition_ids: list of condition ids, str
+        :return: list of ConditionValues
+        """
+        conditions = self.call_batch('getCondition', [(_id,) for _id in condition_ids])
+        return [ConditionValues(*condition) if condition and len(condition) == 5 else None
+                for condition in conditions]
+
     def get_condition_state(self, condition_id):
         """Retrieve the condition state.
 
@@ -32,6 +42,14 @@ class ConditionStoreManager(ContractBase):
         """
         return self.contract.caller.getConditionState(condition_id)
 
+    def get_condition_states(self, condition_ids):
+        """Retrieve the state of a list of conditions in a single request.
+
+        :param condition_ids: list of condition ids, str
+        :return: list of condition states
+        """
+        return self.call_batch('getConditionState', [(_id,) for _id in condition_ids])
+
     def get_num_condition(self):
         """
         Return the size of the Conditions list.
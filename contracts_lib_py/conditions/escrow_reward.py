@@ -110,3 +110,8 @@ class EscrowPaymentCondition(ConditionBase):
             release_condition_id
         )
 
+    def _hash_values_layout(self, fn_name, types, values):
+        if fn_name == 'hashValues' and types[-1] == 'bytes32':
+            # the release condition is hashed as a list of release conditions
+            return types[:-1] + ['bytes32[]'], values[:-1] + [[values[-1]]]
+        return types, values
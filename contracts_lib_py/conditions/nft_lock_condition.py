@@ -1,8 +1,11 @@
+from web3 import Web3
+
 from contracts_lib_py.conditions.condition_base import ConditionBase
 
 class NFTLockCondition(ConditionBase):
     """Class representing the NFTLockCondition contract."""
     CONTRACT_NAME = 'NFTLockCondition'
+    CONDITION_TYPE = Web3.keccak(text='NFTLockCondition')
 
     def fulfill(self, agreement_id, document_id, reward_address, amount, account):
         """
@@ -54,3 +57,12 @@ class NFTLockCondition(ConditionBase):
 
     def hash_values_marked(self, document_id, reward_address, amount, receiver, token_address):
         return self._hash_values_marked(document_id, reward_address, amount, receiver, token_address)
+
+    def _hash_values_layout(self, fn_name, types, values):
+        if fn_name == 'hashValues' and types == ['bytes32', 'address', 'uint256', 'address']:
+            # the values are hashed as marked with the zero address as receiver
+            types, values = types[:3] + ['address'] + types[3:], \
+                values[:3] + [self.ZERO_ADDRESS] + values[3:]
+        if types == ['bytes32', 'address', 'uint256', 'address', 'address']:
+            return ['bytes32'] + types, [bytes(self.CONDITION_TYPE)] + values
+        return types, values
@@ -1,5 +1,4 @@
 from contracts_lib_py.conditions.condition_base import ConditionBase
-from contracts_lib_py.web3_provider import Web3Provider
 
 class TransferNFT721Condition(ConditionBase):
     """Class representing the TransferNFTCondition contract."""
@@ -53,7 +52,7 @@ class TransferNFT721Condition(ConditionBase):
         """
 
         if duration > 0:
-            duration = duration + Web3Provider.get_web3().eth.get_block_number()
+            duration = duration + self.web3.eth.get_block_number()
         return self._fulfill(
             agreement_id,
             did,
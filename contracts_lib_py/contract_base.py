@@ -9,6 +9,9 @@ import logging
 from web3 import Web3
 from web3._utils.threads import Timeout
 
+from contracts_lib_py.multicall import get_multicall
+from contracts_lib_py.tx_pipeline import get_tx_pipeline
+from contracts_lib_py.wallet import Wallet
 from contracts_lib_py.web3.contract import CustomContractFunction
 from contracts_lib_py.web3_provider import Web3Provider
 
@@ -57,6 +60,11 @@ class ContractBase(object):
         """
         return self._contract.address
 
+    @property
+    def web3(self):
+        """Return the web3 instance of the network the contract is loaded from."""
+        return self._contract.web3
+
     @property
     def events(self):
         """Expose the underlying contract's events.
@@ -96,15 +104,17 @@ class ContractBase(object):
         return Web3.toChecksumAddress(token_address)
 
     @staticmethod
-    def get_tx_receipt(tx_hash):
+    def get_tx_receipt(tx_hash, web3=None):
         """
         Get the receipt of a tx.
 
         :param tx_hash: hash of the transaction
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         :return: Tx receipt
         """
+        web3 = web3 or Web3Provider.get_web3()
         try:
-            tx_receipt = Web3Provider.get_web3().eth.waitForTransactionReceipt(tx_hash, timeout=20)
+            tx_receipt = web3.eth.waitForTransactionReceipt(tx_hash, timeout=20)
         except Timeout:
             logger.info('Waiting for transaction receipt timed out.')
             return
@@ -112,17 +122,20 @@ class ContractBase(object):
             logger.error(f'Waiting for transaction receipt failed: {e}')
             return
 
+        Wallet.nonce_manager.report_receipt(tx_receipt)
+        if CustomContractFunction.gas_estimate_cache is not None:
+            CustomContractFunction.gas_estimate_cache.report_receipt(tx_receipt)
         return tx_receipt
 
     def is_tx_successful(self, tx_hash, get_revert_message=False):
-        receipt = self.get_tx_receipt(tx_hash)
+        receipt = self.get_tx_receipt(tx_hash, self.web3)
         is_successful = bool(receipt and receipt.status == 1)
         if is_successful:
             return True
         else:
             if get_revert_message:
                 try:
-                    tx = Web3Provider.get_web3().eth.get_transaction(tx_hash)
+                    tx = self.web3.eth.get_transaction(tx_hash)
                     replay_tx = {
                         'to': tx['to'],
                         'from': tx['from'],
@@ -130,7 +143,7 @@ class ContractBase(object):
                         'data': tx['input'],
                     }
     
-                    Web3Provider.get_web3().eth.call(replay_tx, tx.blockNumber - 1)                
+                    self.web3.eth.call(replay_tx, tx.blockNumber - 1)                
                 except Exception as e:                
                     logger.error(e)
         return False
@@ -159,7 +172,8 @@ class ContractBase(object):
             args,
             filters=event_filter,
             from_block=from_block,
-            to_block=to_block
+            to_block=to_block,
+            web3=self.web3
         ).listen_once(
             callback,
             timeout_callback=timeout_callback,
@@ -181,9 +195,39 @@ class ContractBase(object):
             contract_fn
         )
         if transact is not None and 'chainId' not in transact:
-            transact['chainId'] = int(Web3Provider.get_web3().net.version)
+            transact['chainId'] = Web3Provider.get_chain_id(self.web3, verify=True)
         return contract_function.transact(transact)
 
+    def submit_transaction(self, fn_name, fn_args, transact=None, timeout=None):
+        """Send a transaction like `send_transaction` without waiting for it to be mined.
+        The receipt is tracked by the shared `TransactionPipeline`, together with the other
+        pending transactions.
+
+        :param fn_name: str the smart contract function name
+        :param fn_args: tuple arguments to pass to function above
+        :param transact: dict arguments for the transaction such as from, gas, etc.
+        :param timeout: float seconds to wait for the receipt
+        :return: Future resolving to the transaction receipt, or failing with
+            `TransactionReverted` or `TransactionTimeout`
+        """
+        tx_hash = self.send_transaction(fn_name, fn_args, transact)
+        return get_tx_pipeline(self.web3).track(tx_hash, timeout)
+
+    def call_batch(self, fn_name, args_list, allow_failure=False):
+        """Call a read-only smart contract function once per entry of `args_list`,
+        resolving all the calls together using `Multicall`.
+
+        :param fn_name: str the smart contract function name
+        :param args_list: list of tuples with the arguments of each call
+        :param allow_failure: bool if True failed calls return None instead of raising
+        :return: list of results in the same order as `args_list`
+        """
+        contract_fn = getattr(self.contract.functions, fn_name)
+        return get_multicall(self.web3).call(
+            [contract_fn(*args) for args in args_list],
+            allow_failure=allow_failure
+        )
+
     def get_event_argument_names(self, event_name):
         event = getattr(self._contract.events, event_name, None)
         if event:
@@ -1,6 +1,10 @@
+import hashlib
 import json
 import logging
 import os
+import pickle
+import threading
+import weakref
 
 from web3 import Web3
 
@@ -17,119 +21,198 @@ class ContractHandler(object):
     Retrieval of deployed keeper contracts must use this `ContractHandler`.
     Example:
         contract = ContractHandler.get('ServiceExecutionAgreement')
+
+    The loaded contracts are kept by chain id and contract name, and bound to the web3
+    instance they are requested with, `Web3Provider.get_web3()` unless another one is given.
+    Threads working with different networks, e.g. through `Web3Provider.use_web3()`, get the
+    contracts of their own network while sharing the parsed artifacts.
+
+    The artifact files are looked up in an index of the artifacts directory, and the address,
+    abi and version of the loaded contracts are kept in a pickle cache in `cache_dir`, so new
+    processes do not parse the artifacts again until they change. Set `cache_dir` to None to
+    disable the cache.
     """
     _contracts = dict()
+    _bound_contracts = weakref.WeakKeyDictionary()
     artifacts_path = None
+    cache_dir = os.environ.get(
+        'CONTRACTS_LIB_CACHE_DIR',
+        os.path.join(os.path.expanduser('~'), '.cache', 'contracts-lib-py')
+    )
+    _artifact_indexes = dict()
+    _definition_caches = dict()
+    _names_by_address = (0, dict())
+    _lock = threading.RLock()
 
     @staticmethod
-    def get(name):
+    def get(name, web3=None):
         """
         Return the Contract instance for a given name.
 
         :param name: Contract name, str
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         :return: Contract instance
         """
-        return (ContractHandler._contracts.get(name) or ContractHandler._load(name))[0]
+        web3 = web3 or Web3Provider.get_web3()
+        key = (Web3Provider.get_chain_id(web3), name)
+        contract = (ContractHandler._contracts.get(key) or ContractHandler._load(name, web3))[0]
+        return ContractHandler._bind(name, contract, web3)
 
     @staticmethod
-    def get_by_address(address, abi, name):
+    def get_by_address(address, abi, name, web3=None):
         """
         Return the Contract instance for a given name.
 
         :param name: Contract name, str
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         :return: Contract instance
         """
-        return (ContractHandler._contracts.get(name) or ContractHandler._load_from_address(address, abi, name))[0]
+        web3 = web3 or Web3Provider.get_web3()
+        key = (Web3Provider.get_chain_id(web3), name)
+        contract = (ContractHandler._contracts.get(key)
+                    or ContractHandler._load_from_address(address, abi, name, web3))[0]
+        return ContractHandler._bind(name, contract, web3)
 
     @staticmethod
-    def get_contract_version(name):
+    def get_contract_version(name, web3=None):
         """
         Return the version of the contract in use.
 
         :param name: name of the contract
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         :return: str version
         """
-        return ContractHandler._contracts.get(name)[1]
+        web3 = web3 or Web3Provider.get_web3()
+        return ContractHandler._contracts.get((Web3Provider.get_chain_id(web3), name))[1]
 
     @staticmethod
-    def set(name, contract):
+    def set(name, contract, web3=None):
         """
         Set a Contract instance for a contract name.
 
         :param name: Contract name, str
-        :param contract: Contract instance
+        :param contract: tuple of the Contract instance and its version
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         """
-        ContractHandler._contracts[name] = contract
+        web3 = web3 or Web3Provider.get_web3()
+        with ContractHandler._lock:
+            ContractHandler._contracts[(Web3Provider.get_chain_id(web3), name)] = contract
 
     @staticmethod
-    def has(name):
+    def has(name, web3=None):
         """
         Check if a contract is the ContractHandler contracts.
 
         :param name: Contract name, str
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         :return: True if the contract is there, bool
         """
-        return name in ContractHandler._contracts
+        web3 = web3 or Web3Provider.get_web3()
+        return (Web3Provider.get_chain_id(web3), name) in ContractHandler._contracts
+
+    @staticmethod
+    def get_name_by_address(address):
+        """
+        Return the name of a loaded contract from its address.
+
+        :param address: hex str address of the contract
+        :return: str name, or None if no loaded contract has this address
+        """
+        size, names = ContractHandler._names_by_address
+        if size != len(ContractHandler._contracts):
+            with ContractHandler._lock:
+                names = {contract.address.lower(): name
+                         for (_, name), (contract, _) in ContractHandler._contracts.items()}
+                ContractHandler._names_by_address = (len(ContractHandler._contracts), names)
+        return names.get(address.lower())
 
     @staticmethod
-    def _load(contract_name):
+    def _load(contract_name, web3=None):
         """Retrieve the contract instance for `contract_name` that represent the smart
         contract in the keeper network.
 
         :param contract_name: str name of the solidity keeper contract without the network name.
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         :return: web3.eth.Contract instance
         """
         assert ContractHandler.artifacts_path is not None, 'artifacts_path should be already set.'
-        contract_definition = ContractHandler.get_contract_dict_by_name(
-            contract_name, ContractHandler.artifacts_path)
+        web3 = web3 or Web3Provider.get_web3()
+        network_id = Web3Provider.get_network_id(web3)
+        contract_definition = ContractHandler.get_contract_definition(
+            contract_name, ContractHandler.artifacts_path, network_id)
         address = Web3.toChecksumAddress(contract_definition['address'])
         abi = contract_definition['abi']
-        contract = Web3Provider.get_web3().eth.contract(address=address, abi=abi)
-        ContractHandler._contracts[contract_name] = (contract, contract_definition['version'])
-        return ContractHandler._contracts[contract_name]
+        contract = web3.eth.contract(address=address, abi=abi)
+        with ContractHandler._lock:
+            return ContractHandler._contracts.setdefault(
+                (Web3Provider.get_chain_id(web3), contract_name),
+                (contract, contract_definition['version']))
 
     @staticmethod
-    def _load_from_address(address, abi, contract_name):
+    def _load_from_address(address, abi, contract_name, web3=None):
         """Retrieve the contract instance for `contract_name` that represent the smart
         contract in the keeper network.
 
         :param contract_name: str name of the solidity keeper contract without the network name.
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
         :return: web3.eth.Contract instance
         """
+        web3 = web3 or Web3Provider.get_web3()
         address = Web3.toChecksumAddress(address)
-        contract = Web3Provider.get_web3().eth.contract(address=address, abi=abi)
-        ContractHandler._contracts[contract_name] = (contract, 'external')
-        return ContractHandler._contracts[contract_name]
+        contract = web3.eth.contract(address=address, abi=abi)
+        with ContractHandler._lock:
+            return ContractHandler._contracts.setdefault(
+                (Web3Provider.get_chain_id(web3), contract_name), (contract, 'external'))
+
+    @staticmethod
+    def _bind(name, contract, web3):
+        """
+        Return a contract bound to a web3 instance. The contract loaded for the chain is bound
+        to the instance that loaded it, the ones of other instances of the same chain, e.g.
+        with another provider, are created from its address and abi once per instance.
+        """
+        if contract.web3 is web3:
+            return contract
+        with ContractHandler._lock:
+            contracts = ContractHandler._bound_contracts.setdefault(web3, dict())
+            source, bound = contracts.get(name, (None, None))
+            if source is not contract:
+                bound = web3.eth.contract(address=contract.address, abi=contract.abi)
+                contracts[name] = (contract, bound)
+            return bound
 
     @staticmethod
     def _get_contract_file_path(_base_path, _contract_name, _network_name, artifacts_path):
         contract_file_name = '{}.{}.json'.format(_contract_name, _network_name)
-        for name in os.listdir(_base_path):
-            if name.lower() == contract_file_name.lower():
-                contract_file_name = name
-                return os.path.join(artifacts_path, contract_file_name)
+        file_name = ContractHandler._get_artifact_index(_base_path).get(contract_file_name.lower())
+        if file_name:
+            return os.path.join(artifacts_path, file_name)
         return None
 
     @staticmethod
-    def get_contract_dict_by_name(contract_name, artifacts_path):
+    def _get_artifact_index(path):
         """
-        Retrieve the Contract instance for a given contract name.
+        Return the files of an artifacts directory by their lowercase name. The index is
+        built again when the directory changes.
 
-        :param contract_name: str
-        :param artifacts_path: str the path to keeper contracts artifacts (`abi` .json files)
-        :return: the smart contract's definition from the json abi file, dict
+        :param path: str path of the artifacts directory
+        :return: dict
         """
+        mtime = os.stat(path).st_mtime_ns
+        index = ContractHandler._artifact_indexes.get(path)
+        if index is None or index[0] != mtime:
+            index = (mtime, {name.lower(): name for name in os.listdir(path)})
+            ContractHandler._artifact_indexes[path] = index
+        return index[1]
 
-        network_name = Keeper.get_network_name(Keeper.get_network_id()).lower()
+    @staticmethod
+    def _find_contract_file(contract_name, artifacts_path, network_id=None):
+        if network_id is None:
+            network_id = Web3Provider.get_network_id()
+        network_name = Keeper.get_network_name(network_id).lower()
 
-        # file_name = '{}.{}.json'.format(contract_name, network_name)
-        # path = os.path.join(keeper.artifacts_path, file_name)
         path = ContractHandler._get_contract_file_path(
             artifacts_path, contract_name, network_name, artifacts_path)
-        if not (path and os.path.exists(path)):
-            path = ContractHandler._get_contract_file_path(
-                artifacts_path, contract_name, network_name.lower(), artifacts_path)
-
         if not (path and os.path.exists(path)):
             path = ContractHandler._get_contract_file_path(
                 artifacts_path, contract_name, Keeper.DEFAULT_NETWORK_NAME, artifacts_path)
@@ -140,7 +223,95 @@ class ContractHandler(object):
                 f'not found in {artifacts_path} '
                 f'using network name {network_name}'
             )
+        return path
+
+    @staticmethod
+    def get_contract_dict_by_name(contract_name, artifacts_path, network_id=None):
+        """
+        Retrieve the Contract instance for a given contract name.
 
+        :param contract_name: str
+        :param artifacts_path: str the path to keeper contracts artifacts (`abi` .json files)
+        :param network_id: int id of the network, defaults to the one of the current web3
+        :return: the smart contract's definition from the json abi file, dict
+        """
+        path = ContractHandler._find_contract_file(contract_name, artifacts_path, network_id)
         with open(path) as f:
             contract_dict = json.loads(f.read())
             return contract_dict
+
+    @staticmethod
+    def get_contract_definition(contract_name, artifacts_path, network_id=None):
+        """
+        Return the address, abi and version of a contract, from the artifacts cache when the
+        artifact did not change.
+
+        Only the artifact of the contract is read, the other contracts are added to the cache
+        when they are loaded.
+
+        :param contract_name: str
+        :param artifacts_path: str the path to keeper contracts artifacts (`abi` .json files)
+        :param network_id: int id of the network, defaults to the one of the current web3
+        :return: dict with the `address`, `abi` and `version` of the contract
+        """
+        path = ContractHandler._find_contract_file(contract_name, artifacts_path, network_id)
+        file_name = os.path.basename(path)
+        cache = ContractHandler._get_definition_cache(artifacts_path)
+        file_key = ContractHandler._get_file_key(path)
+        entry = cache.get(file_name)
+        if entry and entry[0] == file_key:
+            return entry[1]
+
+        with open(path) as f:
+            contract_dict = json.loads(f.read())
+        # the bytecode is most of the artifact and is not needed to call the contract
+        definition = {key: contract_dict[key] for key in ('address', 'abi', 'version')
+                      if key in contract_dict}
+        with ContractHandler._lock:
+            cache[file_name] = (file_key, definition)
+            ContractHandler._save_definition_cache(artifacts_path, cache)
+        return definition
+
+    @staticmethod
+    def _get_file_key(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _get_cache_file(artifacts_path):
+        if not ContractHandler.cache_dir:
+            return None
+        path_hash = hashlib.sha1(os.path.abspath(artifacts_path).encode('utf-8')).hexdigest()
+        return os.path.join(ContractHandler.cache_dir, f'artifacts-{path_hash[:16]}.pickle')
+
+    @staticmethod
+    def _get_definition_cache(artifacts_path):
+        with ContractHandler._lock:
+            cache = ContractHandler._definition_caches.get(artifacts_path)
+            if cache is not None:
+                return cache
+
+            cache = dict()
+            cache_file = ContractHandler._get_cache_file(artifacts_path)
+            if cache_file and os.path.exists(cache_file):
+                try:
+                    with open(cache_file, 'rb') as f:
+                        cache = pickle.load(f)
+                except Exception as e:
+                    logger.debug(f'Ignoring the artifacts cache {cache_file}: {e}')
+            ContractHandler._definition_caches[artifacts_path] = cache
+            return cache
+
+    @staticmethod
+    def _save_definition_cache(artifacts_path, cache):
+        cache_file = ContractHandler._get_cache_file(artifacts_path)
+        if not cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.debug(f'Could not write the artifacts cache {cache_file}: {e}')
@@ -4,6 +4,7 @@ import os
 from contracts_lib_py import Keeper
 from contracts_lib_py.contract_handler import ContractHandler
 from contracts_lib_py.exceptions import ContractsNotFound
+from contracts_lib_py.web3_provider import Web3Provider
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,7 @@ class Diagnostics:
 
         # try to find contract with this network name
         contract_name = Diagnostics.TEST_CONTRACT_NAME
-        network_id = Keeper.get_network_id()
+        network_id = Web3Provider.get_network_id()
         network_name = Keeper.get_network_name(network_id)
         logger.info(f'Using keeper contracts from network {network_name}, '
                     f'network id is {network_id}')
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+
+class DIDRegisterCache:
+    """
+    In-process read-through cache of the on-chain register of DIDs.
+
+    One `getDIDRegister` result is kept per DID, and the owner, providers and block number of
+    the DID are derived from it. The permissions of the DID are kept in the same entry, one per
+    grantee, so a DID is evicted and invalidated as a whole.
+
+    The DID is invalidated after the transactions of the `DIDRegistry` wrapper that change it,
+    and when a `DIDAttributeRegistered` event of the DID is added to the event index or removed
+    from it by a chain reorganization. The register of a DID that is not registered yet is never
+    kept, since it can be registered by another process at any time.
+    """
+    REGISTER = 'register'
+
+    def __init__(self, ttl=30, max_size=1024):
+        """
+
+        :param ttl: float seconds a value is kept, None to keep it until evicted or invalidated
+        :param max_size: int maximum number of DIDs kept, least recently used are evicted first
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # bumped by every invalidation, a value read before is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(chain_id, address, did):
+        """
+        Return the cache key of a DID.
+
+        :param chain_id: int id of the chain of the DIDRegistry contract
+        :param address: hex str address of the DIDRegistry contract
+        :param did: the id of an asset on-chain, hex str or bytes
+        :return: tuple, or None if the did is not a valid hex value
+        """
+        try:
+            did_bytes = HexBytes(did)
+        except (TypeError, ValueError):
+            return None
+        return chain_id, Web3.toChecksumAddress(address), did_bytes.hex()
+
+    def get(self, key, field, loader, cache_if=None):
+        """
+        Return a cached value of a DID, reading it with `loader` on a miss.
+
+        :param key: tuple returned by `make_key`
+        :param field: hashable name of the value, e.g. `DIDRegisterCache.REGISTER`
+        :param loader: callable returning the value from the chain
+        :param cache_if: callable taking the value and returning False if it must not be kept
+        :return: the value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and field in entry:
+                value, expires_at = entry[field]
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del entry[field]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        with self._lock:
+            if generation != self._generation:
+                # the did may have changed while it was read
+                return value
+            if cache_if is not None and not cache_if(value):
+                return value
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries.setdefault(key, {})[field] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key):
+        """
+        Drop every cached value of a DID.
+
+        :param key: tuple returned by `make_key`
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every cached DID."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def on_indexed_log(self, log, chain_id):
+        """
+        Invalidate the DID of a `DIDAttributeRegistered` log, hook of the event index.
+
+        :param log: decoded event log
+        :param chain_id: int id of the chain of the log
+        """
+        if log['event'] != 'DIDAttributeRegistered':
+            return
+        key = self.make_key(chain_id, log['address'], log['args']['_did'])
+        if key is not None:
+            logger.debug(f'invalidating the cached register of did {key[2]}')
+            self.invalidate(key)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: dict with `hits`, `misses` and `size`
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
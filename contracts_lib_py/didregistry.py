@@ -6,7 +6,9 @@ from eth_utils import add_0x_prefix
 from web3 import Web3
 from web3._utils.events import get_event_data
 
+from contracts_lib_py import event_index
 from contracts_lib_py.contract_base import ContractBase
+from contracts_lib_py.did_register_cache import DIDRegisterCache
 from contracts_lib_py.event_filter import EventFilter
 from contracts_lib_py.exceptions import DIDNotFound
 from contracts_lib_py.nft_upgradeable import NFTUpgradeable
@@ -22,7 +24,13 @@ DIDRegisterValues = namedtuple(
 
 
 class DIDRegistry(ContractBase):
-    """Class to register and update DID's."""
+    """
+    Class to register and update DID's.
+
+    The register lookups can be cached with `DIDRegistry.enable_register_cache()`, the
+    owner, providers and block number of a DID are then derived from a single cached
+    `getDIDRegister` call.
+    """
     DID_REGISTRY_EVENT_NAME = 'DIDAttributeRegistered'
     PROVENANCE_ATTRIBUTE_REGISTERED_EVENT_NAME = 'ProvenanceAttributeRegistered'
     PROVENANCE_USED_EVENT_NAME = 'Used'
@@ -33,6 +41,31 @@ class DIDRegistry(ContractBase):
 
     CONTRACT_NAME = 'DIDRegistry'
 
+    register_cache = None
+
+    @staticmethod
+    def enable_register_cache(ttl=30, max_size=1024):
+        """
+        Cache the on-chain register and permissions of DIDs. A DID is invalidated by the
+        transactions sent with this class that change it, and by the `DIDAttributeRegistered`
+        events of the DID added to the event index, see `EventFilter.enable_event_index`.
+
+        :param ttl: float seconds a register is kept, None to keep it until invalidated
+        :param max_size: int maximum number of DIDs kept
+        :return: DIDRegisterCache
+        """
+        DIDRegistry.disable_register_cache()
+        DIDRegistry.register_cache = DIDRegisterCache(ttl=ttl, max_size=max_size)
+        event_index.add_hook(DIDRegistry.register_cache.on_indexed_log)
+        return DIDRegistry.register_cache
+
+    @staticmethod
+    def disable_register_cache():
+        """Disable the register cache."""
+        if DIDRegistry.register_cache is not None:
+            event_index.remove_hook(DIDRegistry.register_cache.on_indexed_log)
+        DIDRegistry.register_cache = None
+
     def register_mintable_did(self, did_seed, checksum, url, cap, royalties, account, providers=None, activity_id=None,
                               attributes=None):
         """
@@ -133,7 +166,9 @@ class DIDRegistry(ContractBase):
             transaction = self._register_did(
                 did_source_id, checksum, providers or [], url, account, activity_id, attributes
             )
-        receipt = self.get_tx_receipt(transaction)
+        receipt = self.get_tx_receipt(transaction, self.web3)
+        if DIDRegistry.register_cache is not None:
+            self._invalidate_register(self.hash_did(did_source_id, account.address))
         if receipt:
             return receipt.status == 1
 
@@ -167,7 +202,9 @@ class DIDRegistry(ContractBase):
 
     def get_block_number_updated(self, did):
         """Return the block number the last did was updated on the block chain."""
-        return self.contract.caller.getBlockNumberUpdated(did)
+        if DIDRegistry.register_cache is None:
+            return self.contract.caller.getBlockNumberUpdated(did)
+        return self._get_register_entry(did)[4]
 
     def get_did_owner(self, did):
         """
@@ -176,7 +213,18 @@ class DIDRegistry(ContractBase):
         :param did: Asset did, did
         :return: ethereum address, hex str
         """
-        return self.contract.caller.getDIDOwner(did)
+        if DIDRegistry.register_cache is None:
+            return self.contract.caller.getDIDOwner(did)
+        return self._get_register_entry(did)[0]
+
+    def get_did_owners(self, dids):
+        """
+        Return the owners of several dids in a single request.
+
+        :param dids: list of asset dids, did
+        :return: list of ethereum addresses, hex str
+        """
+        return self.call_batch('getDIDOwner', [(did,) for did in dids])
 
     def add_provider(self, did, provider_address, account):
         """
@@ -195,7 +243,9 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
     def remove_provider(self, did, provider_address, account):
         """
@@ -214,7 +264,9 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
     def transfer_did_ownership(self, did, new_owner_address, account):
         """
@@ -232,7 +284,9 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
     def grant_permission(self, did, address_to_grant, account):
         """
@@ -250,7 +304,9 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
     def revoke_permission(self, did, address_to_revoke, account):
         """
@@ -268,7 +324,9 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
     def get_permission(self, did, address):
         """
@@ -278,7 +336,10 @@ class DIDRegistry(ContractBase):
         :param address: ethereum account address, hex str
         :return: true if the address has access permission to a DID
         """
-        return self.contract.caller.getPermission(did, address)
+        if DIDRegistry.register_cache is None:
+            return self.contract.caller.getPermission(did, address)
+        return self._read_through(did, ('permission', address.lower()),
+                                  lambda: self.contract.caller.getPermission(did, address))
 
     def is_did_provider(self, did, address):
         """
@@ -288,7 +349,9 @@ class DIDRegistry(ContractBase):
         :param address: ethereum account address, hex str
         :return: bool
         """
-        return self.contract.caller.isDIDProvider(did, address)
+        if DIDRegistry.register_cache is None:
+            return self.contract.caller.isDIDProvider(did, address)
+        return address.lower() in (a.lower() for a in self._get_register_entry(did)[5])
 
     def get_did_providers(self, did):
         """
@@ -299,8 +362,7 @@ class DIDRegistry(ContractBase):
             list of addresses
             None if asset has no registerd providers
         """
-        register_values = self.contract.caller.getDIDRegister(did)
-        print(register_values)
+        register_values = list(self._get_register_entry(did))
         if register_values and len(register_values) >= 6 and register_values[0]:
             # sanitize providers list, because if providers were removed they will
             # be replaced with null/None
@@ -359,7 +421,7 @@ class DIDRegistry(ContractBase):
                 f'Also ensure that sufficient time has passed after registering the asset '
                 f'such that the transaction is confirmed by the network validators.')
 
-        events = Web3Provider.get_web3().eth.getLogs({
+        events = self.web3.eth.getLogs({
             'fromBlock': block_number,
             'toBlock': block_number,
             'address': self.contract.address
@@ -458,7 +520,7 @@ class DIDRegistry(ContractBase):
                       'keyfile': account.key_file}
         )
 
-        return Web3Provider.get_web3().eth.waitForTransactionReceipt(tx_hash, timeout=20)
+        return self.web3.eth.waitForTransactionReceipt(tx_hash, timeout=20)
 
     def was_derived_from(self, prov_id, new_entity_did, used_entity_did, agent_id, activity_id,
                          account, attributes=None):
@@ -475,7 +537,7 @@ class DIDRegistry(ContractBase):
                       'keyfile': account.key_file}
         )
 
-        return Web3Provider.get_web3().eth.waitForTransactionReceipt(tx_hash, timeout=20)
+        return self.web3.eth.waitForTransactionReceipt(tx_hash, timeout=20)
 
     def was_associated_with(self, prov_id, did, agent_id, activity_id,
                             account, attributes=None):
@@ -490,7 +552,7 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return Web3Provider.get_web3().eth.waitForTransactionReceipt(tx_hash, timeout=20)
+        return self.web3.eth.waitForTransactionReceipt(tx_hash, timeout=20)
 
     def acted_on_behalf(self, prov_id, did, delegate_agent_id, responsible_agent_id, activity_id,
                         signature, account, attributes=None):
@@ -507,7 +569,7 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return Web3Provider.get_web3().eth.waitForTransactionReceipt(tx_hash, timeout=20)
+        return self.web3.eth.waitForTransactionReceipt(tx_hash, timeout=20)
 
     def add_did_provenance_delegate(self, did, delegate, account):
         tx_hash = self.send_transaction(
@@ -541,7 +603,44 @@ class DIDRegistry(ContractBase):
         return self.contract.caller.provenanceSignatureIsCorrect(agent_id, hash, signature)
 
     def get_did_register(self, did):
-        entry = self.contract.caller.getDIDRegister(did)
+        return self._did_register_to_dict(self._get_register_entry(did))
+
+    def get_did_registers(self, dids):
+        """
+        Return the on-chain register of several dids in a single request.
+
+        :param dids: list of asset dids, did
+        :return: list of dict
+        """
+        return [self._did_register_to_dict(entry)
+                for entry in self.call_batch('getDIDRegister', [(did,) for did in dids])]
+
+    def _get_register_entry(self, did):
+        # an unregistered did comes back with the zero address as owner
+        return self._read_through(did, DIDRegisterCache.REGISTER,
+                                  lambda: tuple(self.contract.caller.getDIDRegister(did)),
+                                  cache_if=lambda entry: entry[0] != self.ZERO_ADDRESS)
+
+    def _read_through(self, did, field, loader, cache_if=None):
+        cache = DIDRegistry.register_cache
+        key = self._make_register_key(cache, did)
+        if key is None:
+            return loader()
+        return cache.get(key, field, loader, cache_if=cache_if)
+
+    def _invalidate_register(self, did):
+        cache = DIDRegistry.register_cache
+        key = self._make_register_key(cache, did)
+        if key is not None:
+            cache.invalidate(key)
+
+    def _make_register_key(self, cache, did):
+        if cache is None:
+            return None
+        return cache.make_key(Web3Provider.get_chain_id(self.web3), self.address, did)
+
+    @staticmethod
+    def _did_register_to_dict(entry):
         valid_providers = [a for a in entry[5] if a != '0x0000000000000000000000000000000000000000']
         return {
             'owner': entry[0],
@@ -644,7 +743,9 @@ class DIDRegistry(ContractBase):
                       'keyfile': account.key_file}
         )
 
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
     def burn(self, did, amount, account):
         tx_hash = self.send_transaction(
@@ -654,7 +755,9 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
 
     def mint721(self, did, receiver, account):
@@ -666,7 +769,9 @@ class DIDRegistry(ContractBase):
                       'keyfile': account.key_file}
         )
 
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
     def burn721(self, did, account):
         tx_hash = self.send_transaction(
@@ -676,7 +781,9 @@ class DIDRegistry(ContractBase):
                       'passphrase': account.password,
                       'keyfile': account.key_file}
         )
-        return self.is_tx_successful(tx_hash)
+        successful = self.is_tx_successful(tx_hash)
+        self._invalidate_register(did)
+        return successful
 
 
     @staticmethod
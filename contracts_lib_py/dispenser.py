@@ -6,7 +6,6 @@ from web3._utils.threads import Timeout
 from contracts_lib_py.contract_base import ContractBase
 from contracts_lib_py.event_filter import EventFilter
 from contracts_lib_py.exceptions import InvalidTransaction
-from contracts_lib_py.web3_provider import Web3Provider
 
 
 class Dispenser(ContractBase):
@@ -42,7 +41,7 @@ class Dispenser(ContractBase):
             )
             logging.debug(f'{address} requests {amount} tokens, returning receipt')
             try:
-                receipt = Web3Provider.get_web3().eth.waitForTransactionReceipt(
+                receipt = self.web3.eth.waitForTransactionReceipt(
                     tx_hash, timeout=10)
                 logging.debug(f'requestTokens receipt: {receipt}')
             except Timeout:
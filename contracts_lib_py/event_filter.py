@@ -1,28 +1,122 @@
 import logging
 import time
 
+from contracts_lib_py.web3.retry import backoff_delay
 from contracts_lib_py.web3_provider import Web3Provider
 
 logger = logging.getLogger(__name__)
 
+# substrings of the errors returned by the providers when a log query spans too many blocks
+# or returns too many results
+RANGE_ERROR_MESSAGES = (
+    'block range',
+    'range too large',
+    'range is too large',
+    'too many blocks',
+    'exceed maximum block range',
+    'query returned more than',
+    'response size exceeded',
+    'log response size',
+    'limit exceeded',
+)
+
 
 class EventFilter:
+    """
+    Query the logs of a contract event.
+
+    The filter keeps a cursor with the last block scanned, so `get_new_entries` only queries
+    the blocks added since the previous call while `get_all_entries` queries the whole range.
+    A range is queried at once until the provider rejects a query for its size. From then on
+    it is split in chunks, sized between the largest range that succeeded and the smallest
+    one that was rejected, so the chunks converge on the provider limit without going back
+    to a size that already failed.
+
+    When the event index is enabled with `EventFilter.enable_event_index()`, `get_all_entries`
+    is answered from the local index instead of querying the chain.
+    """
+    event_index = None
+    MIN_CHUNK_SIZE = 1
+    MAX_POLL_INTERVAL = 10
+    # Infura limits log queries to 1000 blocks on mumbai
+    CHAIN_CHUNK_SIZES = {'80001': 990}
+
     def __init__(self, event_name, event, argument_filters, from_block, to_block,
-                 poll_interval=None):
+                 poll_interval=None, confirmations=0, chunk_size=None):
+        """
+
+        :param event_name: str name of the event
+        :param event: contract event class, e.g. `contract.events.AgreementCreated`
+        :param argument_filters: dict of event argument names and the values to match
+        :param from_block: int first block to scan. 0, `None`, 'latest' and 'earliest' scan
+            from the start of the chain (the last 990 blocks on mumbai)
+        :param to_block: int last block to scan, or 'latest' to follow the chain head
+        :param poll_interval: float seconds of the first interval between retries, the
+            following ones grow exponentially with jitter up to `MAX_POLL_INTERVAL`
+        :param confirmations: int number of blocks behind the chain head to stop at, so only
+            logs with that many confirmations are returned
+        :param chunk_size: int initial number of blocks per query, None to query the whole
+            range at once until the provider rejects it
+        """
         self.event_name = event_name
         self.event = event
         self.argument_filters = argument_filters
         self.block_range = (from_block, to_block)
+        self.confirmations = confirmations
         self._filter = None
         self._poll_interval = poll_interval if poll_interval else 0.5
+        self._chunk_size = chunk_size
+        self._largest_ok_size = 0
+        self._smallest_failed_size = None
+        self._cursor = None
         self._create_filter()
 
+    @staticmethod
+    def enable_event_index(path=':memory:', start_block=0, confirmations=0):
+        """
+        Keep the logs of the queried events in a local SQLite index, so `get_all_entries`
+        does not scan the chain on every call.
+
+        :param path: str path of the SQLite database file, ':memory:' keeps it in memory
+        :param start_block: int first block indexed
+        :param confirmations: int number of blocks behind the chain head the index stops at
+        :return: EventIndex
+        """
+        from contracts_lib_py.event_index import EventIndex
+
+        EventFilter.disable_event_index()
+        EventFilter.event_index = EventIndex(
+            path, start_block=start_block, confirmations=confirmations)
+        return EventFilter.event_index
+
+    @staticmethod
+    def disable_event_index():
+        """Disable the event index and close its database."""
+        if EventFilter.event_index is not None:
+            EventFilter.event_index.close()
+        EventFilter.event_index = None
+
     @property
     def filter_id(self):
         return self._filter.filter_id if self._filter else None
 
+    @property
+    def cursor(self):
+        """Return the next block `get_new_entries` scans from."""
+        return self._cursor
+
+    @property
+    def chunk_size(self):
+        """Return the number of blocks per query, None if ranges are queried at once."""
+        return self._chunk_size
+
+    @property
+    def web3(self):
+        """Return the web3 instance of the contract the event belongs to."""
+        return getattr(self.event, 'web3', None) or Web3Provider.get_web3()
+
     def uninstall(self):
-        Web3Provider.get_web3().eth.uninstallFilter(self._filter.filter_id)
+        self.web3.eth.uninstallFilter(self._filter.filter_id)
 
     def set_poll_interval(self, interval):
         self._poll_interval = interval
@@ -31,66 +125,169 @@ class EventFilter:
         self._create_filter()
 
     def _create_filter(self):
-        chain_id = Web3Provider.get_web3().net.version
-        from_block = 0
-
-        # temporary workaround to work with mumbai
-        # Infura has a 1000 block range limit in their api
-        if chain_id == '80001':
-            latest_block = Web3Provider.get_web3().eth.get_block_number()
-            from_block = latest_block - 990
+        web3 = self.web3
+        chain_id = str(Web3Provider.get_network_id(web3))
+        from_block = self.block_range[0]
+        if not isinstance(from_block, int) or from_block == 0:
+            from_block = 0
+            # temporary workaround to work with mumbai
+            if chain_id in self.CHAIN_CHUNK_SIZES:
+                latest_block = web3.eth.get_block_number()
+                from_block = max(latest_block - self.CHAIN_CHUNK_SIZES[chain_id], 0)
 
+        if chain_id in self.CHAIN_CHUNK_SIZES and self._smallest_failed_size is None:
+            max_chunk_size = self.CHAIN_CHUNK_SIZES[chain_id]
+            self._largest_ok_size = max_chunk_size
+            self._smallest_failed_size = max_chunk_size + 1
+            self._chunk_size = min(self._chunk_size or max_chunk_size, max_chunk_size)
 
         self._filter = {
             'fromBlock': from_block,
             'toBlock': self.block_range[1],
             'argument_filters': self.argument_filters
         }
+        self._cursor = from_block
 
     def get_new_entries(self, max_tries=1):
+        """
+        Return the logs emitted since the previous call, and move the cursor past them.
+
+        :param max_tries: int number of queries to try until some logs are found
+        :return: list of event logs
+        """
         # This api is not provided by polygon
         try:
-            return self._get_entries(max_tries=max_tries)
+            return self._get_entries(max_tries=max_tries, move_cursor=True)
         except ValueError as e:
             # method does not exist or is not available
-            if e.args[0]['code'] == -32601:
+            if self._error_code(e) == -32601:
                 return []
             else:
                 raise
 
     def get_all_entries(self, max_tries=1):
-         # This api is not provided by polygon
+        """
+        Return all the logs in the block range of the filter.
+
+        :param max_tries: int number of queries to try until some logs are found
+        :return: list of event logs
+        """
+        if EventFilter.event_index is not None:
+            from_block = self.block_range[0] if isinstance(self.block_range[0], int) else 0
+            to_block = self.block_range[1] if isinstance(self.block_range[1], int) else None
+            return EventFilter.event_index.get_entries(
+                self.event, self.argument_filters, from_block, to_block)
+
+        # This api is not provided by polygon
         try:
             return self._get_entries(max_tries=max_tries)
         except ValueError as e:
             # method does not exist or is not available
-            if e.args[0]['code'] == -32601:
+            if self._error_code(e) == -32601:
                 return []
             else:
                 raise
 
-    def _get_entries(self, max_tries=1):
+    def get_entries_in_range(self, from_block, to_block):
+        """
+        Return the logs between two blocks, querying the chain in chunks.
+
+        :param from_block: int first block
+        :param to_block: int last block
+        :return: list of event logs
+        """
+        return self._get_logs(from_block, to_block)
+
+    def _get_entries(self, max_tries=1, move_cursor=False):
         i = 0
         while i < max_tries:
             try:
-                logs = self.event.getLogs(**self._filter)
+                from_block = self._cursor if move_cursor else self._filter['fromBlock']
+                to_block = self._get_to_block()
+                logs = self._get_logs(from_block, to_block)
+                if move_cursor:
+                    self._cursor = max(self._cursor, to_block + 1)
                 if logs:
                     logger.debug(
                         f'found event logs: event-name={self.event_name}, '
-                        f'range={self.block_range}, '
+                        f'range={(from_block, to_block)}, '
                         f'logs={logs}')
                     return logs
             except ValueError as e:
                 if 'Filter not found' in str(e):
                     logger.debug(f'recreating filter (Filter not found): event={self.event_name}, '
                                  f'arg-filter={self.argument_filters}, from/to={self.block_range}')
-                    time.sleep(1)
                     self._create_filter()
                 else:
                     raise
 
+            if max_tries > 1 and i < max_tries - 1:
+                time.sleep(backoff_delay(i, self._poll_interval, self.MAX_POLL_INTERVAL))
             i += 1
-            if max_tries > 1 and i < max_tries:
-                time.sleep(0.5)
 
         return []
+
+    def _get_to_block(self):
+        to_block = self.web3.eth.block_number - self.confirmations
+        if isinstance(self.block_range[1], int):
+            to_block = min(to_block, self.block_range[1])
+        return to_block
+
+    def _get_logs(self, from_block, to_block):
+        logs = []
+        while from_block <= to_block:
+            end_block = to_block
+            if self._chunk_size is not None:
+                end_block = min(from_block + self._chunk_size - 1, to_block)
+            size = end_block - from_block + 1
+            try:
+                logs.extend(self.event.getLogs(
+                    argument_filters=self.argument_filters,
+                    fromBlock=from_block,
+                    toBlock=end_block
+                ))
+            except ValueError as e:
+                if not self._is_range_error(e) or size <= self.MIN_CHUNK_SIZE:
+                    raise
+                if self._largest_ok_size >= size:
+                    # the provider limit went down, forget what used to work
+                    self._largest_ok_size = 0
+                self._set_failed_size(size)
+                logger.debug(f'log query of blocks {from_block}-{end_block} too large, '
+                             f'retrying with chunks of {self._chunk_size} blocks')
+                continue
+
+            from_block = end_block + 1
+            self._largest_ok_size = max(self._largest_ok_size, size)
+            if self._smallest_failed_size is None:
+                if self._chunk_size is not None:
+                    self._chunk_size *= 2
+            else:
+                self._chunk_size = self._next_chunk_size()
+        return logs
+
+    def _set_failed_size(self, size):
+        if self._smallest_failed_size is None or size < self._smallest_failed_size:
+            self._smallest_failed_size = size
+        self._largest_ok_size = min(self._largest_ok_size, self._smallest_failed_size - 1)
+        self._chunk_size = self._next_chunk_size()
+
+    def _next_chunk_size(self):
+        # halve the size that failed until a query succeeds, then bisect between the largest
+        # size that succeeded and the smallest one that failed
+        if self._largest_ok_size == 0:
+            return max(self._smallest_failed_size // 2, self.MIN_CHUNK_SIZE)
+        return (self._largest_ok_size + self._smallest_failed_size) // 2
+
+    @staticmethod
+    def _is_range_error(error):
+        if EventFilter._error_code(error) == -32005:
+            return True
+        message = str(error).lower()
+        return any(text in message for text in RANGE_ERROR_MESSAGES)
+
+    @staticmethod
+    def _error_code(error):
+        if error.args and isinstance(error.args[0], dict):
+            return error.args[0].get('code')
+        return None
@@ -0,0 +1,405 @@
+"""
+    Event Index
+
+    Local SQLite store of decoded contract events, kept in sync with the chain.
+
+    Hooks added with `add_hook` are called with every log added to an index and the chain id
+    of the log, e.g. to invalidate the values cached from the state the log changed. They are
+    called again, with `removed` set in the log, for the logs dropped by a chain reorganization.
+"""
+import json
+import logging
+import sqlite3
+import threading
+
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import BlockNotFound
+
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+hooks = ()
+
+# bumped when the tables change, the database of an older version is indexed again
+SCHEMA_VERSION = 2
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    event TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_index INTEGER,
+    transaction_hash TEXT NOT NULL,
+    block_hash TEXT,
+    args TEXT NOT NULL,
+    UNIQUE (chain_id, transaction_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_address_topic
+    ON events (chain_id, address, topic, block_number);
+CREATE TABLE IF NOT EXISTS event_args (
+    event_id INTEGER NOT NULL REFERENCES events (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_args_name_value ON event_args (name, value);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT,
+    PRIMARY KEY (chain_id, address, topic)
+);
+'''
+
+
+def add_hook(hook):
+    """
+    Call `hook` with every new log added to an event index.
+
+    :param hook: callable taking a decoded event log and the int chain id of the log, the
+        logs removed by a chain reorganization have `removed` set
+    """
+    global hooks
+    hooks = hooks + (hook,)
+
+
+def remove_hook(hook):
+    """
+    Stop calling a hook added with `add_hook`.
+
+    :param hook: callable
+    """
+    global hooks
+    hooks = tuple(h for h in hooks if h != hook)
+
+
+def _normalize_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return HexBytes(value).hex().lower()
+    if isinstance(value, str):
+        return value.lower()
+    return str(value)
+
+
+def _encode_arg(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': HexBytes(value).hex()}
+    if isinstance(value, (list, tuple)):
+        return [_encode_arg(item) for item in value]
+    return value
+
+
+def _decode_arg(value):
+    if isinstance(value, dict) and '__bytes__' in value:
+        return HexBytes(value['__bytes__'])
+    if isinstance(value, list):
+        return [_decode_arg(item) for item in value]
+    return value
+
+
+class EventIndex:
+    """
+    Keep the decoded logs of contract events in a local SQLite database.
+
+    Events are added to the index the first time they are queried: their logs are read from
+    `start_block` and, after that, only the blocks added since the stored checkpoint of the
+    event. Every event argument is indexed, so the logs matching some argument filters,
+    e.g. the `DIDAttributeRegistered` events of an owner or the `Fulfilled` events of a grantee,
+    are found without querying the chain.
+
+    Logs and checkpoints are kept per chain id, so the contracts deployed at the same address
+    on several networks do not share them. Each event is synced with the web3 instance of its
+    contract.
+
+    The hash of the block of each checkpoint is kept too. When that block is no longer in the
+    chain, the logs of the last `reorg_depth` blocks before it are dropped and indexed again.
+    Set `confirmations` to only index the blocks that are unlikely to be reorganized.
+
+    By default the index catches up with the chain on every query. `start()` runs a background
+    thread that keeps it in sync instead, so queries are answered from the database alone.
+
+    Example:
+        index = EventFilter.enable_event_index('events.db')
+        dids = keeper.did_registry.get_owner_asset_ids(owner_address)
+    """
+
+    def __init__(self, path=':memory:', start_block=0, confirmations=0, reorg_depth=64):
+        """
+
+        :param path: str path of the SQLite database file, ':memory:' keeps it in memory
+        :param start_block: int first block indexed
+        :param confirmations: int number of blocks behind the chain head the index stops at
+        :param reorg_depth: int number of blocks indexed again when the block of a checkpoint
+            was dropped by a chain reorganization
+        """
+        self.path = path
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.reorg_depth = reorg_depth
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._create_schema()
+        self._lock = threading.RLock()
+        self._events = {}
+        self._filters = {}
+        self._stop_event = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _create_schema(self):
+        version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+        if version < SCHEMA_VERSION:
+            self._connection.executescript(
+                'DROP TABLE IF EXISTS event_args; DROP TABLE IF EXISTS events; '
+                'DROP TABLE IF EXISTS checkpoints;')
+        self._connection.executescript(SCHEMA)
+        self._connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    @staticmethod
+    def _event_key(event):
+        return (Web3Provider.get_chain_id(event.web3),
+                Web3.toChecksumAddress(event.address),
+                HexBytes(event_abi_to_log_topic(event._get_event_abi())).hex())
+
+    def add_event(self, event):
+        """
+        Add a contract event to the index, its logs are read on the next sync.
+
+        :param event: contract event class, e.g. `contract.events.DIDAttributeRegistered`
+        """
+        with self._lock:
+            self._events.setdefault(self._event_key(event), event)
+
+    def checkpoint(self, event):
+        """
+        Return the last block indexed for an event.
+
+        :param event: contract event class
+        :return: int block number, or None if the event was never synced
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT block_number FROM checkpoints '
+                'WHERE chain_id = ? AND address = ? AND topic = ?',
+                self._event_key(event)
+            ).fetchone()
+        return row[0] if row else None
+
+    def sync(self, to_block=None):
+        """
+        Index the logs of all the events up to a block.
+
+        :param to_block: int last block to index, defaults to the head of the chain of each
+            event minus the confirmations
+        :return: dict of chain id and last block indexed
+        """
+        with self._lock:
+            events = list(self._events.items())
+        synced = {}
+        for (chain_id, _, _), event in events:
+            if chain_id not in synced:
+                synced[chain_id] = to_block if to_block is not None \
+                    else event.web3.eth.block_number - self.confirmations
+            self._sync_event(event, synced[chain_id])
+        return synced
+
+    def get_entries(self, event, argument_filters=None, from_block=0, to_block=None):
+        """
+        Return the indexed logs of an event matching some argument filters, adding the event
+        to the index and catching up with the chain first when needed.
+
+        :param event: contract event class
+        :param argument_filters: dict of event argument names and the values to match,
+            a list of values matches any of them
+        :param from_block: int first block
+        :param to_block: int last block, None for no limit
+        :return: list of event logs, ordered as in the chain
+        """
+        key = self._event_key(event)
+        with self._lock:
+            known = key in self._events
+        if not known:
+            self.add_event(event)
+        if not known or not self.running:
+            self._sync_event(event, event.web3.eth.block_number - self.confirmations)
+
+        query = ('SELECT id, event, address, block_number, log_index, transaction_index, '
+                 'transaction_hash, block_hash, args FROM events '
+                 'WHERE chain_id = ? AND address = ? AND topic = ? AND block_number >= ?')
+        params = [*key, from_block]
+        if to_block is not None:
+            query += ' AND block_number <= ?'
+            params.append(to_block)
+        for name, expected in (argument_filters or {}).items():
+            values = expected if isinstance(expected, (list, tuple)) else [expected]
+            query += (' AND id IN (SELECT event_id FROM event_args WHERE name = ? AND value IN '
+                      f'({", ".join("?" * len(values))}))')
+            params.append(name)
+            params.extend(_normalize_value(value) for value in values)
+        query += ' ORDER BY block_number, log_index'
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [self._row_to_log(row) for row in rows]
+
+    def start(self, poll_interval=1.0):
+        """
+        Keep the index in sync in a background thread.
+
+        :param poll_interval: float seconds between syncs
+        """
+        if self.running:
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop_event, poll_interval),
+            name='EventIndex', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background sync."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        self._thread = None
+        self._stop_event = None
+
+    def close(self):
+        """Stop the background sync and close the database."""
+        self.stop()
+        with self._lock:
+            self._connection.close()
+
+    def _run(self, stop_event, poll_interval):
+        while not stop_event.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.debug(f'EventIndex could not sync: {e}')
+            stop_event.wait(poll_interval)
+
+    def _sync_event(self, event, to_block):
+        from contracts_lib_py.event_filter import EventFilter
+
+        key = self._event_key(event)
+        chain_id, address, topic = key
+        with self._lock:
+            checkpoint = self._connection.execute(
+                'SELECT block_number, block_hash FROM checkpoints '
+                'WHERE chain_id = ? AND address = ? AND topic = ?',
+                key
+            ).fetchone()
+        from_block = self.start_block if checkpoint is None else checkpoint[0] + 1
+        if from_block > to_block:
+            return
+        if checkpoint is not None and checkpoint[1] is not None \
+                and checkpoint[1] != self._get_block_hash(event.web3, checkpoint[0]):
+            from_block = max(checkpoint[0] - self.reorg_depth, self.start_block)
+            logger.info(f'Chain reorganization before block {checkpoint[0]}, indexing the '
+                        f'{event.event_name} logs of {address} again from block {from_block}')
+        # read before the logs, if the block is dropped meanwhile the next sync notices it
+        to_block_hash = self._get_block_hash(event.web3, to_block)
+
+        # the filter is only used to query the logs in chunks, keep it to reuse its chunk size
+        event_filter = self._filters.get(key)
+        if event_filter is None:
+            event_filter = EventFilter(event.event_name, event, {}, from_block, 'latest')
+            self._filters[key] = event_filter
+        logs = event_filter.get_entries_in_range(from_block, to_block)
+        with self._lock, self._connection:
+            removed_logs = self._remove_logs(key, from_block, logs) \
+                if checkpoint is not None and from_block <= checkpoint[0] else []
+            new_logs = [log for log in logs if self._insert_log(chain_id, topic, log)]
+            self._connection.execute(
+                'INSERT OR REPLACE INTO checkpoints '
+                '(chain_id, address, topic, block_number, block_hash) VALUES (?, ?, ?, ?, ?)',
+                (chain_id, address, topic, to_block, to_block_hash)
+            )
+        if logs:
+            logger.debug(f'indexed {len(logs)} {event.event_name} logs of {address} in blocks '
+                         f'{from_block}-{to_block}')
+        for log in removed_logs + new_logs:
+            for hook in hooks:
+                try:
+                    hook(log, chain_id)
+                except Exception as e:
+                    logger.warning(f'EventIndex hook {hook} failed: {e}')
+
+    @staticmethod
+    def _get_block_hash(web3, block_number):
+        try:
+            return HexBytes(web3.eth.get_block(block_number)['hash']).hex()
+        except BlockNotFound:
+            return None
+
+    def _remove_logs(self, key, from_block, logs):
+        # the logs still in the chain are only moved, they are not reported as removed
+        kept = {(HexBytes(log['transactionHash']).hex(), log['logIndex']) for log in logs}
+        rows = self._connection.execute(
+            'SELECT id, event, address, block_number, log_index, transaction_index, '
+            'transaction_hash, block_hash, args FROM events '
+            'WHERE chain_id = ? AND address = ? AND topic = ? AND block_number >= ? '
+            'ORDER BY block_number DESC, log_index DESC',
+            (*key, from_block)
+        ).fetchall()
+        self._connection.execute(
+            'DELETE FROM events WHERE chain_id = ? AND address = ? AND topic = ? '
+            'AND block_number >= ?',
+            (*key, from_block)
+        )
+        return [AttributeDict({**self._row_to_log(row), 'removed': True})
+                for row in rows if (row[6], row[4]) not in kept]
+
+    def _insert_log(self, chain_id, topic, log):
+        cursor = self._connection.execute(
+            'INSERT OR IGNORE INTO events (chain_id, address, topic, event, block_number, '
+            'log_index, transaction_index, transaction_hash, block_hash, args) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                chain_id,
+                Web3.toChecksumAddress(log['address']),
+                topic,
+                log['event'],
+                log['blockNumber'],
+                log['logIndex'],
+                log.get('transactionIndex'),
+                HexBytes(log['transactionHash']).hex(),
+                HexBytes(log['blockHash']).hex() if log.get('blockHash') else None,
+                json.dumps({name: _encode_arg(value) for name, value in log['args'].items()}),
+            )
+        )
+        if not cursor.rowcount:
+            return False
+        self._connection.executemany(
+            'INSERT INTO event_args (event_id, name, value) VALUES (?, ?, ?)',
+            [(cursor.lastrowid, name, _normalize_value(value))
+             for name, value in log['args'].items() if not isinstance(value, (list, tuple))]
+        )
+        return True
+
+    @staticmethod
+    def _row_to_log(row):
+        (_, event_name, address, block_number, log_index, transaction_index, transaction_hash,
+         block_hash, args) = row
+        return AttributeDict({
+            'args': AttributeDict({name: _decode_arg(value)
+                                   for name, value in json.loads(args).items()}),
+            'event': event_name,
+            'logIndex': log_index,
+            'transactionIndex': transaction_index,
+            'transactionHash': HexBytes(transaction_hash),
+            'address': address,
+            'blockHash': HexBytes(block_hash) if block_hash else None,
+            'blockNumber': block_number,
+        })
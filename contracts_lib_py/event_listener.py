@@ -1,10 +1,10 @@
 import logging
 import time
 from datetime import datetime
-from threading import Thread
 
 from contracts_lib_py.contract_handler import ContractHandler
 from contracts_lib_py.event_filter import EventFilter
+from contracts_lib_py.event_poller import get_event_poller
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +13,9 @@ class EventListener(object):
     """Class representing an event listener."""
 
     def __init__(self, contract_name, event_name, args=None, from_block=None, to_block=None,
-                 filters=None):
-        contract = ContractHandler.get(contract_name)
+                 filters=None, web3=None):
+        contract = ContractHandler.get(contract_name, web3)
+        self.web3 = contract.web3
         self.event_name = event_name
         self.event = getattr(contract.events, event_name)
         self.filters = filters if filters else {}
@@ -24,6 +25,7 @@ class EventListener(object):
         self.event_filter.poll_interval = 0.5
         self.timeout = 600  # seconds
         self.args = args
+        self.subscription = None
 
     def make_event_filter(self):
         """Create a new event filter."""
@@ -40,6 +42,8 @@ class EventListener(object):
     def listen_once(self, callback, timeout=None, timeout_callback=None, start_time=None,
                     blocking=False):
         """
+        Wait for the first event matching the filters. The listener is registered in the
+        shared `EventPoller`, which watches all the listeners with a single thread.
 
         :param callback: a callback function that takes one argument the event dict
         :param timeout: float timeout in seconds
@@ -63,17 +67,16 @@ class EventListener(object):
         if blocking:
             callback = _callback
 
-        # TODO Review where to close this threads.
-        Thread(
-            target=self.watch_one_event,
-            args=(self.event_filter,
-                  callback,
-                  timeout_callback,
-                  timeout if timeout is not None else self.timeout,
-                  self.args,
-                  start_time),
-            daemon=True,
-        ).start()
+        self.subscription = get_event_poller(self.web3).subscribe(
+            self.event,
+            self.filters,
+            callback,
+            timeout=timeout if timeout is not None else self.timeout,
+            timeout_callback=timeout_callback,
+            args=self.args,
+            backfill_filter=self.event_filter,
+            start_time=start_time
+        )
         if blocking:
             while not events:
                 time.sleep(0.2)
@@ -82,6 +85,11 @@ class EventListener(object):
 
         return None
 
+    def stop(self):
+        """Stop listening, the callbacks are not called anymore."""
+        if self.subscription is not None:
+            get_event_poller(self.web3).unsubscribe(self.subscription)
+
     @staticmethod
     def watch_one_event(event_filter, callback, timeout_callback, timeout, args,
                         start_time=None):
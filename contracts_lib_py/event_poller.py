@@ -0,0 +1,298 @@
+"""
+    Event Poller
+
+    Watch the events of many subscriptions with a single thread and one `eth_getLogs` per
+    new block range.
+"""
+import itertools
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
+
+from contracts_lib_py.event_filter import EventFilter
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+_instances = weakref.WeakKeyDictionary()
+
+
+def get_event_poller(web3=None):
+    """
+    Return the shared `EventPoller` for a web3 instance.
+
+    :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+    :return: EventPoller
+    """
+    web3 = web3 or Web3Provider.get_web3()
+    if web3 not in _instances:
+        _instances[web3] = EventPoller(web3)
+    return _instances[web3]
+
+
+def _normalize_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return HexBytes(value).hex().lower()
+    if isinstance(value, str):
+        return value.lower()
+    return value
+
+
+def _match_value(expected, value):
+    if isinstance(expected, (list, tuple)):
+        return any(_match_value(item, value) for item in expected)
+    return _normalize_value(expected) == _normalize_value(value)
+
+
+class Subscription:
+    """A callback waiting for the events of a contract that match some argument filters."""
+    _ids = itertools.count()
+
+    def __init__(self, event, argument_filters, callback, timeout=None, timeout_callback=None,
+                 args=None, once=True, backfill_filter=None, start_time=None):
+        self.id = next(self._ids)
+        self.event = event
+        self.address = Web3.toChecksumAddress(event.address)
+        self.topic = HexBytes(event_abi_to_log_topic(event._get_event_abi())).hex()
+        self.argument_filters = argument_filters or {}
+        self.callback = callback
+        self.timeout_callback = timeout_callback
+        self.args = args or []
+        self.once = once
+        self.backfill_filter = backfill_filter
+        start_time = start_time or time.time()
+        self.deadline = start_time + timeout if timeout else None
+        self.active = True
+
+    def matches(self, event_data):
+        """
+        Return True if the decoded event matches the argument filters of the subscription.
+
+        :param event_data: decoded event log
+        :return: bool
+        """
+        return all(
+            name in event_data.args and _match_value(expected, event_data.args[name])
+            for name, expected in self.argument_filters.items()
+        )
+
+
+class EventPoller:
+    """
+    Poll the chain for the events of all the subscriptions at once.
+
+    A single thread follows the chain head and, for every new block range, sends one
+    `eth_getLogs` filtered by the addresses and event topics of all the open subscriptions.
+    The logs are decoded and dispatched to the subscriptions matching their topic and
+    argument filters, so the number of threads and requests does not grow with the number
+    of subscriptions. Callbacks run in a small thread pool so a slow callback does not
+    delay the polling.
+
+    Subscriptions can be backfilled with an `EventFilter`, which is queried once when the
+    subscription is picked up to find events emitted before it was opened.
+
+    A block range the provider rejects for its size is split in chunks, halved until a query
+    succeeds, and the polled block moves forward chunk by chunk. A failed query is retried
+    from the last block polled on the next iteration, and logged as a warning.
+
+    The polling thread only runs while there are open subscriptions.
+    """
+    POLL_INTERVAL = 0.5
+    CALLBACK_WORKERS = 4
+
+    def __init__(self, web3=None, poll_interval=None, callback_workers=None):
+        """
+
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+        :param poll_interval: float seconds between checks for new blocks
+        :param callback_workers: int number of threads running the callbacks
+        """
+        self._web3 = web3 or Web3Provider.get_web3()
+        self.poll_interval = poll_interval or self.POLL_INTERVAL
+        self._executor = ThreadPoolExecutor(
+            max_workers=callback_workers or self.CALLBACK_WORKERS,
+            thread_name_prefix='EventPollerCallback'
+        )
+        self._subscriptions = {}
+        self._new_subscriptions = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_block = None
+        self._chunk_size = None
+
+    @property
+    def subscription_count(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, event, argument_filters=None, callback=None, timeout=None,
+                  timeout_callback=None, args=None, once=True, backfill_filter=None,
+                  start_time=None):
+        """
+        Register a callback for the events of a contract.
+
+        :param event: contract event class, e.g. `contract.events.AgreementCreated`
+        :param argument_filters: dict of event argument names and the values to match,
+            a list of values matches any of them
+        :param callback: callable taking the decoded event and `args`
+        :param timeout: float seconds to wait for an event, None to wait until unsubscribed
+        :param timeout_callback: callable taking `args` called when the timeout expires.
+            If not given `callback` is called with None instead of the event.
+        :param args: list of extra arguments passed to the callbacks
+        :param once: bool if True the subscription is closed after the first event
+        :param backfill_filter: EventFilter queried once for events emitted before the
+            subscription was opened
+        :param start_time: float timestamp the timeout is counted from, defaults to now
+        :return: Subscription
+        """
+        subscription = Subscription(
+            event, argument_filters, callback, timeout=timeout,
+            timeout_callback=timeout_callback, args=args, once=once,
+            backfill_filter=backfill_filter, start_time=start_time
+        )
+        with self._lock:
+            self._subscriptions[subscription.id] = subscription
+            self._new_subscriptions.append(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='EventPoller', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Close a subscription, its callbacks are not called anymore.
+
+        :param subscription: Subscription
+        """
+        with self._lock:
+            subscription.active = False
+            self._subscriptions.pop(subscription.id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscriptions:
+                    self._thread = None
+                    self._last_block = None
+                    return
+            try:
+                self._poll()
+            except Exception as e:
+                # ignore error, but log it
+                logger.warning(f'Got error polling keeper events after block '
+                               f'{self._last_block}: {e}')
+            self._check_timeouts()
+            time.sleep(self.poll_interval)
+
+    def _poll(self):
+        latest_block = self._web3.eth.block_number
+        if self._last_block is None:
+            self._last_block = latest_block
+            self._chunk_size = EventFilter.CHAIN_CHUNK_SIZES.get(
+                str(Web3Provider.get_network_id(self._web3)), self._chunk_size)
+
+        with self._lock:
+            new_subscriptions, self._new_subscriptions = self._new_subscriptions, []
+        for subscription in new_subscriptions:
+            self._backfill(subscription)
+
+        if latest_block <= self._last_block:
+            return
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions.values() if s.active]
+        if not subscriptions:
+            self._last_block = latest_block
+            return
+
+        log_filter = {
+            'address': sorted({s.address for s in subscriptions}),
+            'topics': [sorted({s.topic for s in subscriptions})],
+        }
+        while self._last_block < latest_block:
+            from_block = self._last_block + 1
+            to_block = latest_block
+            if self._chunk_size is not None:
+                to_block = min(from_block + self._chunk_size - 1, latest_block)
+            size = to_block - from_block + 1
+            try:
+                logs = self._web3.eth.get_logs(
+                    dict(log_filter, fromBlock=from_block, toBlock=to_block))
+            except ValueError as e:
+                if not EventFilter._is_range_error(e) or size <= EventFilter.MIN_CHUNK_SIZE:
+                    raise
+                self._chunk_size = max(size // 2, EventFilter.MIN_CHUNK_SIZE)
+                logger.debug(f'log query of blocks {from_block}-{to_block} too large, '
+                             f'polling in chunks of {self._chunk_size} blocks')
+                continue
+            self._dispatch_logs(logs, subscriptions)
+            self._last_block = to_block
+
+    def _backfill(self, subscription):
+        if subscription.backfill_filter is None or not subscription.active:
+            return
+        try:
+            for event_data in subscription.backfill_filter.get_all_entries():
+                if subscription.matches(event_data):
+                    self._deliver(subscription, event_data)
+                    if not subscription.active:
+                        return
+        except Exception as e:
+            logger.warning(f'Got error grabbing past keeper events: {e}')
+
+    def _dispatch_logs(self, logs, subscriptions):
+        by_topic = {}
+        for subscription in subscriptions:
+            by_topic.setdefault((subscription.address, subscription.topic), []).append(
+                subscription)
+
+        for log in logs:
+            if not log['topics']:
+                continue
+            key = (Web3.toChecksumAddress(log['address']), HexBytes(log['topics'][0]).hex())
+            decoded = None
+            for subscription in by_topic.get(key, []):
+                if not subscription.active:
+                    continue
+                if decoded is None:
+                    decoded = subscription.event().processLog(log)
+                if subscription.matches(decoded):
+                    self._deliver(subscription, decoded)
+
+    def _deliver(self, subscription, event_data):
+        with self._lock:
+            if not subscription.active:
+                return
+            if subscription.once:
+                subscription.active = False
+                self._subscriptions.pop(subscription.id, None)
+        if subscription.callback is not None:
+            self._executor.submit(
+                self._run_callback, subscription.callback, event_data, *subscription.args)
+
+    def _check_timeouts(self):
+        now = time.time()
+        with self._lock:
+            expired = [s for s in self._subscriptions.values()
+                       if s.deadline is not None and s.deadline < now]
+            for subscription in expired:
+                subscription.active = False
+                del self._subscriptions[subscription.id]
+        for subscription in expired:
+            if subscription.timeout_callback is not None:
+                self._executor.submit(
+                    self._run_callback, subscription.timeout_callback, *subscription.args)
+            elif subscription.callback is not None:
+                self._executor.submit(
+                    self._run_callback, subscription.callback, None, *subscription.args)
+
+    @staticmethod
+    def _run_callback(callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f'Event callback {callback} failed: {e}')
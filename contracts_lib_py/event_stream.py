@@ -0,0 +1,219 @@
+"""
+    Event Stream
+
+    Follow the logs of a contract event through chain reorganizations.
+"""
+import logging
+import threading
+from collections import deque, namedtuple
+
+from hexbytes import HexBytes
+from web3.exceptions import BlockNotFound
+
+from contracts_lib_py.event_filter import EventFilter
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+BlockHeader = namedtuple('BlockHeader', 'number hash parent_hash')
+
+StreamEvent = namedtuple('StreamEvent', 'kind log')
+StreamEvent.__doc__ = """
+A change in the logs of an `EventStream`.
+
+`kind` is `EventStream.ADDED` when the log is first seen, `EventStream.CONFIRMED` once its
+block has enough confirmations and `EventStream.REMOVED` when its block is dropped by a
+chain reorganization.
+"""
+
+
+class EventStream:
+    """
+    Stream the logs of a contract event, following chain reorganizations.
+
+    The stream keeps the headers of the recent blocks in a ring buffer. New blocks are
+    checked against the buffered headers, and when the parent hash of a block does not match
+    the stream walks back to the last common block, retracting the logs of the dropped blocks
+    with `REMOVED` events before reading the new canonical ones. Logs are reported as `ADDED`
+    when seen and as `CONFIRMED` once `confirmations` blocks have been built on top of them, so
+    consumers that must not act on logs that may vanish only handle the `CONFIRMED` ones.
+
+    Memory is bounded by `history_size` blocks: blocks older than that are considered final,
+    their logs are reported as `CONFIRMED` directly and no header is kept for them.
+
+    Example:
+        stream = EventStream(condition.events.Fulfilled, {'_agreementId': agreement_id})
+        for stream_event in stream.poll():
+            if stream_event.kind == EventStream.CONFIRMED:
+                ...
+    """
+    ADDED = 'added'
+    CONFIRMED = 'confirmed'
+    REMOVED = 'removed'
+
+    def __init__(self, event, argument_filters=None, confirmations=12, from_block=None,
+                 history_size=None, web3=None):
+        """
+
+        :param event: contract event class, e.g. `contract.events.Fulfilled`
+        :param argument_filters: dict of event argument names and the values to match
+        :param confirmations: int number of blocks built on top of a block before its logs
+            are confirmed
+        :param from_block: int first block to stream, defaults to the chain head
+        :param history_size: int number of recent block headers kept, must be larger than
+            `confirmations`. Defaults to `confirmations + 64`.
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+        """
+        history_size = history_size or confirmations + 64
+        assert history_size > confirmations, '`history_size` must be larger than ' \
+                                             '`confirmations`.'
+        self.event = event
+        self.argument_filters = argument_filters or {}
+        self.confirmations = confirmations
+        self.history_size = history_size
+        self._web3 = web3 or Web3Provider.get_web3()
+        self._event_filter = EventFilter(
+            event.event_name, event, self.argument_filters,
+            from_block=from_block, to_block='latest'
+        )
+        self._next_block = from_block
+        self._headers = deque()
+        self._logs = {}
+        self._confirmed_block = None
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._thread = None
+
+    @property
+    def headers(self):
+        """Return the buffered block headers, oldest first."""
+        return list(self._headers)
+
+    def poll(self):
+        """
+        Read the new blocks and return the changes in the logs since the previous poll.
+
+        :return: list of StreamEvent, in the order they happened
+        """
+        with self._lock:
+            events = []
+            head = self._web3.eth.block_number
+            if self._next_block is None:
+                self._next_block = head
+            if self._confirmed_block is None:
+                self._confirmed_block = self._next_block - 1
+
+            # blocks older than the history are final, report their logs as confirmed
+            final_block = head - self.history_size
+            if self._next_block <= final_block:
+                for log in self._event_filter.get_entries_in_range(self._next_block, final_block):
+                    events.append(StreamEvent(self.CONFIRMED, log))
+                self._next_block = final_block + 1
+                self._confirmed_block = max(self._confirmed_block, final_block)
+                self._headers.clear()
+                self._logs.clear()
+
+            events.extend(self._read_blocks(head))
+            events.extend(self._confirm_blocks(head))
+            return events
+
+    def start(self, callback, poll_interval=1.0):
+        """
+        Poll the stream in a background thread, calling `callback` with every StreamEvent.
+
+        :param callback: callable taking a StreamEvent
+        :param poll_interval: float seconds between polls
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(callback, self._stop_event, poll_interval),
+            name='EventStream', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background polling."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        self._thread = None
+        self._stop_event = None
+
+    def _run(self, callback, stop_event, poll_interval):
+        while not stop_event.is_set():
+            try:
+                for stream_event in self.poll():
+                    callback(stream_event)
+            except Exception as e:
+                logger.debug(f'Got error polling the event stream: {e}')
+            stop_event.wait(poll_interval)
+
+    def _read_blocks(self, head):
+        events = []
+        first_block = self._next_block
+        for block_number in range(first_block, head + 1):
+            header = self._get_header(block_number)
+            if header is None:
+                break
+            if self._headers and header.parent_hash != self._headers[-1].hash:
+                events.extend(self._handle_reorg())
+                return events + self._read_blocks(head)
+            self._push_header(header)
+            self._next_block = block_number + 1
+
+        if self._next_block > first_block:
+            hashes = {header.number: header.hash for header in self._headers}
+            for log in self._event_filter.get_entries_in_range(first_block, self._next_block - 1):
+                if HexBytes(log['blockHash']) != hashes.get(log['blockNumber']):
+                    # the block was replaced after its header was read
+                    events.extend(self._handle_reorg())
+                    return events + self._read_blocks(head)
+                self._logs.setdefault(hashes[log['blockNumber']], []).append(log)
+                events.append(StreamEvent(self.ADDED, log))
+        return events
+
+    def _confirm_blocks(self, head):
+        events = []
+        for header in self._headers:
+            if self._confirmed_block < header.number <= head - self.confirmations:
+                events.extend(StreamEvent(self.CONFIRMED, log)
+                              for log in self._logs.get(header.hash, []))
+                self._confirmed_block = header.number
+        return events
+
+    def _handle_reorg(self):
+        events = []
+        dropped_block = None
+        while self._headers:
+            header = self._headers[-1]
+            canonical = self._get_header(header.number)
+            if canonical is not None and canonical.hash == header.hash:
+                break
+            self._headers.pop()
+            dropped_block = header.number
+            for log in reversed(self._logs.pop(header.hash, [])):
+                events.append(StreamEvent(self.REMOVED, log))
+
+        if self._headers:
+            self._next_block = self._headers[-1].number + 1
+        else:
+            logger.warning(f'Chain reorganization deeper than the {self.history_size} blocks '
+                           f'of history of the {self.event.event_name} stream')
+            self._next_block = dropped_block if dropped_block is not None else self._next_block
+        self._confirmed_block = min(self._confirmed_block, self._next_block - 1)
+        logger.info(f'Chain reorganization from block {self._next_block}, '
+                    f'{len(events)} {self.event.event_name} logs removed')
+        return events
+
+    def _get_header(self, block_number):
+        try:
+            block = self._web3.eth.get_block(block_number)
+        except BlockNotFound:
+            return None
+        return BlockHeader(block['number'], HexBytes(block['hash']), HexBytes(block['parentHash']))
+
+    def _push_header(self, header):
+        self._headers.append(header)
+        while len(self._headers) > self.history_size:
+            self._logs.pop(self._headers.popleft().hash, None)
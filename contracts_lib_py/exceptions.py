@@ -6,5 +6,34 @@ class DIDNotFound(Exception):
     """Raised when a requested DID or a DID in the chain cannot be found."""
 
 
+class ChainIdMismatch(Exception):
+    """Raised when the ethereum client reports another chain id than the one cached for it."""
+
+    def __init__(self, cached_chain_id, chain_id):
+        super().__init__(f'Chain id {chain_id} of the ethereum client differs from the cached '
+                         f'chain id {cached_chain_id}.')
+        self.cached_chain_id = cached_chain_id
+        self.chain_id = chain_id
+
+
 class InvalidTransaction(Exception):
     """Raised when an on-chain transaction fail."""
+
+
+class TransactionReverted(InvalidTransaction):
+    """Raised when a transaction is mined but reverted."""
+
+    def __init__(self, tx_hash, receipt, reason=None):
+        super().__init__(f'Transaction {tx_hash} reverted: {reason or "no revert reason"}')
+        self.tx_hash = tx_hash
+        self.receipt = receipt
+        self.reason = reason
+
+
+class TransactionTimeout(InvalidTransaction):
+    """Raised when a transaction is not mined before the timeout."""
+
+    def __init__(self, tx_hash, timeout):
+        super().__init__(f'Transaction {tx_hash} not mined after {timeout} seconds')
+        self.tx_hash = tx_hash
+        self.timeout = timeout
@@ -0,0 +1,319 @@
+"""
+    Fee Oracle
+
+    Suggest the fee fields of a transaction from fee data cached per block.
+"""
+import logging
+import statistics
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+FeeData = namedtuple('FeeData', 'block_number base_fee priority_fees gas_price')
+FeeData.__doc__ = """
+Fee data of the network at a given block.
+
+`base_fee` is the base fee expected for the next block and `priority_fees` the priority fees
+sampled from the recent blocks. Both are None if the network does not support EIP-1559,
+in which case `gas_price` is set instead.
+"""
+
+_instances = weakref.WeakKeyDictionary()
+
+# substrings of the errors returned by the clients for the methods they do not implement
+METHOD_NOT_FOUND_MESSAGES = (
+    'method not found',
+    'does not exist/is not available',
+)
+
+
+def get_fee_oracle(web3=None):
+    """
+    Return the shared `FeeOracle` for a web3 instance.
+
+    :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+    :return: FeeOracle
+    """
+    web3 = web3 or Web3Provider.get_web3()
+    if web3 not in _instances:
+        _instances[web3] = FeeOracle(web3)
+    return _instances[web3]
+
+
+class PercentileFeeStrategy:
+    """
+    Use a percentile of the priority fees paid in the recent blocks, read with `eth_feeHistory`.
+    The max fee leaves room for the base fee to grow during `base_fee_multiplier` blocks worth
+    of increases.
+    """
+
+    def __init__(self, percentile=50, blocks=10, base_fee_multiplier=2, min_priority_fee=0):
+        """
+
+        :param percentile: float percentile of the priority fees paid in each block
+        :param blocks: int number of recent blocks sampled
+        :param base_fee_multiplier: number the base fee is multiplied by in the max fee
+        :param min_priority_fee: int lower bound of the priority fee in wei
+        """
+        self.percentile = percentile
+        self.blocks = blocks
+        self.base_fee_multiplier = base_fee_multiplier
+        self.min_priority_fee = min_priority_fee
+
+    def fees(self, fee_data):
+        """
+        Return the fee fields of a transaction.
+
+        :param fee_data: FeeData
+        :return: dict with `type`, `maxPriorityFeePerGas` and `maxFeePerGas`, or `gasPrice`
+        """
+        if fee_data.base_fee is None:
+            return {'gasPrice': fee_data.gas_price}
+        priority_fee = int(statistics.median(fee_data.priority_fees)) \
+            if fee_data.priority_fees else 0
+        priority_fee = max(priority_fee, self.min_priority_fee)
+        return {
+            'type': 2,
+            'maxPriorityFeePerGas': priority_fee,
+            'maxFeePerGas': int(fee_data.base_fee * self.base_fee_multiplier) + priority_fee
+        }
+
+
+class MultiplierFeeStrategy:
+    """Multiply the fees suggested by another strategy, e.g. to get transactions mined faster."""
+
+    def __init__(self, strategy=None, multiplier=1.25):
+        """
+
+        :param strategy: strategy whose fees are multiplied, `PercentileFeeStrategy` by default
+        :param multiplier: number the fees are multiplied by
+        """
+        self.strategy = strategy or PercentileFeeStrategy()
+        self.multiplier = multiplier
+
+    @property
+    def percentile(self):
+        return self.strategy.percentile
+
+    @property
+    def blocks(self):
+        return self.strategy.blocks
+
+    def fees(self, fee_data):
+        return {key: value if key == 'type' else int(value * self.multiplier)
+                for key, value in self.strategy.fees(fee_data).items()}
+
+
+class FixedCapFeeStrategy:
+    """Cap the fees suggested by another strategy to a fixed amount."""
+
+    def __init__(self, max_fee_per_gas, max_priority_fee_per_gas=None, strategy=None):
+        """
+
+        :param max_fee_per_gas: int upper bound in wei of the max fee, or of the gas price
+            in networks without EIP-1559
+        :param max_priority_fee_per_gas: int upper bound in wei of the priority fee
+        :param strategy: strategy whose fees are capped, `PercentileFeeStrategy` by default
+        """
+        self.strategy = strategy or PercentileFeeStrategy()
+        self.max_fee_per_gas = max_fee_per_gas
+        self.max_priority_fee_per_gas = max_priority_fee_per_gas
+
+    @property
+    def percentile(self):
+        return self.strategy.percentile
+
+    @property
+    def blocks(self):
+        return self.strategy.blocks
+
+    def fees(self, fee_data):
+        fees = self.strategy.fees(fee_data)
+        if 'gasPrice' in fees:
+            fees['gasPrice'] = min(fees['gasPrice'], self.max_fee_per_gas)
+            return fees
+        fees['maxFeePerGas'] = min(fees['maxFeePerGas'], self.max_fee_per_gas)
+        priority_cap = fees['maxFeePerGas']
+        if self.max_priority_fee_per_gas is not None:
+            priority_cap = min(priority_cap, self.max_priority_fee_per_gas)
+        fees['maxPriorityFeePerGas'] = min(fees['maxPriorityFeePerGas'], priority_cap)
+        return fees
+
+
+class FeeOracle:
+    """
+    Suggest transaction fees without querying the ethereum client for every transaction.
+
+    The fee data is read with a single `eth_feeHistory` request and cached for the block it
+    was read at. Clients without `eth_feeHistory` fall back to the pending block and
+    `eth_maxPriorityFeePerGas`, and networks without EIP-1559 to `eth_gasPrice`. A source is
+    only skipped for good once the client reports it is not supported, after any other error
+    it is tried again on the next refresh.
+
+    By default the cached data is reused for `cache_ttl` seconds. `start()` runs a background
+    thread that polls for new blocks instead, so the data is refreshed once per block and
+    `get_fees` never waits on the network.
+
+    Example:
+        oracle = get_fee_oracle(web3)
+        oracle.strategy = FixedCapFeeStrategy(200 * 10**9)
+        tx.update(oracle.get_fees())
+    """
+    CACHE_TTL = 2
+
+    def __init__(self, web3=None, strategy=None, cache_ttl=None):
+        """
+
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+        :param strategy: fee strategy, `PercentileFeeStrategy` by default
+        :param cache_ttl: float seconds the fee data is reused when not refreshed in the
+            background
+        """
+        self._web3 = web3 or Web3Provider.get_web3()
+        self._strategy = strategy or PercentileFeeStrategy()
+        self.cache_ttl = self.CACHE_TTL if cache_ttl is None else cache_ttl
+        self._fee_data = None
+        self._fetched_at = 0
+        self._unsupported_sources = set()
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._thread = None
+
+    @property
+    def strategy(self):
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, strategy):
+        with self._lock:
+            self._strategy = strategy
+            # the cached samples depend on the percentile of the strategy
+            self._fee_data = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_fee_data(self):
+        """
+        Return the cached fee data, reading it from the client if it is missing or stale.
+
+        :return: FeeData
+        """
+        with self._lock:
+            fee_data = self._fee_data
+            fresh = self.running or time.monotonic() - self._fetched_at < self.cache_ttl
+        if fee_data is not None and fresh:
+            return fee_data
+        return self.refresh()
+
+    def get_fees(self):
+        """
+        Return the fee fields to set in a transaction.
+
+        :return: dict with `type`, `maxPriorityFeePerGas` and `maxFeePerGas`, or `gasPrice`
+        """
+        return self._strategy.fees(self.get_fee_data())
+
+    def refresh(self):
+        """
+        Read the fee data from the client and cache it.
+
+        :return: FeeData
+        """
+        strategy = self._strategy
+        fee_data = self._fetch(strategy)
+        with self._lock:
+            if strategy is self._strategy:
+                self._fee_data = fee_data
+                self._fetched_at = time.monotonic()
+        return fee_data
+
+    def start(self, poll_interval=1.0):
+        """
+        Refresh the fee data in a background thread every time a new block is seen.
+
+        :param poll_interval: float seconds between checks of the latest block number
+        """
+        if self.running:
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._poll, args=(self._stop_event, poll_interval),
+            name='FeeOracle', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        self._thread = None
+        self._stop_event = None
+
+    def clear(self):
+        """Drop the cached fee data."""
+        with self._lock:
+            self._fee_data = None
+            self._fetched_at = 0
+
+    def _poll(self, stop_event, poll_interval):
+        while not stop_event.is_set():
+            try:
+                block_number = self._web3.eth.block_number
+                fee_data = self._fee_data
+                if fee_data is None or block_number > fee_data.block_number:
+                    self.refresh()
+            except Exception as e:
+                logger.debug(f'FeeOracle could not refresh the fee data: {e}')
+            stop_event.wait(poll_interval)
+
+    def _fetch(self, strategy):
+        if 'fee_history' not in self._unsupported_sources:
+            try:
+                return self._fetch_fee_history(strategy)
+            except (ValueError, KeyError, IndexError) as e:
+                self._on_source_error('fee_history', e)
+                logger.debug(f'eth_feeHistory failed, using the pending block: {e}')
+        if 'pending_block' not in self._unsupported_sources:
+            try:
+                return self._fetch_pending_block()
+            except (ValueError, KeyError) as e:
+                self._on_source_error('pending_block', e)
+                logger.debug(f'EIP-1559 fees not available, using the gas price: {e}')
+        return FeeData(self._web3.eth.block_number, None, None, self._web3.eth.gas_price)
+
+    def _on_source_error(self, source, error):
+        # a malformed response (KeyError, IndexError) means the network has no EIP-1559 fees,
+        # other client errors may be transient, e.g. a lagging node without the latest header
+        if not isinstance(error, ValueError) or self._is_method_not_found(error):
+            logger.info(f'FeeOracle source {source} is not supported: {error}')
+            self._unsupported_sources.add(source)
+
+    @staticmethod
+    def _is_method_not_found(error):
+        if error.args and isinstance(error.args[0], dict):
+            if error.args[0].get('code') == -32601:
+                return True
+        message = str(error).lower()
+        return any(text in message for text in METHOD_NOT_FOUND_MESSAGES)
+
+    def _fetch_fee_history(self, strategy):
+        history = self._web3.eth.fee_history(strategy.blocks, 'latest', [strategy.percentile])
+        rewards = [reward[0] for reward in history['reward'] if reward]
+        return FeeData(
+            history['oldestBlock'] + len(history['baseFeePerGas']) - 2,
+            history['baseFeePerGas'][-1],
+            rewards,
+            None
+        )
+
+    def _fetch_pending_block(self):
+        block = self._web3.eth.get_block('pending')
+        base_fee = block['baseFeePerGas']
+        return FeeData(block['number'] - 1, base_fee, [self._web3.eth.max_priority_fee], None)
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+
+class GasEstimateCache:
+    """
+    In-process cache of gas estimates of contract transactions.
+
+    Entries are keyed by the chain id, the contract address, the function selector, the sender and a
+    fingerprint of the shape of the calldata, so calls to the same function with arguments of
+    the same size share the estimate. A cached estimate is returned with a safety margin on top.
+
+    Transactions sent with a cached estimate are tracked, and the entry is dropped if one of
+    them runs out of gas, so the next transaction gets a fresh estimate from the client.
+
+    A cache hit also skips the pre-flight of `eth_estimateGas`, which fails before sending for
+    a transaction that would revert. Such a transaction is sent and mined instead, and the gas
+    it used is paid for.
+    """
+    MAX_TRACKED_TXS = 1024
+
+    def __init__(self, ttl=600, safety_margin=0.2, max_size=1024):
+        """
+
+        :param ttl: float seconds an estimate is kept, None to keep it until evicted
+        :param safety_margin: float fraction added on top of a cached estimate
+        :param max_size: int maximum number of estimates kept, least recently used are
+            evicted first
+        """
+        self.ttl = ttl
+        self.safety_margin = safety_margin
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._tracked_txs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(chain_id, address, data, transaction=None):
+        """
+        Return the cache key of a contract transaction.
+
+        :param chain_id: int id of the chain the transaction is sent to
+        :param address: hex str contract address
+        :param data: hex str encoded calldata
+        :param transaction: dict transaction fields, `from` and `value` are part of the key
+        :return: tuple
+        """
+        transaction = transaction or {}
+        sender = transaction.get('from')
+        return (
+            chain_id,
+            Web3.toChecksumAddress(address),
+            data[:10],
+            Web3.toChecksumAddress(sender) if sender else None,
+            bool(transaction.get('value')),
+            # abi encoding pads every argument to 32 bytes, so the length of the calldata
+            # only changes with the size of dynamic arguments
+            len(data),
+        )
+
+    def get(self, key):
+        """
+        Return the cached estimate with the safety margin applied, or None on a miss.
+
+        :param key: tuple returned by `make_key`
+        :return: int gas limit or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                estimate, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return int(estimate * (1 + self.safety_margin))
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, estimate):
+        """
+        Cache a fresh estimate.
+
+        :param key: tuple returned by `make_key`
+        :param estimate: int gas estimated by the client
+        """
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (estimate, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Drop the estimate of a key.
+
+        :param key: tuple returned by `make_key`
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def track(self, tx_hash, key, gas_limit):
+        """
+        Remember a transaction sent with a cached estimate, so its entry can be dropped if
+        the transaction runs out of gas.
+
+        :param tx_hash: hash of the transaction
+        :param key: tuple returned by `make_key`
+        :param gas_limit: int gas limit of the transaction
+        """
+        with self._lock:
+            self._tracked_txs[HexBytes(tx_hash).hex()] = (key, gas_limit)
+            while len(self._tracked_txs) > self.MAX_TRACKED_TXS:
+                self._tracked_txs.popitem(last=False)
+
+    def report_receipt(self, receipt):
+        """
+        Check the receipt of a transaction and drop the estimate it was sent with if it ran
+        out of gas.
+
+        :param receipt: transaction receipt
+        :return: bool True if the estimate was dropped
+        """
+        if not receipt:
+            return False
+        with self._lock:
+            tx_hash = HexBytes(receipt['transactionHash']).hex()
+            tracked = self._tracked_txs.pop(tx_hash, None)
+            if tracked is None or receipt['status'] == 1:
+                return False
+            key, gas_limit = tracked
+            if receipt['gasUsed'] < gas_limit:
+                # reverted for another reason, the estimate was enough
+                return False
+            logger.info(f'transaction {tx_hash} ran out of gas with a cached estimate of '
+                        f'{gas_limit}, dropping the estimate')
+            self._entries.pop(key, None)
+            return True
+
+    def clear(self):
+        """Drop every cached estimate."""
+        with self._lock:
+            self._entries.clear()
+            self._tracked_txs.clear()
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: dict with `hits`, `misses` and `size`
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
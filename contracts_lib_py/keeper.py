@@ -1,7 +1,8 @@
 import logging
 import os
+import threading
 
-from eth_utils import big_endian_to_int
+from eth_utils import big_endian_to_int, combomethod
 import nevermined_contracts
 
 from contracts_lib_py.agreements.agreement_manager import AgreementStoreManager
@@ -26,8 +27,10 @@ from contracts_lib_py.conditions.white_listing import WhitelistingCondition
 from contracts_lib_py.didregistry import DIDRegistry
 from contracts_lib_py.dispenser import Dispenser
 from contracts_lib_py.generic_contract import GenericContract, GenericContractExternal
+from contracts_lib_py.multicall import get_multicall
 from contracts_lib_py.nft_upgradeable import NFTUpgradeable
 from contracts_lib_py.nft721_upgradeable import NFT721Upgradeable
+from contracts_lib_py.profiler import Profile
 from contracts_lib_py.templates.access_template import AccessTemplate
 from contracts_lib_py.templates.access_proof_template import AccessProofTemplate
 from contracts_lib_py.templates.nft_access_proof_template import NFTAccessProofTemplate
@@ -41,12 +44,59 @@ from contracts_lib_py.templates.nft721_sales_template import NFT721SalesTemplate
 from contracts_lib_py.templates.template_manager import TemplateStoreManager
 from contracts_lib_py.token import Token
 from contracts_lib_py.utils import (add_ethereum_prefix_and_hash_msg, generate_multi_value_hash,
-                                    split_signature)
+                                    generate_multi_value_hashes, split_signature)
 from contracts_lib_py.wallet import Wallet
 from contracts_lib_py.web3.signature import SignatureFix
 from contracts_lib_py.web3_provider import Web3Provider
 
 
+class _ContractAttribute(object):
+    """
+    Keeper attribute loading a contract wrapper on first access.
+
+    The loaded instance is stored in the keeper `__dict__`, so later reads do not go through
+    the descriptor.
+    """
+
+    def __init__(self, contract_class, optional=False):
+        """
+
+        :param contract_class: ContractBase subclass of the contract
+        :param optional: bool if True the attribute is None when the contract does not
+            exist in the network
+        """
+        self.contract_class = contract_class
+        self.optional = optional
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, keeper, owner):
+        if keeper is None:
+            return self
+        with keeper._lock:
+            if self.name not in keeper.__dict__:
+                with Web3Provider.use_web3(keeper.web3):
+                    keeper.__dict__[self.name] = self.load(keeper)
+        return keeper.__dict__[self.name]
+
+    def load(self, keeper):
+        if self.optional:
+            return keeper._try_optional_contract(self.contract_class)
+        return self.contract_class.get_instance()
+
+
+class _AgreementManagerAttribute(_ContractAttribute):
+    """Load the agreement manager with the templates it resolves agreements with."""
+
+    def load(self, keeper):
+        agreement_manager = super().load(keeper)
+        agreement_manager.set_templates(
+            {template.address: template for template in keeper.templates if template})
+        return agreement_manager
+
+
 class Keeper(object):
     """The Keeper class aggregates all contracts in the Nevermined Protocol node."""
 
@@ -72,121 +122,194 @@ class Keeper(object):
         1313161556: 'aurora-betanet'
     }
 
-    def __init__(self, artifacts_path=None, contract_names=None, external_contracts=[]):
-        self.network_name = Keeper.get_network_name(Keeper.get_network_id())
+    # optional contracts (contracts that may not exist in certain networks)
+    access_proof_template = _ContractAttribute(AccessProofTemplate, optional=True)
+    access_proof_condition = _ContractAttribute(AccessProofCondition, optional=True)
+    dispenser = _ContractAttribute(Dispenser, optional=True)
+    token = _ContractAttribute(Token, optional=True)
+    nft_upgradeable = _ContractAttribute(NFTUpgradeable, optional=True)
+    nft721_upgradeable = _ContractAttribute(NFT721Upgradeable, optional=True)
+    nft_escrow_payment_condition = _ContractAttribute(NFTEscrowPaymentCondition, optional=True)
+    nft721_escrow_payment_condition = _ContractAttribute(NFT721EscrowPaymentCondition,
+                                                         optional=True)
+    nft_access_proof_template = _ContractAttribute(NFTAccessProofTemplate, optional=True)
+    nft_access_swap_template = _ContractAttribute(NFTAccessSwapTemplate, optional=True)
+    nft_sales_with_access_template = _ContractAttribute(NFTSalesWithAccessTemplate, optional=True)
+
+    # required contracts
+    did_registry = _ContractAttribute(DIDRegistry)
+    template_manager = _ContractAttribute(TemplateStoreManager)
+    access_template = _ContractAttribute(AccessTemplate)
+    escrow_compute_execution_template = _ContractAttribute(EscrowComputeExecutionTemplate)
+    agreement_manager = _AgreementManagerAttribute(AgreementStoreManager)
+    condition_manager = _ContractAttribute(ConditionStoreManager)
+    sign_condition = _ContractAttribute(SignCondition)
+    lock_payment_condition = _ContractAttribute(LockPaymentCondition)
+    escrow_payment_condition = _ContractAttribute(EscrowPaymentCondition)
+    access_condition = _ContractAttribute(AccessCondition)
+    nft_access_condition = _ContractAttribute(NFTAccessCondition)
+    compute_execution_condition = _ContractAttribute(ComputeExecutionCondition)
+    hash_lock_condition = _ContractAttribute(HashLockCondition)
+    threshold_condition = _ContractAttribute(ThresholdCondition)
+    white_listing_condition = _ContractAttribute(WhitelistingCondition)
+    nft_holder_condition = _ContractAttribute(NFTHolderCondition)
+    nft_lock_condition = _ContractAttribute(NFTLockCondition)
+    transfer_nft_condition = _ContractAttribute(TransferNFTCondition)
+    transfer_nft721_condition = _ContractAttribute(TransferNFT721Condition)
+    transfer_did_condition = _ContractAttribute(TransferDIDOwnershipCondition)
+    nft_access_template = _ContractAttribute(NFTAccessTemplate)
+    did_sales_template = _ContractAttribute(DIDSalesTemplate)
+    nft_sales_template = _ContractAttribute(NFTSalesTemplate)
+    nft721_sales_template = _ContractAttribute(NFT721SalesTemplate)
+
+    TEMPLATE_ATTRIBUTES = (
+        'access_template',
+        'nft_access_template',
+        'nft_access_proof_template',
+        'nft_access_swap_template',
+        'nft_sales_with_access_template',
+        'did_sales_template',
+        'nft_sales_template',
+        'nft721_sales_template',
+        'access_proof_template',
+        'escrow_compute_execution_template',
+    )
+    CONTRACT_ATTRIBUTES = (
+        'token',
+        'did_registry',
+        'template_manager',
+        'access_template',
+        'access_proof_template',
+        'escrow_compute_execution_template',
+        'agreement_manager',
+        'condition_manager',
+        'sign_condition',
+        'lock_payment_condition',
+        'escrow_payment_condition',
+        'nft_escrow_payment_condition',
+        'nft721_escrow_payment_condition',
+        'access_condition',
+        'access_proof_condition',
+        'nft_access_condition',
+        'compute_execution_condition',
+        'hash_lock_condition',
+        'threshold_condition',
+        'white_listing_condition',
+        'nft_holder_condition',
+        'nft_lock_condition',
+        'transfer_nft_condition',
+        'transfer_nft721_condition',
+        'transfer_did_condition',
+        'nft_access_template',
+        'did_sales_template',
+        'nft_access_proof_template',
+        'nft_access_swap_template',
+        'nft_sales_with_access_template',
+        'nft_sales_template',
+        'nft721_sales_template',
+        'dispenser',
+    )
+
+    def __init__(self, artifacts_path=None, contract_names=None, external_contracts=[],
+                 web3=None):
+        """
+        The keeper contracts are loaded on first access, `preload()` loads all of them.
+
+        A keeper is bound to the network of its web3 instance, so several keepers can work
+        with different networks in the same process.
+
+        :param artifacts_path: str path of the contract artifacts
+        :param contract_names: list of names of other contracts to load
+        :param external_contracts: list of (address, abi, name) of external contracts
+        :param web3: Web3 instance of the network, defaults to `Web3Provider.get_web3()`
+        """
         self.artifacts_path = artifacts_path or nevermined_contracts.get_artifacts_path()
+        self.web3 = web3 or Web3Provider.get_web3()
+        self._lock = threading.RLock()
+        self._network_name = None
+        self._accounts = None
 
-        # This api is not provided by polygon
-        # Not sure if it makes sense to use `eth.accounts` since in order to
-        # interact with the accounts in the node we need to be running our own node
-        try:
-            self.accounts = Web3Provider.get_web3().eth.accounts
-        except ValueError as e:
-            # method does not exist or is not available
-            if e.args[0]['code'] == -32601:
-                self.accounts = []
-            else:
-                raise
-
-        self._contract_name_to_instance = {}
+        self._contract_name_to_instance = None
         self._external_contract_name_to_instance = {}
-        if contract_names:
-            for name in contract_names:
-                contract = GenericContract(name)
-                self._contract_name_to_instance = contract
+        with Web3Provider.use_web3(self.web3):
+            if contract_names:
+                for name in contract_names:
+                    contract = GenericContract(name)
+                    setattr(self, name, contract)
+
+            for (address, abi, name) in external_contracts:
+                contract = GenericContractExternal(address, abi, name)
+                self._external_contract_name_to_instance[name] = contract
                 setattr(self, name, contract)
 
-        for (address, abi, name) in external_contracts:
-            contract = GenericContractExternal(address, abi, name)
-            self._external_contract_name_to_instance[name] = contract
-            setattr(self, name, contract)
-
-        # optional contracts (contracts that may not exist in certain networks)
-        self.access_proof_template = self._try_optional_contract(AccessProofTemplate)
-        self.access_proof_condition = self._try_optional_contract(AccessProofCondition)
-        self.dispenser = self._try_optional_contract(Dispenser)
-        self.token = self._try_optional_contract(Token)
-        self.nft_upgradeable = self._try_optional_contract(NFTUpgradeable)
-        self.nft721_upgradeable = self._try_optional_contract(NFT721Upgradeable)
-        self.nft_escrow_payment_condition = self._try_optional_contract(NFTEscrowPaymentCondition)
-        self.nft721_escrow_payment_condition = self._try_optional_contract(NFT721EscrowPaymentCondition)
-        self.nft_access_proof_template = self._try_optional_contract(NFTAccessProofTemplate)
-        self.nft_access_swap_template = self._try_optional_contract(NFTAccessSwapTemplate)
-        self.nft_sales_with_access_template = self._try_optional_contract(NFTSalesWithAccessTemplate)
-
-        # required contracts
-        self.did_registry = DIDRegistry.get_instance()
-        self.template_manager = TemplateStoreManager.get_instance()
-        self.access_template = AccessTemplate.get_instance()
-        self.escrow_compute_execution_template = EscrowComputeExecutionTemplate.get_instance()
-        self.agreement_manager = AgreementStoreManager.get_instance()
-        self.condition_manager = ConditionStoreManager.get_instance()
-        self.sign_condition = SignCondition.get_instance()
-        self.lock_payment_condition = LockPaymentCondition.get_instance()
-        self.escrow_payment_condition = EscrowPaymentCondition.get_instance()
-        self.access_condition = AccessCondition.get_instance()
-        self.nft_access_condition = NFTAccessCondition.get_instance()
-        self.compute_execution_condition = ComputeExecutionCondition.get_instance()
-        self.hash_lock_condition = HashLockCondition.get_instance()
-        self.threshold_condition = ThresholdCondition.get_instance()
-        self.white_listing_condition = WhitelistingCondition.get_instance()
-        self.nft_holder_condition = NFTHolderCondition.get_instance()
-        self.nft_lock_condition = NFTLockCondition.get_instance()
-        self.transfer_nft_condition = TransferNFTCondition.get_instance()
-        self.transfer_nft721_condition = TransferNFT721Condition.get_instance()
-        self.transfer_did_condition = TransferDIDOwnershipCondition.get_instance()
-        self.nft_access_template = NFTAccessTemplate.get_instance()
-        self.did_sales_template = DIDSalesTemplate.get_instance()
-        self.nft_sales_template = NFTSalesTemplate.get_instance()
-        self.nft721_sales_template = NFT721SalesTemplate.get_instance()
-        templates = {}
-        for i in [self.access_template, self.nft_access_template, self.nft_access_proof_template, self.nft_access_swap_template,self.nft_sales_with_access_template, self.did_sales_template, self.nft_sales_template, self.nft721_sales_template, self.access_proof_template, self.escrow_compute_execution_template]:
-            if i != None:
-                templates[i.address] = i
-        self.agreement_manager.set_templates(templates)
-        contracts = [
-            self.token,
-            self.did_registry,
-            self.template_manager,
-            self.access_template,
-            self.access_proof_template,
-            self.escrow_compute_execution_template,
-            self.agreement_manager,
-            self.condition_manager,
-            self.sign_condition,
-            self.lock_payment_condition,
-            self.escrow_payment_condition,
-            self.nft_escrow_payment_condition,
-            self.nft721_escrow_payment_condition,
-            self.access_condition,
-            self.access_proof_condition,
-            self.nft_access_condition,
-            self.compute_execution_condition,
-            self.hash_lock_condition,
-            self.threshold_condition,
-            self.white_listing_condition,
-            self.nft_holder_condition,
-            self.nft_lock_condition,
-            self.transfer_nft_condition,
-            self.transfer_nft721_condition,
-            self.transfer_did_condition,
-            self.nft_access_template,
-            self.did_sales_template,
-            self.nft_access_proof_template,
-            self.nft_access_swap_template,
-            self.nft_sales_with_access_template,
-            self.nft_sales_template,
-            self.nft721_sales_template
-        ]
-        if self.dispenser:
-            contracts.append(self.dispenser)
+    @property
+    def network_name(self):
+        if self._network_name is None:
+            self._network_name = Keeper.get_network_name(
+                Web3Provider.get_network_id(self.web3))
+        return self._network_name
+
+    @property
+    def accounts(self):
+        if self._accounts is None:
+            # This api is not provided by polygon
+            # Not sure if it makes sense to use `eth.accounts` since in order to
+            # interact with the accounts in the node we need to be running our own node
+            try:
+                self._accounts = self.web3.eth.accounts
+            except ValueError as e:
+                # method does not exist or is not available
+                if e.args[0]['code'] == -32601:
+                    self._accounts = []
+                else:
+                    raise
+        return self._accounts
+
+    @property
+    def templates(self):
+        """Return the template contracts, None for the ones missing in the network."""
+        return [getattr(self, name) for name in self.TEMPLATE_ATTRIBUTES]
+
+    def preload(self):
+        """
+        Load all the keeper contracts, for long running processes that prefer paying the
+        loading time upfront.
+
+        :return: self
+        """
+        contracts = [getattr(self, name) for name in self.CONTRACT_ATTRIBUTES]
         self._contract_name_to_instance = {contract.name: contract
                                            for contract in contracts if contract}
+        return self
+
+    def profile(self, cprofile=False):
+        """
+        Profile the calls to the contracts made within a `with` block.
+
+        Example:
+            with keeper.profile() as p:
+                keeper.did_registry.register(did_seed, checksum, url, account)
+            print(p.report())
+
+        :param cprofile: bool if True the block also runs under `cProfile`
+        :return: Profile
+        """
+        return Profile(cprofile=cprofile)
 
     @staticmethod
-    def get_instance(artifacts_path=None, contract_names=None, external_contracts=[]):
-        """Return the Keeper instance (singleton)."""
-        return Keeper(artifacts_path, contract_names, external_contracts)
+    def get_instance(artifacts_path=None, contract_names=None, external_contracts=[],
+                     web3=None):
+        """
+        Return a new Keeper bound to the network of a web3 instance. It is not a singleton,
+        every call creates another instance.
+
+        :param artifacts_path: str path of the contract artifacts
+        :param contract_names: list of names of other contracts to load
+        :param external_contracts: list of (address, abi, name) of external contracts
+        :param web3: Web3 instance of the network, defaults to `Web3Provider.get_web3()`
+        :return: Keeper
+        """
+        return Keeper(artifacts_path, contract_names, external_contracts, web3)
 
     @staticmethod
     def get_network_name(network_id):
@@ -205,16 +328,22 @@ class Keeper(object):
         return Keeper._network_name_map.get(network_id, Keeper.DEFAULT_NETWORK_NAME)
 
     @staticmethod
-    def get_network_id():
+    def _get_web3(keeper):
+        # the combomethods below can also be called on the class, that uses the default web3
+        return getattr(keeper, 'web3', None) or Web3Provider.get_web3()
+
+    @combomethod
+    def get_network_id(self):
         """
-        Return the ethereum network id calling the `web3.version.network` method.
+        Return the ethereum network id of the keeper web3 instance, read once with the
+        `net_version` method and cached.
 
         :return: Network id, int
         """
-        return int(Web3Provider.get_web3().net.version)
+        return Web3Provider.get_network_id(Keeper._get_web3(self))
 
-    @staticmethod
-    def sign_hash(msg_hash, account):
+    @combomethod
+    def sign_hash(self, msg_hash, account):
         """
         This method use `personal_sign`for signing a message. This will always prepend the
         `\x19Ethereum Signed Message:\n32` prefix before signing.
@@ -223,7 +352,7 @@ class Keeper(object):
         :param account: Account
         :return: signature
         """
-        wallet = Wallet(Web3Provider.get_web3(), account.key_file, account.password,
+        wallet = Wallet(Keeper._get_web3(self), account.key_file, account.password,
                         account.address)
         s = wallet.sign(msg_hash)
         return s.signature.hex()
@@ -249,28 +378,30 @@ class Keeper(object):
         prefixed_hash = add_ethereum_prefix_and_hash_msg(message)
         return Keeper.ec_recover(prefixed_hash, signed_message)
 
-    @staticmethod
-    def unlock_account(account):
+    @combomethod
+    def unlock_account(self, account):
         """
         Unlock the account.
 
         :param account: Account
         :return:
         """
-        return Web3Provider.get_web3().unlockAccount(account.address, account.password)
+        return Keeper._get_web3(self).unlockAccount(account.address, account.password)
 
-    @staticmethod
-    def get_ether_balance(address):
+    @combomethod
+    def get_ether_balance(self, address):
         """
         Get balance of an ethereum address.
 
         :param address: address, bytes32
         :return: balance, int
         """
-        return Web3Provider.get_web3().eth.getBalance(address, block_identifier='latest')
+        return Keeper._get_web3(self).eth.getBalance(address, block_identifier='latest')
 
     @property
     def contract_name_to_instance(self):
+        if self._contract_name_to_instance is None:
+            self.preload()
         return self._contract_name_to_instance
 
     @property
@@ -278,24 +409,51 @@ class Keeper(object):
         return self._external_contract_name_to_instance
 
     def get_contract(self, contract_name):
-        contract = self.contract_name_to_instance.get(contract_name)
-        if contract:
-            return contract
+        for name in self.CONTRACT_ATTRIBUTES:
+            attribute = getattr(Keeper, name)
+            if attribute.contract_class.CONTRACT_NAME == contract_name:
+                contract = getattr(self, name)
+                if contract:
+                    return contract
 
         contract = self.external_contract_name_to_instance.get(contract_name)
         if contract:
             return contract
 
         try:
-            return GenericContract(contract_name)
+            with Web3Provider.use_web3(self.web3):
+                return GenericContract(contract_name)
         except Exception as e:
             logging.error(f'Cannot load contract {contract_name}: {e}')
             return None
 
+    @combomethod
+    def multicall(self, calls, allow_failure=False, block_identifier='latest'):
+        """
+        Resolve several read-only contract calls in a single request.
+
+        Example:
+            keeper.multicall([
+                keeper.did_registry.contract.functions.getDIDOwner(did),
+                keeper.token.contract.functions.balanceOf(address),
+            ])
+
+        :param calls: list of bound contract functions
+        :param allow_failure: bool if True failed calls return None instead of raising
+        :param block_identifier: block number or tag to read at
+        :return: list of results in the same order as `calls`
+        """
+        return get_multicall(Keeper._get_web3(self)).call(
+            calls, block_identifier=block_identifier, allow_failure=allow_failure)
+
     @staticmethod
     def generate_multi_value_hash(types, values):
         return generate_multi_value_hash(types, values)
 
+    @staticmethod
+    def generate_multi_value_hashes(types, rows):
+        return generate_multi_value_hashes(types, rows)
+
     @staticmethod
     def _try_optional_contract(contract):
         try:
@@ -0,0 +1,180 @@
+"""
+    Multicall
+
+    Aggregate many read-only contract calls into a single `eth_call`.
+"""
+import logging
+import weakref
+
+from eth_utils import to_bytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from contracts_lib_py.web3.contract import decode_function_output
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+# Multicall3 is deployed at the same address on most EVM networks.
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+MULTICALL3_ABI = [
+    {
+        'inputs': [
+            {
+                'components': [
+                    {'internalType': 'address', 'name': 'target', 'type': 'address'},
+                    {'internalType': 'bool', 'name': 'allowFailure', 'type': 'bool'},
+                    {'internalType': 'bytes', 'name': 'callData', 'type': 'bytes'}
+                ],
+                'internalType': 'struct Multicall3.Call3[]',
+                'name': 'calls',
+                'type': 'tuple[]'
+            }
+        ],
+        'name': 'aggregate3',
+        'outputs': [
+            {
+                'components': [
+                    {'internalType': 'bool', 'name': 'success', 'type': 'bool'},
+                    {'internalType': 'bytes', 'name': 'returnData', 'type': 'bytes'}
+                ],
+                'internalType': 'struct Multicall3.Result[]',
+                'name': 'returnData',
+                'type': 'tuple[]'
+            }
+        ],
+        'stateMutability': 'payable',
+        'type': 'function'
+    }
+]
+
+_instances = weakref.WeakKeyDictionary()
+
+
+def get_multicall(web3=None):
+    """
+    Return the shared `Multicall` for a web3 instance.
+
+    :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+    :return: Multicall
+    """
+    web3 = web3 or Web3Provider.get_web3()
+    if web3 not in _instances:
+        _instances[web3] = Multicall(web3)
+    return _instances[web3]
+
+
+class Multicall:
+    """
+    Resolve many read-only contract calls with as few requests as possible.
+
+    When a Multicall3 contract is deployed in the network the calls are aggregated
+    in a single `eth_call` to `aggregate3`. Otherwise the `eth_call`s are sent together
+    in a JSON-RPC batch if the provider supports it, or one by one as a last resort.
+
+    Example:
+        multicall = Multicall(web3)
+        states = multicall.call([
+            condition_manager.contract.functions.getConditionState(_id) for _id in ids
+        ])
+    """
+    MAX_CALLS_PER_REQUEST = 500
+
+    def __init__(self, web3=None, address=None, max_calls_per_request=None):
+        """
+
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+        :param address: address of a Multicall3 contract, hex str. If not given, the
+            canonical Multicall3 address is used when there is code deployed there.
+        :param max_calls_per_request: int upper bound of calls packed in one request
+        """
+        self._web3 = web3 or Web3Provider.get_web3()
+        self._address = Web3.toChecksumAddress(address) if address else None
+        self._checked = address is not None
+        self.max_calls_per_request = max_calls_per_request or self.MAX_CALLS_PER_REQUEST
+
+    @property
+    def address(self):
+        """Return the Multicall3 address in use, or None if there is no Multicall contract."""
+        if not self._checked:
+            try:
+                if self._web3.eth.get_code(MULTICALL3_ADDRESS):
+                    self._address = MULTICALL3_ADDRESS
+            except ValueError as e:
+                logger.debug(f'Could not look up the Multicall3 contract: {e}')
+            self._checked = True
+        return self._address
+
+    def call(self, calls, block_identifier='latest', allow_failure=False):
+        """
+        Resolve a list of read-only contract calls.
+
+        :param calls: list of bound contract functions,
+            e.g. `contract.functions.getConditionState(condition_id)`
+        :param block_identifier: block number or tag to read at
+        :param allow_failure: bool if True failed calls resolve to None instead of raising
+        :return: list of decoded results in the same order as `calls`
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        chunk_size = self.max_calls_per_request
+        if self.address:
+            fetch = self._fetch_aggregated
+        elif hasattr(self._web3.provider, 'batch'):
+            fetch = self._fetch_batched
+        else:
+            fetch = self._fetch_sequential
+
+        results = []
+        for i in range(0, len(calls), chunk_size):
+            chunk = calls[i:i + chunk_size]
+            for call, (success, return_data) in zip(chunk, fetch(chunk, block_identifier)):
+                if not success:
+                    if not allow_failure:
+                        raise ContractLogicError(
+                            f'Multicall to {call.fn_name} at {call.address} failed: '
+                            f'{return_data}')
+                    results.append(None)
+                    continue
+                results.append(decode_function_output(self._web3.codec, call, return_data))
+        return results
+
+    def _fetch_aggregated(self, calls, block_identifier):
+        multicall = self._web3.eth.contract(address=self.address, abi=MULTICALL3_ABI)
+        return multicall.functions.aggregate3([
+            (call.address, True, to_bytes(hexstr=call._encode_transaction_data()))
+            for call in calls
+        ]).call(block_identifier=block_identifier)
+
+    def _fetch_batched(self, calls, block_identifier):
+        block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        with self._web3.provider.batch() as batch:
+            futures = [
+                batch.add('eth_call', [
+                    {'to': call.address, 'data': call._encode_transaction_data()},
+                    block
+                ])
+                for call in calls
+            ]
+        results = []
+        for future in futures:
+            try:
+                results.append((True, to_bytes(hexstr=future.result())))
+            except ValueError as e:
+                results.append((False, e))
+        return results
+
+    def _fetch_sequential(self, calls, block_identifier):
+        results = []
+        for call in calls:
+            try:
+                results.append((True, self._web3.eth.call(
+                    {'to': call.address, 'data': call._encode_transaction_data()},
+                    block_identifier=block_identifier
+                )))
+            except (ValueError, ContractLogicError) as e:
+                results.append((False, e))
+        return results
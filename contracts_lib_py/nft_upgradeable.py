@@ -150,6 +150,16 @@ class NFTUpgradeable(ContractBase):
         """
         return self.contract.caller.balanceOf(address, int(did, 16))
 
+    def balances(self, address, dids):
+        """
+        Returns the NFT balance of an address for several NFT ids in a single request
+
+        :param address: Account address to check, str
+        :param dids: list of NFT ids, str
+        :return: list of int
+        """
+        return self.call_batch('balanceOf', [(address, int(did, 16)) for did in dids])
+
     def transfer_nft(self, did, address, amount, account):
         tx_hash = self.send_transaction(
             'safeTransferFrom',
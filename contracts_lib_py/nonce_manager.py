@@ -0,0 +1,320 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+NONCE_ERROR_MESSAGES = (
+    'nonce too low',
+    'nonce too high',
+    'invalid nonce',
+    'replacement transaction underpriced',
+    'transaction underpriced',
+)
+
+KNOWN_TRANSACTION_MESSAGES = (
+    'already known',
+    'known transaction',
+)
+
+
+class NonceManager:
+    """
+    Allocate transaction nonces locally for each sender address.
+
+    The state of an address is kept per chain id, read from the web3 instance given to every
+    method, so an account used on several networks gets a counter for each of them.
+
+    The first allocation for an address reads the transaction count at the `pending` block tag,
+    after that nonces are handed out from memory so several transactions can be signed and
+    broadcast back to back without waiting for the previous ones to be mined.
+
+    Allocation is thread safe, and `async_next_nonce` can be used from an event loop: the lock is
+    only held for in-memory bookkeeping, never while waiting on the network.
+
+    Nonces stay pending until `confirm` is called, or until the receipt of a transaction
+    recorded with `track` is passed to `report_receipt`.
+    """
+    MAX_TRACKED_TXS = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_nonce = {}
+        self._pending = {}
+        self._tracked_txs = OrderedDict()
+        self._released = {}
+        self._sync_locks = {}
+
+    @staticmethod
+    def is_nonce_error(error):
+        """
+        Return True if the error returned by the ethereum client is caused by a wrong nonce.
+
+        :param error: Exception
+        :return: bool
+        """
+        message = str(error).lower()
+        return any(text in message for text in NONCE_ERROR_MESSAGES)
+
+    @staticmethod
+    def is_known_transaction_error(error):
+        """
+        Return True if the ethereum client rejected a transaction because that exact
+        transaction is already in its pool, i.e. the broadcast actually succeeded.
+
+        :param error: Exception
+        :return: bool
+        """
+        message = str(error).lower()
+        return any(text in message for text in KNOWN_TRANSACTION_MESSAGES)
+
+    def next_nonce(self, web3, address):
+        """
+        Allocate the next nonce for an address.
+
+        :param web3: Web3 instance
+        :param address: hex str sender address
+        :return: int
+        """
+        key = self._key(web3, address)
+        if key not in self._next_nonce:
+            with self._get_sync_lock(key):
+                if key not in self._next_nonce:
+                    self._set_chain_nonce(
+                        key, web3.eth.get_transaction_count(key[1], 'pending'))
+        return self._allocate(key)
+
+    async def async_next_nonce(self, web3, address, chain_id):
+        """
+        Allocate the next nonce for an address using an asyncio Web3 instance.
+
+        :param web3: asyncio Web3 instance
+        :param address: hex str sender address
+        :param chain_id: int chain id of the network of `web3`
+        :return: int
+        """
+        key = (chain_id, Web3.toChecksumAddress(address))
+        if key not in self._next_nonce:
+            chain_nonce = await web3.eth.get_transaction_count(key[1], 'pending')
+            if key not in self._next_nonce:
+                self._set_chain_nonce(key, chain_nonce)
+        return self._allocate(key)
+
+    def release(self, web3, address, nonce):
+        """
+        Give back a nonce whose transaction was never broadcast, so it is reused by the next
+        allocation instead of leaving a gap.
+
+        :param web3: Web3 instance
+        :param address: hex str sender address
+        :param nonce: int
+        """
+        key = self._key(web3, address)
+        with self._lock:
+            pending = self._pending.get(key, set())
+            if nonce not in pending:
+                return
+            pending.discard(nonce)
+            if nonce == self._next_nonce[key] - 1:
+                self._next_nonce[key] = nonce
+            else:
+                self._released.setdefault(key, set()).add(nonce)
+
+    def confirm(self, web3, address, nonce):
+        """
+        Stop tracking a nonce once its transaction is mined. The lower nonces of the address
+        cannot be pending anymore either, so they are dropped too.
+
+        :param web3: Web3 instance
+        :param address: hex str sender address
+        :param nonce: int
+        """
+        self._confirm(self._key(web3, address), nonce)
+
+    def track(self, web3, address, nonce, tx_hash):
+        """
+        Remember the nonce a transaction was broadcast with, so `report_receipt` can confirm it.
+
+        :param web3: Web3 instance
+        :param address: hex str sender address
+        :param nonce: int
+        :param tx_hash: hash of the transaction
+        """
+        key = self._key(web3, address)
+        with self._lock:
+            self._tracked_txs[HexBytes(tx_hash).hex()] = (key, nonce)
+            while len(self._tracked_txs) > self.MAX_TRACKED_TXS:
+                self._tracked_txs.popitem(last=False)
+
+    def report_receipt(self, receipt):
+        """
+        Confirm the nonce of a tracked transaction once its receipt is available.
+
+        :param receipt: transaction receipt
+        :return: bool True if the transaction was tracked
+        """
+        if not receipt:
+            return False
+        with self._lock:
+            tracked = self._tracked_txs.pop(HexBytes(receipt['transactionHash']).hex(), None)
+        if tracked is None:
+            return False
+        self._confirm(*tracked)
+        return True
+
+    def pending_nonces(self, web3, address):
+        """
+        Return the nonces allocated for an address that have not been confirmed yet.
+
+        :param web3: Web3 instance
+        :param address: hex str sender address
+        :return: sorted list of int
+        """
+        key = self._key(web3, address)
+        with self._lock:
+            return sorted(self._pending.get(key, set()))
+
+    def resync(self, web3, address):
+        """
+        Reset the local counter of an address to the transaction count at the `pending` block
+        tag. Call it after the client rejects a transaction because of its nonce.
+
+        :param web3: Web3 instance
+        :param address: hex str sender address
+        :return: int the next nonce that will be allocated
+        """
+        key = self._key(web3, address)
+        with self._get_sync_lock(key):
+            return self._set_resynced_nonce(
+                key, web3.eth.get_transaction_count(key[1], 'pending'))
+
+    async def async_resync(self, web3, address, chain_id):
+        """
+        Reset the local counter of an address like `resync`, using an asyncio Web3 instance.
+
+        :param web3: asyncio Web3 instance
+        :param address: hex str sender address
+        :param chain_id: int chain id of the network of `web3`
+        :return: int the next nonce that will be allocated
+        """
+        key = (chain_id, Web3.toChecksumAddress(address))
+        chain_nonce = await web3.eth.get_transaction_count(key[1], 'pending')
+        return self._set_resynced_nonce(key, chain_nonce)
+
+    def find_gaps(self, web3, address):
+        """
+        Return the nonces below the local counter that have no transaction in the client pool.
+
+        The `pending` transaction count of the client stops at the first missing nonce, so
+        anything between it and the local counter is either a gap or queued behind one.
+
+        :param web3: Web3 instance
+        :param address: hex str sender address
+        :return: sorted list of int
+        """
+        key = self._key(web3, address)
+        chain_nonce = web3.eth.get_transaction_count(key[1], 'pending')
+        with self._lock:
+            gaps = {n for n in self._released.get(key, set()) if n >= chain_nonce}
+            if self._next_nonce.get(key, chain_nonce) > chain_nonce:
+                gaps.add(chain_nonce)
+        return sorted(gaps)
+
+    def fill_gaps(self, web3, account, gas_price_multiplier=1.25):
+        """
+        Send a zero value transfer to itself for every nonce gap of an account, so the
+        transactions queued behind the gaps can be mined.
+
+        :param web3: Web3 instance
+        :param account: Account with `key_file` and `password` to sign the transactions
+        :param gas_price_multiplier: float applied to the current gas price
+        :return: list of transaction hashes
+        """
+        from contracts_lib_py.wallet import Wallet
+
+        key = self._key(web3, account.address)
+        address = key[1]
+        wallet = Wallet(web3, account.key_file, account.password, address)
+        tx_hashes = []
+        for nonce in self.find_gaps(web3, address):
+            tx = {
+                'from': address,
+                'to': address,
+                'value': 0,
+                'gas': 21000,
+                'gasPrice': int(web3.eth.gas_price * gas_price_multiplier),
+                'nonce': nonce,
+                'chainId': key[0],
+            }
+            logger.info(f'filling nonce gap {nonce} for {address}')
+            tx_hashes.append(web3.eth.send_raw_transaction(wallet.sign_prepared_tx(tx)))
+            with self._lock:
+                self._released.get(key, set()).discard(nonce)
+                self._pending.setdefault(key, set()).add(nonce)
+            self.track(web3, address, nonce, tx_hashes[-1])
+        return tx_hashes
+
+    def reset(self, web3=None, address=None):
+        """
+        Forget the local state of an address on the network of a web3 instance, or of all
+        addresses on all networks.
+
+        :param web3: Web3 instance, required with `address`
+        :param address: hex str sender address
+        """
+        if address is None:
+            with self._lock:
+                self._next_nonce.clear()
+                self._pending.clear()
+                self._released.clear()
+                self._tracked_txs.clear()
+            return
+        key = self._key(web3, address)
+        with self._lock:
+            self._next_nonce.pop(key, None)
+            self._pending.pop(key, None)
+            self._released.pop(key, None)
+
+    @staticmethod
+    def _key(web3, address):
+        return Web3Provider.get_chain_id(web3), Web3.toChecksumAddress(address)
+
+    def _get_sync_lock(self, key):
+        with self._lock:
+            return self._sync_locks.setdefault(key, threading.Lock())
+
+    def _set_chain_nonce(self, key, chain_nonce):
+        with self._lock:
+            self._next_nonce.setdefault(key, chain_nonce)
+
+    def _set_resynced_nonce(self, key, chain_nonce):
+        with self._lock:
+            logger.debug(f'resync nonce for {key[1]} on chain {key[0]}: local '
+                         f'{self._next_nonce.get(key)}, pending block {chain_nonce}')
+            self._next_nonce[key] = chain_nonce
+            self._pending[key] = {n for n in self._pending.get(key, set()) if n < chain_nonce}
+            self._released.pop(key, None)
+        return chain_nonce
+
+    def _confirm(self, key, nonce):
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending:
+                pending.difference_update([n for n in pending if n <= nonce])
+
+    def _allocate(self, key):
+        with self._lock:
+            released = self._released.get(key)
+            if released:
+                nonce = min(released)
+                released.discard(nonce)
+            else:
+                nonce = self._next_nonce[key]
+                self._next_nonce[key] = nonce + 1
+            self._pending.setdefault(key, set()).add(nonce)
+            return nonce
@@ -0,0 +1,351 @@
+"""
+    Profiler
+
+    Per method breakdown of the calls to the contract wrappers: wall time, JSON-RPC requests
+    and bytes, and the time spent waiting for the node, signing and decoding ABI data.
+
+    The public methods of the `ContractBase` subclasses are only wrapped while a profile is
+    open, so profiling costs nothing until it is used.
+"""
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import pstats
+import threading
+import time
+
+from eth_abi.codec import ABICodec
+from eth_account import Account
+
+from contracts_lib_py.contract_base import ContractBase
+from contracts_lib_py.web3 import rpc_metrics
+
+_profile = contextvars.ContextVar('profile', default=None)
+_frames = contextvars.ContextVar('profile_frames', default=())
+
+# functions timed as a phase of the profiled methods, besides the JSON-RPC requests
+_PHASE_FUNCTIONS = (
+    (Account, 'decrypt', 'sign'),
+    (Account, 'sign_transaction', 'sign'),
+    (Account, 'signHash', 'sign'),
+    (Account, 'sign_message', 'sign'),
+    (ABICodec, 'decode_abi', 'decode'),
+    (ABICodec, 'decode_single', 'decode'),
+)
+
+_install_lock = threading.Lock()
+_install_count = 0
+_originals = []
+
+
+class _Stats:
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.rpc_count = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.io = 0.0
+        self.sign = 0.0
+        self.decode = 0.0
+        self.rpc_methods = {}
+
+    def add_rpc(self, event):
+        self.rpc_count += 1
+        self.request_bytes += event.request_bytes
+        self.response_bytes += event.response_bytes
+        self.io += event.duration
+        self.rpc_methods[event.method] = self.rpc_methods.get(event.method, 0) + 1
+
+    def merge(self, other):
+        self.rpc_count += other.rpc_count
+        self.request_bytes += other.request_bytes
+        self.response_bytes += other.response_bytes
+        self.io += other.io
+        self.sign += other.sign
+        self.decode += other.decode
+        for method, count in other.rpc_methods.items():
+            self.rpc_methods[method] = self.rpc_methods.get(method, 0) + count
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'wall': self.wall,
+            'rpc_count': self.rpc_count,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'io': self.io,
+            'sign': self.sign,
+            'decode': self.decode,
+            'other': max(self.wall - self.io - self.sign - self.decode, 0.0),
+            'rpc_methods': dict(self.rpc_methods),
+        }
+
+
+class _Frame:
+    """A running call of a profiled method."""
+
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        self.stats = _Stats()
+        self.children_wall = 0.0
+
+
+class Profile:
+    """
+    Profile the calls to the contract wrappers made within a `with` block.
+
+    Every public method of the `ContractBase` subclasses called in the block is recorded with
+    its wall time, the JSON-RPC requests and bytes sent by the http providers, and the time
+    spent in the requests (io), signing transactions and messages (sign) and decoding ABI data
+    (decode). The counters of a method include the ones of the methods it calls, e.g.
+    `DIDRegistry.register` includes `DIDRegistry.get_tx_receipt`.
+
+    Only the calls made in the context entering the block are recorded, not the ones of other
+    threads.
+
+    Example:
+        with keeper.profile(cprofile=True) as p:
+            keeper.did_registry.register(did_seed, checksum, url, account)
+        print(p.report())
+        p.dump_stats('register.prof')
+    """
+
+    def __init__(self, cprofile=False):
+        """
+
+        :param cprofile: bool if True the block also runs under `cProfile`
+        """
+        self.cprofile = cprofile
+        self.total = _Stats()
+        self._methods = {}
+        self._folded = {}
+        self._profiler = None
+        self._tokens = None
+        self._start = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        _install()
+        self._tokens = (_profile.set(self), _frames.set(()))
+        if self.cprofile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.total.wall += time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+        _profile.reset(self._tokens[0])
+        _frames.reset(self._tokens[1])
+        _uninstall()
+
+    def snapshot(self):
+        """
+        Return the breakdown of the profiled methods, slowest first.
+
+        :return: list of dict, one per method
+        """
+        with self._lock:
+            snapshot = [dict(stats.to_dict(), method=key) for key, stats in self._methods.items()]
+        return sorted(snapshot, key=lambda item: item['wall'], reverse=True)
+
+    def report(self):
+        """
+        Return the breakdown of the profiled methods as a text table, times in milliseconds.
+
+        :return: str
+        """
+        columns = ('calls', 'wall', 'io', 'sign', 'decode', 'other', 'rpc_count',
+                   'request_bytes', 'response_bytes')
+        rows = [[item['method']] + [self._format(name, item[name]) for name in columns]
+                for item in self.snapshot()]
+        total = self.total.to_dict()
+        rows.append(['total'] + [self._format(name, total[name]) if name != 'calls' else ''
+                                 for name in columns])
+        header = ['method'] + [name.replace('_', ' ') for name in columns]
+        widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+        lines = [' '.join(
+            cell.ljust(widths[i]) if i == 0 else cell.rjust(widths[i])
+            for i, cell in enumerate(row)) for row in [header] + rows]
+        return '\n'.join(lines)
+
+    def to_folded(self):
+        """
+        Return the self time of the profiled methods by call stack in the folded format of
+        flamegraph.pl and speedscope, e.g. `DIDRegistry.register;DIDRegistry.hash_did 1200`.
+
+        :return: str, one stack and its microseconds per line
+        """
+        with self._lock:
+            items = sorted(self._folded.items())
+        return ''.join(f'{";".join(path)} {int(wall * 1e6)}\n' for path, wall in items)
+
+    @property
+    def stats(self):
+        """
+        Return the `cProfile` statistics of the block.
+
+        :return: pstats.Stats, None if the profile was not created with `cprofile=True`
+        """
+        if self._profiler is None:
+            return None
+        return pstats.Stats(self._profiler, stream=io.StringIO())
+
+    def dump_stats(self, path):
+        """
+        Write the `cProfile` statistics of the block to a file, readable with `pstats`,
+        snakeviz or flameprof.
+
+        :param path: str path of the file
+        """
+        assert self._profiler is not None, 'the profile was not created with `cprofile=True`.'
+        self._profiler.dump_stats(path)
+
+    def _call(self, key, fn, args, kwargs):
+        frames = _frames.get()
+        if frames and frames[-1].key == key:
+            # an override calling the method of its base class
+            return fn(*args, **kwargs)
+        frame = _Frame(key, frames[-1].path + (key,) if frames else (key,))
+        token = _frames.set(frames + (frame,))
+        start = time.perf_counter()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            _frames.reset(token)
+            if frames:
+                frames[-1].children_wall += wall
+                # the counters of a method include the ones of the methods it calls
+                frames[-1].stats.merge(frame.stats)
+            self._record(frame, wall, failed)
+
+    def _record(self, frame, wall, failed):
+        with self._lock:
+            stats = self._methods.get(frame.key)
+            if stats is None:
+                stats = self._methods[frame.key] = _Stats()
+            stats.calls += 1
+            stats.errors += int(failed)
+            stats.wall += wall
+            stats.merge(frame.stats)
+            self._folded[frame.path] = (self._folded.get(frame.path, 0.0) +
+                                        max(wall - frame.children_wall, 0.0))
+
+    def _add_rpc(self, event):
+        frames = _frames.get()
+        with self._lock:
+            self.total.add_rpc(event)
+            if frames:
+                frames[-1].stats.add_rpc(event)
+
+    def _add_phase(self, phase, duration):
+        frames = _frames.get()
+        with self._lock:
+            setattr(self.total, phase, getattr(self.total, phase) + duration)
+            if frames:
+                setattr(frames[-1].stats, phase, getattr(frames[-1].stats, phase) + duration)
+
+    @staticmethod
+    def _format(name, value):
+        if isinstance(value, float):
+            return f'{value * 1000:.1f}'
+        return str(value)
+
+
+def _on_rpc_event(event):
+    profile = _profile.get()
+    if profile is not None:
+        profile._add_rpc(event)
+
+
+def _wrap_method(key_name, fn):
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        profile = _profile.get()
+        if profile is None:
+            return fn(self, *args, **kwargs)
+        return profile._call(f'{type(self).__name__}.{key_name}', fn, (self,) + args, kwargs)
+
+    return wrapper
+
+
+class _PhaseDescriptor:
+    """
+    Time the calls of a function, static, class or eth_account `combomethod` attribute as a
+    phase of the profiled methods.
+    """
+
+    def __init__(self, phase, attribute):
+        self.phase = phase
+        self.attribute = attribute
+
+    def __get__(self, obj, objtype=None):
+        fn = self.attribute.__get__(obj, objtype)
+        phase = self.phase
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profile = _profile.get()
+            if profile is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile._add_phase(phase, time.perf_counter() - start)
+
+        return wrapper
+
+
+def _get_subclasses(cls):
+    classes = [cls]
+    for subclass in cls.__subclasses__():
+        classes.extend(c for c in _get_subclasses(subclass) if c not in classes)
+    return classes
+
+
+def _install():
+    global _install_count
+    with _install_lock:
+        _install_count += 1
+        if _install_count > 1:
+            return
+        for cls in _get_subclasses(ContractBase):
+            for name, attr in list(vars(cls).items()):
+                if not name.startswith('_') and inspect.isfunction(attr):
+                    _originals.append((cls, name, attr))
+                    setattr(cls, name, _wrap_method(name, attr))
+        for cls, name, phase in _PHASE_FUNCTIONS:
+            # the function may be inherited, it is then shadowed on `cls` until uninstalled
+            _originals.append((cls, name, vars(cls).get(name)))
+            setattr(cls, name, _PhaseDescriptor(phase, inspect.getattr_static(cls, name)))
+        rpc_metrics.add_hook(_on_rpc_event)
+
+
+def _uninstall():
+    global _install_count
+    with _install_lock:
+        _install_count -= 1
+        if _install_count > 0:
+            return
+        rpc_metrics.remove_hook(_on_rpc_event)
+        while _originals:
+            cls, name, original = _originals.pop()
+            if original is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, original)
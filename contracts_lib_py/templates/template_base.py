@@ -56,6 +56,15 @@ class TemplateBase(ContractBase):
         consumer, provider = self.contract.caller.getAgreementData(agreement_id)
         return consumer, provider
 
+    def get_agreements_data(self, agreement_ids):
+        """
+
+        :param agreement_ids: list of agreement ids, hex str
+        :return: list of (consumer, provider) tuples
+        """
+        return [tuple(data) for data in
+                self.call_batch('getAgreementData', [(_id,) for _id in agreement_ids])]
+
     def get_agreement_consumer(self, agreement_id):
         """
 
@@ -16,6 +16,15 @@ class Token(ContractBase):
         """
         return self.contract.caller.balanceOf(account_address)
 
+    def get_token_balances(self, account_addresses):
+        """
+        Retrieve the amount of tokens of several account addresses in a single request.
+
+        :param account_addresses: list of account addresses, str
+        :return: list of int
+        """
+        return self.call_batch('balanceOf', [(address,) for address in account_addresses])
+
     def get_allowance(self, owner_address, spender_address):
         """
 
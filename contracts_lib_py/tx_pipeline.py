@@ -0,0 +1,227 @@
+"""
+    Transaction Pipeline
+
+    Broadcast transactions without waiting for each other and track their receipts together.
+"""
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3._utils.method_formatters import receipt_formatter
+from web3.exceptions import ContractLogicError, TransactionNotFound
+
+from contracts_lib_py.exceptions import TransactionReverted, TransactionTimeout
+from contracts_lib_py.wallet import Wallet
+from contracts_lib_py.web3.contract import CustomContractFunction
+from contracts_lib_py.web3_provider import Web3Provider
+
+logger = logging.getLogger(__name__)
+
+_instances = weakref.WeakKeyDictionary()
+
+
+def get_tx_pipeline(web3=None):
+    """
+    Return the shared `TransactionPipeline` for a web3 instance.
+
+    :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+    :return: TransactionPipeline
+    """
+    web3 = web3 or Web3Provider.get_web3()
+    if web3 not in _instances:
+        _instances[web3] = TransactionPipeline(web3)
+    return _instances[web3]
+
+
+class _PendingTransaction:
+
+    def __init__(self, tx_hash, future, deadline, timeout):
+        self.tx_hash = tx_hash
+        self.future = future
+        self.deadline = deadline
+        self.timeout = timeout
+        self.checked = False
+
+
+class TransactionPipeline:
+    """
+    Track the receipts of many transactions with a single polling thread.
+
+    Every tracked transaction gets a `Future` that resolves to its receipt once mined, or
+    fails with `TransactionReverted` (with the revert reason when the client returns it) or
+    `TransactionTimeout`. New blocks are read once for all the pending transactions, using
+    `eth_getBlockReceipts` when the client supports it and the block transaction hashes
+    otherwise, so the time to confirm many transactions is bound by the blocks they need
+    rather than by a receipt round trip per transaction.
+
+    The polling thread only runs while there are pending transactions.
+
+    Example:
+        pipeline = get_tx_pipeline(web3)
+        futures = [pipeline.submit_raw(raw_tx) for raw_tx in signed_txs]
+        receipts = [future.result() for future in futures]
+    """
+    POLL_INTERVAL = 1.0
+    TIMEOUT = 120
+
+    def __init__(self, web3=None, poll_interval=None, timeout=None):
+        """
+
+        :param web3: Web3 instance, defaults to `Web3Provider.get_web3()`
+        :param poll_interval: float seconds between checks for new blocks
+        :param timeout: float default seconds a transaction is tracked before it times out
+        """
+        self._web3 = web3 or Web3Provider.get_web3()
+        self.poll_interval = poll_interval or self.POLL_INTERVAL
+        self.timeout = timeout or self.TIMEOUT
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_block = None
+        self._block_receipts_supported = None
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def submit_raw(self, raw_tx, timeout=None):
+        """
+        Broadcast a signed transaction and track its receipt.
+
+        :param raw_tx: raw signed transaction, bytes
+        :param timeout: float seconds to wait for the receipt
+        :return: Future resolving to the transaction receipt
+        """
+        return self.track(self._web3.eth.send_raw_transaction(raw_tx), timeout)
+
+    def track(self, tx_hash, timeout=None):
+        """
+        Track the receipt of a transaction that was already broadcast.
+
+        :param tx_hash: hash of the transaction
+        :param timeout: float seconds to wait for the receipt
+        :return: Future resolving to the transaction receipt
+        """
+        tx_hash = HexBytes(tx_hash).hex()
+        timeout = timeout or self.timeout
+        with self._lock:
+            pending = self._pending.get(tx_hash)
+            if pending is None:
+                pending = _PendingTransaction(
+                    tx_hash, Future(), time.monotonic() + timeout, timeout)
+                self._pending[tx_hash] = pending
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='TransactionPipeline', daemon=True)
+                self._thread.start()
+        return pending.future
+
+    def wait(self, futures, timeout=None):
+        """
+        Wait for several futures and return their receipts, or the exception they failed with.
+
+        :param futures: list of Future returned by `track` or `submit_raw`
+        :param timeout: float seconds to wait for each future
+        :return: list of receipts or exceptions in the same order as `futures`
+        """
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    self._last_block = None
+                    return
+            try:
+                self._poll()
+            except Exception as e:
+                logger.warning(f'TransactionPipeline failed to poll for receipts: {e}')
+            self._check_timeouts()
+            time.sleep(self.poll_interval)
+
+    def _poll(self):
+        latest_block = self._web3.eth.block_number
+        if self._last_block is None:
+            self._last_block = latest_block
+
+        # transactions may be mined before the first poll, check them individually once
+        for pending in [p for p in list(self._pending.values()) if not p.checked]:
+            try:
+                self._resolve(self._web3.eth.get_transaction_receipt(pending.tx_hash))
+            except TransactionNotFound:
+                pass
+            pending.checked = True
+
+        for block_number in range(self._last_block + 1, latest_block + 1):
+            for receipt in self._get_block_receipts(block_number):
+                self._resolve(receipt)
+            self._last_block = block_number
+
+    def _check_timeouts(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [p for p in self._pending.values() if p.deadline <= now]
+            for pending in expired:
+                del self._pending[pending.tx_hash]
+        for pending in expired:
+            pending.future.set_exception(TransactionTimeout(pending.tx_hash, pending.timeout))
+
+    def _get_block_receipts(self, block_number):
+        if self._block_receipts_supported is not False:
+            try:
+                receipts = self._web3.manager.request_blocking(
+                    'eth_getBlockReceipts', [hex(block_number)])
+                self._block_receipts_supported = True
+                return [receipt_formatter(receipt) for receipt in receipts or []]
+            except ValueError as e:
+                if self._block_receipts_supported:
+                    raise
+                logger.debug(f'eth_getBlockReceipts is not supported: {e}')
+                self._block_receipts_supported = False
+
+        block = self._web3.eth.get_block(block_number)
+        tx_hashes = [HexBytes(tx_hash).hex() for tx_hash in block['transactions']]
+        return [self._web3.eth.get_transaction_receipt(tx_hash)
+                for tx_hash in tx_hashes if tx_hash in self._pending]
+
+    def _resolve(self, receipt):
+        tx_hash = HexBytes(receipt['transactionHash']).hex()
+        with self._lock:
+            pending = self._pending.pop(tx_hash, None)
+        if pending is None:
+            return
+        Wallet.nonce_manager.report_receipt(receipt)
+        if CustomContractFunction.gas_estimate_cache is not None:
+            CustomContractFunction.gas_estimate_cache.report_receipt(receipt)
+        if receipt['status'] == 1:
+            pending.future.set_result(receipt)
+        else:
+            pending.future.set_exception(
+                TransactionReverted(tx_hash, receipt, self._get_revert_reason(receipt)))
+
+    def _get_revert_reason(self, receipt):
+        try:
+            tx = self._web3.eth.get_transaction(receipt['transactionHash'])
+            self._web3.eth.call({
+                'to': tx['to'],
+                'from': tx['from'],
+                'value': tx['value'],
+                'data': tx['input'],
+            }, receipt['blockNumber'] - 1)
+        except ContractLogicError as e:
+            return str(e)
+        except Exception as e:
+            logger.debug(f'Could not replay transaction '
+                         f'{HexBytes(receipt["transactionHash"]).hex()}: {e}')
+        return None
@@ -1,20 +1,31 @@
+import functools
 import logging
 import os
 import time
 from collections import namedtuple
 
 from eth_keys import KeyAPI
-from eth_utils import big_endian_to_int
+from eth_utils import big_endian_to_int, keccak, remove_0x_prefix
+from hexbytes import HexBytes
 from web3 import Web3
+from web3._utils.abi import (is_address_type, is_array_type, is_bool_type, is_bytes_type,
+                             is_int_type, is_string_type, is_uint_type, size_of_type,
+                             sub_type_of_array_type)
 from web3.contract import ContractEvent
 from web3._utils.encoding import to_bytes
 from web3._utils.threads import Timeout
+from web3._utils.validation import validate_address
 
 from contracts_lib_py.account import Account
+from contracts_lib_py.web3.retry import backoff_delay
 from contracts_lib_py.web3_provider import Web3Provider
 
 Signature = namedtuple('Signature', ('v', 'r', 's'))
 
+# seconds of the first and the maximum interval between fulfill retries
+FULFILL_RETRY_DELAY = 1
+FULFILL_MAX_RETRY_DELAY = 30
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +46,61 @@ def generate_multi_value_hash(types, values):
     )
 
 
+def generate_multi_value_hashes(types, rows):
+    """
+    Return the hashes of many lists of values of the same types, as `generate_multi_value_hash`
+    does for every list.
+
+    The packing of every type is resolved once, so the values are packed and hashed in a tight
+    loop instead of being normalized and hex encoded value by value.
+
+    :param types: list of solidity types expressed as strings
+    :param rows: iterable of lists of values matching the `types` list
+    :return: list of bytes
+    """
+    packers = [_get_packer(abi_type) for abi_type in types]
+    hashes = []
+    for values in rows:
+        assert len(values) == len(packers)
+        hashes.append(HexBytes(keccak(b''.join(
+            pack(value) for pack, value in zip(packers, values)))))
+    return hashes
+
+
+def _get_packer(abi_type, force_size=None):
+    """
+    Return a function packing a value of a solidity type, as `Web3.solidityKeccak` does.
+
+    :param abi_type: solidity type expressed as a string
+    :param force_size: int size in bits of the packed value, used for the array elements
+    :return: callable taking a value and returning bytes
+    """
+    if is_array_type(abi_type):
+        pack_item = _get_packer(sub_type_of_array_type(abi_type), 256)
+        return lambda values: b''.join(pack_item(value) for value in values)
+
+    size = force_size or size_of_type(abi_type)
+    if is_bool_type(abi_type) or is_uint_type(abi_type):
+        return lambda value: value.to_bytes(size // 8, 'big')
+    if is_int_type(abi_type):
+        return lambda value: value.to_bytes(size // 8, 'big', signed=True)
+    if is_address_type(abi_type):
+        return lambda value: _pack_address(value, size)
+    if is_bytes_type(abi_type):
+        return lambda value: bytes(value) if isinstance(value, (bytes, bytearray)) \
+            else bytes.fromhex(remove_0x_prefix(value))
+    if is_string_type(abi_type):
+        return lambda value: value.encode('utf-8')
+    raise ValueError(f'Unsupported ABI type: {abi_type}')
+
+
+@functools.lru_cache(maxsize=4096)
+def _pack_address(address, size):
+    # the same addresses repeat in the rows, validating their checksum is the slow part
+    validate_address(address)
+    return bytes.fromhex(remove_0x_prefix(address).zfill(size // 4))
+
+
 def prepare_prefixed_hash(msg_hash):
     """
 
@@ -224,7 +290,7 @@ def process_fulfill_condition(args, condition_contract, condition_id, logger_han
             logger_handle.debug(
                 f'done trial {i} {contract_name}.fulfill for agreement {agreement_id}, success?: '
                 f'{bool(success)}')
-            time.sleep(2)
+            time.sleep(backoff_delay(i, FULFILL_RETRY_DELAY, FULFILL_MAX_RETRY_DELAY))
 
         except Exception as e:
             if keeper.condition_manager.get_condition_state(condition_id) == 2:
@@ -238,4 +304,4 @@ def process_fulfill_condition(args, condition_contract, condition_id, logger_han
             else:
                 logger_handle.debug(
                     f'Error when doing {contract_name}.fulfill for agreement {agreement_id}: retrying trial # {i}')
-                time.sleep(2)
+                time.sleep(backoff_delay(i, FULFILL_RETRY_DELAY, FULFILL_MAX_RETRY_DELAY))
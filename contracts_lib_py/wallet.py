@@ -1,15 +1,125 @@
+import hashlib
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from contracts_lib_py.fee_oracle import get_fee_oracle
+from contracts_lib_py.nonce_manager import NonceManager
 
 logger = logging.getLogger(__name__)
 
 
+class KeyCache:
+    """
+    In-process cache of decrypted private keys.
+
+    Entries are keyed by the keyfile path and a digest of the password, so the password itself
+    is never kept. The keys are stored in bytearrays that are zeroed when an entry expires,
+    is evicted or the cache is cleared. An entry is also dropped if the keyfile is modified.
+    """
+
+    def __init__(self, ttl=300, max_size=32):
+        """
+
+        :param ttl: float seconds a decrypted key is kept, None to keep it until evicted
+        :param max_size: int maximum number of keys kept, least recently used are evicted first
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(key_file, password):
+        password_digest = hashlib.sha256((password or '').encode('utf-8')).digest()
+        return os.path.realpath(key_file), password_digest
+
+    def get(self, key_file, password, loader):
+        """
+        Return the private key for a keyfile, calling `loader` to decrypt it on a miss.
+
+        :param key_file: str path to the encrypted keyfile
+        :param password: str password of the keyfile
+        :param loader: callable returning the decrypted private key, bytes
+        :return: private key, bytes
+        """
+        cache_key = self._cache_key(key_file, password)
+        mtime = os.path.getmtime(key_file)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                key, entry_mtime, expires_at = entry
+                if entry_mtime == mtime and (expires_at is None or expires_at > time.monotonic()):
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return bytes(key)
+                self._remove(cache_key)
+            self.misses += 1
+
+        private_key = loader()
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[cache_key] = (bytearray(private_key), mtime, expires_at)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+        return bytes(private_key)
+
+    def evict(self, key_file, password=None):
+        """
+        Evict the keys cached for a keyfile.
+
+        :param key_file: str path to the encrypted keyfile
+        :param password: str only evict the key decrypted with this password
+        """
+        with self._lock:
+            if password is not None:
+                cache_key = self._cache_key(key_file, password)
+                if cache_key in self._entries:
+                    self._remove(cache_key)
+                return
+            path = os.path.realpath(key_file)
+            for cache_key in [k for k in self._entries if k[0] == path]:
+                self._remove(cache_key)
+
+    def clear(self):
+        """Evict every cached key."""
+        with self._lock:
+            for cache_key in list(self._entries):
+                self._remove(cache_key)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: dict with `hits`, `misses` and `size`
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, cache_key):
+        key = self._entries.pop(cache_key)[0]
+        for i in range(len(key)):
+            key[i] = 0
+
+
 class Wallet:
     """
     The wallet is responsible for signing transactions and messages by using an account's
     private key.
 
     The private key is always red from the encrypted keyfile and is never saved in memory beyond
-    the life span of the signing function.
+    the life span of the signing function, unless the key cache is enabled with
+    `Wallet.enable_key_cache()`. Decrypting the keyfile is expensive, so processes signing many
+    transactions with the same account can opt in to keep the decrypted keys in memory.
 
     The use of this wallet allows Nevermined tools to send rawTransactions which keeps the user
     key and password safe and they are never sent outside. Another advantage of this is that
@@ -24,8 +134,9 @@ class Wallet:
     for communicating with the secret store nodes.
 
     """
-    _last_tx_count = dict()
     MIN_GAS_PRICE = 1000000000
+    key_cache = None
+    nonce_manager = NonceManager()
 
     def __init__(self, web3, key_file, password, address=None):
         self._web3 = web3
@@ -33,7 +144,33 @@ class Wallet:
         self._password = password
         self._address = address
 
+    @staticmethod
+    def enable_key_cache(ttl=300, max_size=32):
+        """
+        Keep decrypted private keys in memory so repeated signing with the same keyfile
+        does not decrypt it every time.
+
+        :param ttl: float seconds a decrypted key is kept, None to keep it until evicted
+        :param max_size: int maximum number of keys kept
+        :return: KeyCache
+        """
+        Wallet.disable_key_cache()
+        Wallet.key_cache = KeyCache(ttl=ttl, max_size=max_size)
+        return Wallet.key_cache
+
+    @staticmethod
+    def disable_key_cache():
+        """Disable the key cache and wipe the keys it holds."""
+        if Wallet.key_cache is not None:
+            Wallet.key_cache.clear()
+        Wallet.key_cache = None
+
     def __read_key(self):
+        if Wallet.key_cache is not None:
+            return Wallet.key_cache.get(self._key_file, self._password, self.__decrypt_key)
+        return self.__decrypt_key()
+
+    def __decrypt_key(self):
         with open(self._key_file) as _file:
             encrypted_key = _file.read()
             private_key = self._web3.eth.account.decrypt(encrypted_key, self._password)
@@ -44,40 +181,51 @@ class Wallet:
         account = self._web3.eth.account.from_key(key)
         return account.address == self._address
 
+    @property
+    def address(self):
+        return self._address
+
     @staticmethod
     def _get_nonce(web3, address):
         # We cannot rely on `web3.eth.getTransactionCount` because when sending multiple
         # transactions in a row without wait in between the network may not get the chance to
         # update the transaction count for the account address in time.
         # So we have to manage this internally per account address.
-        if address not in Wallet._last_tx_count:
-            Wallet._last_tx_count[address] = web3.eth.getTransactionCount(address)
-        else:
-            Wallet._last_tx_count[address] += 1
-
-        return Wallet._last_tx_count[address]
+        return Wallet.nonce_manager.next_nonce(web3, address)
 
     def sign_tx(self, tx):
         private_key = self.__read_key()
         account = self._web3.eth.account.from_key(private_key)
-        # nonce = Wallet._get_nonce(self._web3, account.address)
-        # logger.debug(f'`Wallet` signing tx: sender address: {account.address} nonce: {nonce}, '
-        #              f'gasprice: {self._web3.eth.gasPrice}')
-        signed_tx = 0
+        if self._address is None:
+            self._address = account.address
+
+        allocated_nonce = None
+        if 'nonce' not in tx:
+            allocated_nonce = Wallet._get_nonce(self._web3, account.address)
+            tx['nonce'] = allocated_nonce
+        logger.debug(f'`Wallet` signing tx: sender address: {account.address} '
+                     f'nonce: {tx["nonce"]}')
         try:
-            priority_fee = self._web3.eth.max_priority_fee
-            gas_price = self._web3.eth.gas_price
-            base_fee = self._web3.eth.get_block("pending")['baseFeePerGas']
-            tx['type'] = 2
-            tx['nonce'] = self._web3.eth.getTransactionCount(account.address)
-            tx['maxPriorityFeePerGas'] = priority_fee
-            tx['maxFeePerGas'] = base_fee*2 + priority_fee
-            signed_tx = self._web3.eth.account.sign_transaction(tx, private_key)
-        except:
-            gas_price = self._web3.eth.gas_price
-            tx['nonce'] = self._web3.eth.getTransactionCount(account.address)
-            tx['gasPrice'] = gas_price
+            if 'gasPrice' not in tx and 'maxFeePerGas' not in tx:
+                tx.update(get_fee_oracle(self._web3).get_fees())
             signed_tx = self._web3.eth.account.sign_transaction(tx, private_key)
+        except Exception:
+            if allocated_nonce is not None:
+                Wallet.nonce_manager.release(self._web3, account.address, allocated_nonce)
+            raise
+        logger.debug(f'`Wallet` signed tx is {signed_tx}')
+        return signed_tx.rawTransaction
+
+    def sign_prepared_tx(self, tx):
+        """
+        Sign a transaction that already has its nonce and fee fields set, without any
+        call to the ethereum client.
+
+        :param tx: dict transaction
+        :return: raw signed transaction, bytes
+        """
+        private_key = self.__read_key()
+        signed_tx = self._web3.eth.account.sign_transaction(tx, private_key)
         logger.debug(f'`Wallet` signed tx is {signed_tx}')
         return signed_tx.rawTransaction
 
@@ -0,0 +1,48 @@
+import time
+
+from web3.providers.async_rpc import AsyncHTTPProvider
+
+from contracts_lib_py.web3 import rpc_metrics
+from contracts_lib_py.web3.request import async_make_post_request
+from contracts_lib_py.web3.retry import default_retry_policy
+
+
+class CustomAsyncHTTPProvider(AsyncHTTPProvider):
+    """
+    Override requests to reuse a pooled aiohttp session per event loop instead of
+    opening a new connection for every request.
+
+    Requests failing with transient http errors are retried following `retry_policy`, set it
+    to None to disable the retries. Every request is reported to the hooks of `rpc_metrics`.
+    """
+    retry_policy = default_retry_policy
+
+    async def make_request(self, method, params):
+        self.logger.debug("Making request HTTP. URI: %s, Method: %s",
+                          self.endpoint_uri, method)
+        request_data = self.encode_rpc_request(method, params)
+
+        def request():
+            return async_make_post_request(self.endpoint_uri, request_data,
+                                           **self.get_request_kwargs())
+
+        instrumented = bool(rpc_metrics.hooks)
+        start = time.perf_counter() if instrumented else None
+        try:
+            if self.retry_policy is None:
+                raw_response = await request()
+            else:
+                raw_response = await self.retry_policy.call_async(method, request)
+        except Exception as e:
+            if instrumented:
+                rpc_metrics.call_hooks(method, params, self.endpoint_uri, start,
+                                       len(request_data), 0, error=e)
+            raise
+        response = self.decode_rpc_response(raw_response)
+        if instrumented:
+            rpc_metrics.call_hooks(method, params, self.endpoint_uri, start, len(request_data),
+                                   len(raw_response), response=response)
+        self.logger.debug("Getting response HTTP. URI: %s, "
+                          "Method: %s, Response: %s",
+                          self.endpoint_uri, method, response)
+        return response
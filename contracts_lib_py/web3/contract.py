@@ -1,16 +1,49 @@
+import itertools
 import logging
 
+from web3 import Web3
 from web3._utils import empty
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
 from web3.contract import prepare_transaction
 
+from contracts_lib_py.fee_oracle import get_fee_oracle
+from contracts_lib_py.gas_estimate_cache import GasEstimateCache
+from contracts_lib_py.nonce_manager import NonceManager
+from contracts_lib_py.web3.rpc_metrics import rpc_contract
 from contracts_lib_py.wallet import Wallet
+from contracts_lib_py.web3_provider import Web3Provider
 
 
 class CustomContractFunction:
+    gas_estimate_cache = None
 
     def __init__(self, contract_function):
         self._contract_function = contract_function
 
+    @staticmethod
+    def enable_gas_estimate_cache(ttl=600, safety_margin=0.2, max_size=1024):
+        """
+        Reuse the gas estimates of previous transactions to the same contract function
+        instead of calling `eth_estimateGas` for every transaction without `gas`.
+
+        With a cached estimate a transaction that would revert is no longer rejected by the
+        estimate before it is sent: it is mined, reverts and burns the gas it used.
+
+        :param ttl: float seconds an estimate is kept, None to keep it until evicted
+        :param safety_margin: float fraction added on top of a cached estimate
+        :param max_size: int maximum number of estimates kept
+        :return: GasEstimateCache
+        """
+        CustomContractFunction.gas_estimate_cache = GasEstimateCache(
+            ttl=ttl, safety_margin=safety_margin, max_size=max_size)
+        return CustomContractFunction.gas_estimate_cache
+
+    @staticmethod
+    def disable_gas_estimate_cache():
+        """Disable the gas estimate cache."""
+        CustomContractFunction.gas_estimate_cache = None
+
     def transact(self, transaction=None):
         """
         Customize calling smart contract transaction functions to use `sendTransaction`
@@ -49,25 +82,49 @@ class CustomContractFunction:
                     "Please ensure that this contract instance has an address."
                 )
 
+        gas_cache = CustomContractFunction.gas_estimate_cache
+        cache_key = None
+        cached_gas = None
         if 'gas' not in transact_transaction:
-            tx = transaction.copy()
-            if 'passphrase' in tx:
-                tx.pop('passphrase')
-            if 'keyfile' in tx:
-                tx.pop('keyfile')
-            gas = cf.estimateGas(tx)
-            transact_transaction['gas'] = gas
-
-        return transact_with_contract_function(
-            cf.address,
-            cf.web3,
-            cf.function_identifier,
-            transact_transaction,
-            cf.contract_abi,
-            cf.abi,
-            *cf.args,
-            **cf.kwargs
-        )
+            if gas_cache is not None:
+                cache_key = GasEstimateCache.make_key(
+                    Web3Provider.get_chain_id(cf.web3), cf.address, cf._encode_transaction_data(),
+                    transact_transaction)
+                cached_gas = gas_cache.get(cache_key)
+
+            if cached_gas is not None:
+                transact_transaction['gas'] = cached_gas
+            else:
+                tx = dict(transaction or {})
+                if 'passphrase' in tx:
+                    tx.pop('passphrase')
+                if 'keyfile' in tx:
+                    tx.pop('keyfile')
+                gas = cf.estimateGas(tx)
+                transact_transaction['gas'] = gas
+                if cache_key is not None:
+                    gas_cache.set(cache_key, gas)
+
+        try:
+            with rpc_contract(cf.address):
+                txn_hash = transact_with_contract_function(
+                    cf.address,
+                    cf.web3,
+                    cf.function_identifier,
+                    transact_transaction,
+                    cf.contract_abi,
+                    cf.abi,
+                    *cf.args,
+                    **cf.kwargs
+                )
+        except ValueError as e:
+            if cached_gas is not None and 'gas' in str(e).lower():
+                gas_cache.invalidate(cache_key)
+            raise
+
+        if cached_gas is not None:
+            gas_cache.track(txn_hash, cache_key, cached_gas)
+        return txn_hash
 
 
 def transact_with_contract_function(
@@ -111,12 +168,82 @@ def transact_with_contract_function(
     #     )
 
     if passphrase and key_file:
-        raw_tx = Wallet(web3, key_file, passphrase).sign_tx(transact_transaction)
-        logging.debug(f'sending raw tx: function: {function_name}, tx hash: {raw_tx.hex()}')
-        txn_hash = web3.eth.sendRawTransaction(raw_tx)
+        wallet = Wallet(web3, key_file, passphrase)
+        txn_hash = _send_raw_transaction(web3, wallet, transact_transaction, function_name)
     elif passphrase:
+        _set_fees(web3, transact_transaction)
         txn_hash = web3.sendTransaction(transact_transaction, passphrase)
     else:
+        _set_fees(web3, transact_transaction)
         txn_hash = web3.eth.sendTransaction(transact_transaction)
 
     return txn_hash
+
+
+def _send_raw_transaction(web3, wallet, transaction, function_name):
+    # The nonce is allocated by the wallet unless the caller set one. An allocated nonce must
+    # either end up in a broadcast transaction or be given back, otherwise every later
+    # transaction of the account waits behind the gap.
+    nonce_allocated = 'nonce' not in transaction
+    raw_tx = wallet.sign_tx(transaction)
+    logging.debug(f'sending raw tx: function: {function_name}, tx hash: {raw_tx.hex()}')
+    try:
+        txn_hash = _broadcast_raw_transaction(web3, raw_tx)
+    except Exception as e:
+        if not nonce_allocated:
+            raise
+        if not (isinstance(e, ValueError) and NonceManager.is_nonce_error(e)):
+            Wallet.nonce_manager.release(web3, wallet.address, transaction['nonce'])
+            raise
+        logging.info(f'resending tx with a fresh nonce: function: {function_name}, '
+                     f'error: {e}')
+        Wallet.nonce_manager.resync(web3, wallet.address)
+        transaction.pop('nonce')
+        raw_tx = wallet.sign_tx(transaction)
+        try:
+            txn_hash = _broadcast_raw_transaction(web3, raw_tx)
+        except Exception:
+            Wallet.nonce_manager.release(web3, wallet.address, transaction['nonce'])
+            raise
+
+    if nonce_allocated:
+        Wallet.nonce_manager.track(web3, wallet.address, transaction['nonce'], txn_hash)
+    return txn_hash
+
+
+def _broadcast_raw_transaction(web3, raw_tx):
+    try:
+        return web3.eth.sendRawTransaction(raw_tx)
+    except ValueError as e:
+        if not NonceManager.is_known_transaction_error(e):
+            raise
+        # the client already has this exact transaction, resending it could execute it twice
+        logging.debug(f'transaction is already known by the client: {e}')
+        return Web3.keccak(raw_tx)
+
+
+def _set_fees(web3, transaction):
+    # Let the cached fee oracle price the transaction instead of the default web3 fee lookups
+    if 'gasPrice' not in transaction and 'maxFeePerGas' not in transaction:
+        transaction.update(get_fee_oracle(web3).get_fees())
+
+
+def decode_function_output(codec, contract_function, return_data):
+    """
+    Decode the data returned by an `eth_call` to a contract function. This is the
+    decoding half of web3 `call_contract_function` so the call itself can be sent
+    through other transports (multicall, batches or async providers).
+
+    :param codec: ABICodec, e.g. `web3.codec`
+    :param contract_function: bound web3 ContractFunction that was called
+    :param return_data: bytes returned by the call
+    :return: the decoded value, or a list of values if the function has several outputs
+    """
+    output_types = get_abi_output_types(contract_function.abi)
+    output_data = codec.decode_abi(output_types, return_data)
+    normalizers = itertools.chain(BASE_RETURN_NORMALIZERS,
+                                  contract_function._return_data_normalizers or ())
+    normalized_data = map_abi_data(normalizers, output_types, output_data)
+    if len(normalized_data) == 1:
+        return normalized_data[0]
+    return normalized_data
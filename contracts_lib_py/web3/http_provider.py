@@ -1,24 +1,280 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from eth_utils import to_bytes
 from web3 import HTTPProvider
+from web3._utils.encoding import FriendlyJsonSerde
 
+from contracts_lib_py.web3 import rpc_metrics
 from contracts_lib_py.web3.request import make_post_request
+from contracts_lib_py.web3.retry import default_retry_policy
 
 
 class CustomHTTPProvider(HTTPProvider):
     """
     Override requests to control the connection pool to make it blocking.
+
+    Calls can also be packed into a single JSON-RPC batch POST, either explicitly with
+    `batch()` or transparently by enabling a coalescing window with `enable_batching()`.
+
+    Requests failing with transient http errors are retried following `retry_policy`, set it
+    to None to disable the retries.
+
+    Every request is reported to the hooks of `rpc_metrics`, see `RPCMetrics.enable()`.
     """
+    retry_policy = default_retry_policy
+
+    def __init__(self, endpoint_uri=None, request_kwargs=None, session=None,
+                 batch_window=None, max_batch_size=100, retry_policy=None):
+        super().__init__(endpoint_uri, request_kwargs, session)
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+        self._coalescer = None
+        if batch_window:
+            self.enable_batching(batch_window, max_batch_size)
 
     def make_request(self, method, params):
+        if self._coalescer is not None:
+            return self._coalescer.submit(method, params)
+        return self._make_single_request(method, params)
+
+    def _make_single_request(self, method, params):
         self.logger.debug("Making request HTTP. URI: %s, Method: %s",
                           self.endpoint_uri, method)
+        instrumented = bool(rpc_metrics.hooks)
+        start = time.perf_counter() if instrumented else None
         request_data = self.encode_rpc_request(method, params)
-        raw_response = make_post_request(
-            self.endpoint_uri,
-            request_data,
-            **self.get_request_kwargs()
-        )
+        try:
+            raw_response = self._post(method, request_data)
+        except Exception as e:
+            if instrumented:
+                rpc_metrics.call_hooks(method, params, self.endpoint_uri, start,
+                                       len(request_data), 0, error=e)
+            raise
         response = self.decode_rpc_response(raw_response)
+        if instrumented:
+            rpc_metrics.call_hooks(method, params, self.endpoint_uri, start, len(request_data),
+                                   len(raw_response), response=response)
         self.logger.debug("Getting response HTTP. URI: %s, "
                           "Method: %s, Response: %s",
                           self.endpoint_uri, method, response)
         return response
+
+    def make_batch_request(self, calls):
+        """
+        Send several JSON-RPC calls in a single HTTP POST.
+
+        :param calls: list of (method, params) tuples
+        :return: list of JSON-RPC responses in the same order as `calls`
+        """
+        if not calls:
+            return []
+        if len(calls) == 1:
+            return [self._make_single_request(*calls[0])]
+
+        rpc_requests = [
+            {
+                'jsonrpc': '2.0',
+                'method': method,
+                'params': params or [],
+                'id': next(self.request_counter),
+            }
+            for method, params in calls
+        ]
+        self.logger.debug("Making batch request HTTP. URI: %s, Methods: %s",
+                          self.endpoint_uri, [method for method, _ in calls])
+        instrumented = bool(rpc_metrics.hooks)
+        start = time.perf_counter() if instrumented else None
+        request_data = to_bytes(text=FriendlyJsonSerde().json_encode(rpc_requests))
+        try:
+            raw_response = self._post([method for method, _ in calls], request_data)
+        except Exception as e:
+            if instrumented:
+                self._call_batch_hooks(calls, start, len(request_data), 0, None, e)
+            raise
+        response = self.decode_rpc_response(raw_response)
+        if isinstance(response, dict):
+            # The node rejected the batch as a whole (e.g. batching is disabled).
+            responses = [response] * len(calls)
+        else:
+            responses_by_id = {item.get('id'): item for item in response}
+            responses = [
+                responses_by_id.get(
+                    request['id'],
+                    {'jsonrpc': '2.0', 'id': request['id'],
+                     'error': {'code': -32603, 'message': 'Missing response in JSON-RPC batch'}}
+                )
+                for request in rpc_requests
+            ]
+        if instrumented:
+            self._call_batch_hooks(calls, start, len(request_data), len(raw_response), responses)
+        return responses
+
+    def _call_batch_hooks(self, calls, start, request_bytes, response_bytes, responses,
+                          error=None):
+        # the payloads are split evenly between the calls of the batch
+        for i, (method, params) in enumerate(calls):
+            rpc_metrics.call_hooks(
+                method, params, self.endpoint_uri, start, request_bytes // len(calls),
+                response_bytes // len(calls), response=responses[i] if responses else None,
+                error=error
+            )
+
+    def _post(self, method, request_data):
+        def request():
+            return make_post_request(self.endpoint_uri, request_data,
+                                     **self.get_request_kwargs())
+
+        if self.retry_policy is None:
+            return request()
+        return self.retry_policy.call(method, request)
+
+    def batch(self):
+        """
+        Return a batch that collects calls and sends them in one request when
+        the `with` block exits.
+
+        Example:
+            with provider.batch() as batch:
+                block = batch.add('eth_blockNumber', [])
+                balance = batch.add('eth_getBalance', [address, 'latest'])
+            print(block.result(), balance.result())
+
+        :return: RPCBatch
+        """
+        return RPCBatch(self)
+
+    def enable_batching(self, window=0.005, max_batch_size=100):
+        """
+        Coalesce concurrent `make_request` calls issued within `window` seconds into
+        a single JSON-RPC batch.
+
+        :param window: float seconds to wait for other calls before sending
+        :param max_batch_size: int sends straight away once this many calls are queued
+        """
+        self._coalescer = _RequestCoalescer(self, window, max_batch_size)
+
+    def disable_batching(self):
+        self._coalescer = None
+
+    @property
+    def batching_enabled(self):
+        return self._coalescer is not None
+
+
+class RPCBatch:
+    """Collect JSON-RPC calls and send them together in a single request."""
+
+    def __init__(self, provider):
+        self._provider = provider
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            self._cancel()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def add(self, method, params=None):
+        """
+        Queue a call in this batch.
+
+        :param method: JSON-RPC method name, str
+        :param params: list of params
+        :return: Future resolved with the call `result`, or failing with `ValueError`
+            carrying the JSON-RPC error
+        """
+        future = Future()
+        self._calls.append((method, params, future))
+        return future
+
+    def execute(self):
+        """Send the queued calls and resolve their futures."""
+        calls, self._calls = self._calls, []
+        if not calls:
+            return
+        try:
+            responses = self._provider.make_batch_request(
+                [(method, params) for method, params, _ in calls])
+        except Exception as e:
+            for _, _, future in calls:
+                future.set_exception(e)
+            raise
+
+        for (_, _, future), response in zip(calls, responses):
+            if 'error' in response:
+                future.set_exception(ValueError(response['error']))
+            else:
+                future.set_result(response.get('result'))
+
+    def _cancel(self):
+        calls, self._calls = self._calls, []
+        for _, _, future in calls:
+            future.cancel()
+
+
+class _PendingCall:
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.response = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _RequestCoalescer:
+    """
+    Pack calls coming from several threads into one batch.
+
+    The first thread to queue a call waits for the window to elapse (or the batch to fill up)
+    and then sends every queued call; the other threads just wait for their response.
+    """
+
+    def __init__(self, provider, window, max_batch_size):
+        self._provider = provider
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._full = threading.Condition(self._lock)
+        self._queue = []
+
+    def submit(self, method, params):
+        call = _PendingCall(method, params)
+        with self._lock:
+            self._queue.append(call)
+            is_leader = len(self._queue) == 1
+            if len(self._queue) >= self.max_batch_size:
+                self._full.notify()
+
+        if is_leader:
+            with self._lock:
+                self._full.wait_for(lambda: len(self._queue) >= self.max_batch_size,
+                                    timeout=self.window)
+                calls, self._queue = self._queue, []
+            self._send(calls)
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.response
+
+    def _send(self, calls):
+        try:
+            responses = self._provider.make_batch_request(
+                [(call.method, call.params) for call in calls])
+            for call, response in zip(calls, responses):
+                call.response = response
+        except Exception as e:
+            for call in calls:
+                call.error = e
+        finally:
+            for call in calls:
+                call.done.set()
@@ -0,0 +1,328 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from web3.providers.base import JSONBaseProvider
+
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider, RPCBatch
+from contracts_lib_py.web3.retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointStats:
+    """Latency and error statistics of one RPC endpoint."""
+
+    def __init__(self, alpha=0.2, window=200):
+        """
+
+        :param alpha: float weight of the last request in the moving averages
+        :param window: int number of recent latencies kept for the percentiles
+        """
+        self.alpha = alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.down_until = 0.0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.requests += 1
+            self.consecutive_errors = 0
+            self.latency = latency if self.latency is None else \
+                self.alpha * latency + (1 - self.alpha) * self.latency
+            self.error_rate = (1 - self.alpha) * self.error_rate
+            self._latencies.append(latency)
+
+    def record_failure(self, cooldown, max_consecutive_errors):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self.consecutive_errors += 1
+            self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+            if self.consecutive_errors >= max_consecutive_errors:
+                self.down_until = time.monotonic() + cooldown
+
+    def percentile(self, fraction):
+        """
+        Return a percentile of the recent latencies.
+
+        :param fraction: float between 0 and 1, e.g. 0.95
+        :return: float seconds, or None without latencies
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+    @property
+    def samples(self):
+        return len(self._latencies)
+
+
+class Endpoint:
+    """An RPC endpoint of a `PooledHTTPProvider` and its statistics."""
+
+    def __init__(self, endpoint_uri, request_kwargs=None):
+        self.endpoint_uri = endpoint_uri
+        # failed requests are sent to the next endpoint instead of retried
+        self.provider = CustomHTTPProvider(endpoint_uri, request_kwargs,
+                                           retry_policy=RetryPolicy(max_retries=0))
+        self.stats = EndpointStats()
+
+    def is_healthy(self, now, error_threshold):
+        return self.stats.down_until <= now and self.stats.error_rate < error_threshold
+
+    def __repr__(self):
+        return f'<Endpoint {self.endpoint_uri}>'
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """
+    Send the JSON-RPC requests to several endpoints of the same network.
+
+    The latency (moving average) and error rate of every endpoint are tracked. Reads go to
+    the fastest healthy endpoint, and fail over to the next ones when the request fails.
+    A read that takes longer than the 95th percentile latency of its endpoint is hedged: a
+    duplicate is sent to the next endpoint and the first response wins. Endpoints failing
+    `max_consecutive_errors` times in a row are skipped for `cooldown` seconds.
+
+    Transactions, transaction counts, signatures and node filters are pinned to the primary
+    endpoint, the first one unless another is given, so the nonces and filter ids stay
+    consistent: only the primary has seen the transactions broadcast through it.
+
+    Consistency: the other endpoints may lag behind the primary by a few blocks, so a read
+    going to them may not see a transaction yet. The receipts and transactions looked up by
+    hash are always read from the primary, and for `read_your_writes` seconds after a
+    transaction is sent every request goes to the primary, e.g. the calls reading the state
+    the transaction changed. Outside of that window reads see the state of any endpoint.
+
+    Example:
+        provider = PooledHTTPProvider(['https://rpc-a.example', 'https://rpc-b.example'])
+        Web3Provider.set_web3(Web3(provider))
+    """
+    PRIMARY_METHODS = frozenset({
+        'eth_sendRawTransaction',
+        'eth_sendTransaction',
+        'eth_signTransaction',
+        'eth_getTransactionCount',
+        'eth_getTransactionReceipt',
+        'eth_getTransactionByHash',
+        'eth_sign',
+        'eth_signTypedData',
+        'eth_accounts',
+        'eth_newFilter',
+        'eth_newBlockFilter',
+        'eth_newPendingTransactionFilter',
+        'eth_getFilterChanges',
+        'eth_getFilterLogs',
+        'eth_uninstallFilter',
+        'personal_sendTransaction',
+        'personal_sign',
+        'personal_unlockAccount',
+        'personal_listAccounts',
+    })
+    WRITE_METHODS = frozenset({
+        'eth_sendRawTransaction',
+        'eth_sendTransaction',
+        'personal_sendTransaction',
+    })
+    HEDGE_PERCENTILE = 0.95
+    HEDGE_MIN_SAMPLES = 20
+
+    def __init__(self, endpoint_uris, primary_uri=None, request_kwargs=None, hedge=True,
+                 hedge_delay=1.0, error_threshold=0.5, max_consecutive_errors=3, cooldown=30,
+                 max_workers=16, read_your_writes=10.0):
+        """
+
+        :param endpoint_uris: list of str urls of the endpoints
+        :param primary_uri: str url of the endpoint sending the transactions, defaults to the
+            first one
+        :param request_kwargs: dict of arguments of the http requests, e.g. the `timeout`
+        :param hedge: bool if True slow reads are duplicated to a second endpoint
+        :param hedge_delay: float seconds before hedging a read, used until the endpoint has
+            enough latencies for the percentile
+        :param error_threshold: float error rate above which an endpoint is unhealthy
+        :param max_consecutive_errors: int errors in a row before an endpoint is skipped
+        :param cooldown: float seconds an endpoint is skipped for
+        :param max_workers: int number of threads sending the requests
+        :param read_your_writes: float seconds every request goes to the primary after a
+            transaction is sent, 0 to only pin the methods of `PRIMARY_METHODS`
+        """
+        super().__init__()
+        assert endpoint_uris, 'at least one endpoint uri is required.'
+        self.endpoints = [Endpoint(uri, request_kwargs) for uri in endpoint_uris]
+        primary_uri = primary_uri or endpoint_uris[0]
+        if primary_uri not in endpoint_uris:
+            self.endpoints.append(Endpoint(primary_uri, request_kwargs))
+        self.primary = next(e for e in self.endpoints if e.endpoint_uri == primary_uri)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.error_threshold = error_threshold
+        self.max_consecutive_errors = max_consecutive_errors
+        self.cooldown = cooldown
+        self.hedged_requests = 0
+        self.read_your_writes = read_your_writes
+        self._pinned_until = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='PooledHTTPProvider')
+
+    @property
+    def endpoint_uri(self):
+        return self.primary.endpoint_uri
+
+    def __str__(self):
+        return f'Pooled RPC connection {[e.endpoint_uri for e in self.endpoints]}'
+
+    def get_stats(self):
+        """
+        Return the statistics of the endpoints.
+
+        :return: list of dict, one per endpoint
+        """
+        now = time.monotonic()
+        return [{
+            'endpoint_uri': endpoint.endpoint_uri,
+            'healthy': endpoint.is_healthy(now, self.error_threshold),
+            'latency': endpoint.stats.latency,
+            'p95_latency': endpoint.stats.percentile(self.HEDGE_PERCENTILE),
+            'error_rate': endpoint.stats.error_rate,
+            'requests': endpoint.stats.requests,
+            'errors': endpoint.stats.errors,
+        } for endpoint in self.endpoints]
+
+    def make_request(self, method, params):
+        if method in self.WRITE_METHODS:
+            self._pin_reads()
+        if method in self.PRIMARY_METHODS or self._reads_pinned():
+            return self._send(self.primary, method, params)
+
+        endpoints = self._rank_endpoints()
+        if self.hedge and len(endpoints) > 1:
+            return self._make_hedged_request(endpoints, method, params)
+
+        last_error = None
+        for endpoint in endpoints:
+            try:
+                return self._send(endpoint, method, params)
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def make_batch_request(self, calls):
+        """
+        Send several JSON-RPC calls in a single HTTP POST to the fastest healthy endpoint.
+
+        :param calls: list of (method, params) tuples
+        :return: list of JSON-RPC responses in the same order as `calls`
+        """
+        if any(method in self.WRITE_METHODS for method, _ in calls):
+            self._pin_reads()
+        if self._reads_pinned() or any(method in self.PRIMARY_METHODS for method, _ in calls):
+            endpoints = [self.primary]
+        else:
+            endpoints = self._rank_endpoints()
+        last_error = None
+        for endpoint in endpoints:
+            try:
+                return self._send_batch(endpoint, calls)
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def batch(self):
+        """
+        Return a batch that collects calls and sends them in one request when
+        the `with` block exits.
+
+        :return: RPCBatch
+        """
+        return RPCBatch(self)
+
+    def _pin_reads(self):
+        self._pinned_until = max(self._pinned_until, time.monotonic() + self.read_your_writes)
+
+    def _reads_pinned(self):
+        return time.monotonic() < self._pinned_until
+
+    def _rank_endpoints(self):
+        now = time.monotonic()
+        healthy = [e for e in self.endpoints if e.is_healthy(now, self.error_threshold)]
+        # endpoints without latencies yet are tried first to measure them
+        healthy.sort(key=lambda e: e.stats.latency or 0.0)
+        # unhealthy endpoints are the last resort, the ones back soonest first
+        unhealthy = sorted((e for e in self.endpoints if e not in healthy),
+                           key=lambda e: (e.stats.down_until, e.stats.error_rate))
+        return healthy + unhealthy
+
+    def _get_hedge_delay(self, endpoint):
+        if endpoint.stats.samples < self.HEDGE_MIN_SAMPLES:
+            return self.hedge_delay
+        return endpoint.stats.percentile(self.HEDGE_PERCENTILE)
+
+    def _make_hedged_request(self, endpoints, method, params):
+        remaining = list(endpoints)
+        pending = dict()
+        hedged = False
+        last_error = None
+
+        def send_next():
+            endpoint = remaining.pop(0)
+            # the request runs in the context of the caller, e.g. for the rpc hooks
+            future = self._executor.submit(contextvars.copy_context().run, self._send, endpoint,
+                                           method, params)
+            pending[future] = endpoint
+            return endpoint
+
+        first = send_next()
+        while pending:
+            timeout = self._get_hedge_delay(first) if remaining and not hedged else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                self.hedged_requests += 1
+                endpoint = send_next()
+                logger.debug(f'hedging {method} to {endpoint.endpoint_uri}')
+                continue
+
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+            if not pending and remaining:
+                send_next()
+        raise last_error
+
+    def _send(self, endpoint, method, params):
+        start = time.perf_counter()
+        try:
+            response = endpoint.provider.make_request(method, params)
+        except Exception as e:
+            self._record_failure(endpoint, method, e)
+            raise
+        endpoint.stats.record_success(time.perf_counter() - start)
+        return response
+
+    def _send_batch(self, endpoint, calls):
+        start = time.perf_counter()
+        try:
+            responses = endpoint.provider.make_batch_request(calls)
+        except Exception as e:
+            self._record_failure(endpoint, 'batch', e)
+            raise
+        endpoint.stats.record_success(time.perf_counter() - start)
+        return responses
+
+    def _record_failure(self, endpoint, method, error):
+        logger.debug(f'{method} failed on {endpoint.endpoint_uri}: {error}')
+        endpoint.stats.record_failure(self.cooldown, self.max_consecutive_errors)
@@ -2,6 +2,9 @@
 This is copied from Web3 python library to control the `requests`
 session parameters.
 """
+import asyncio
+
+import aiohttp
 import lru
 import requests
 from requests.adapters import HTTPAdapter
@@ -37,3 +40,35 @@ def make_post_request(endpoint_uri, data, *args, **kwargs):
     response.raise_for_status()
 
     return response.content
+
+
+_async_session_cache = dict()
+
+
+def _get_async_session(endpoint_uri):
+    # aiohttp sessions are bound to the event loop they were created in, so keep one
+    # pooled session per endpoint and loop.
+    loop = asyncio.get_running_loop()
+    cache_key = (endpoint_uri, id(loop))
+    session = _async_session_cache.get(cache_key)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=25, limit_per_host=25),
+            raise_for_status=True
+        )
+        _async_session_cache[cache_key] = session
+    return session
+
+
+async def async_make_post_request(endpoint_uri, data, *args, **kwargs):
+    kwargs.setdefault('timeout', aiohttp.ClientTimeout(10))
+    session = _get_async_session(endpoint_uri)
+    async with session.post(endpoint_uri, data=data, *args, **kwargs) as response:
+        return await response.read()
+
+
+async def close_async_sessions():
+    """Close the pooled aiohttp sessions created in the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for cache_key in [key for key in _async_session_cache if key[1] == loop_id]:
+        await _async_session_cache.pop(cache_key).close()
@@ -0,0 +1,242 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import aiohttp
+import requests
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC methods that can be sent again without side effects
+IDEMPOTENT_METHODS = frozenset({
+    'eth_blockNumber',
+    'eth_call',
+    'eth_chainId',
+    'eth_estimateGas',
+    'eth_feeHistory',
+    'eth_gasPrice',
+    'eth_getBalance',
+    'eth_getBlockByHash',
+    'eth_getBlockByNumber',
+    'eth_getCode',
+    'eth_getLogs',
+    'eth_getStorageAt',
+    'eth_getTransactionByHash',
+    'eth_getTransactionCount',
+    'eth_getTransactionReceipt',
+    'eth_maxPriorityFeePerGas',
+    'eth_syncing',
+    'net_version',
+    'web3_clientVersion',
+})
+
+# http statuses of requests that were not processed and can be sent again
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+REJECTED_STATUSES = frozenset({429})
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """
+    Return the seconds to wait before a retry, growing exponentially with the attempt and
+    randomized over the whole interval ("full jitter"), so clients failing together do not
+    retry together.
+
+    :param attempt: int number of the retry, starting at 0
+    :param base_delay: float seconds of the first retry interval
+    :param max_delay: float maximum seconds
+    :return: float seconds
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class RetryBudget:
+    """
+    Limit the retries to a fraction of the requests.
+
+    Every request deposits `ratio` tokens and every retry withdraws one, so when an endpoint
+    fails for everyone retries stop at a `ratio` share of the traffic instead of multiplying
+    it. `min_per_second` tokens are added over time so a quiet client can still retry.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=100.0):
+        """
+
+        :param ratio: float retries allowed per request
+        :param min_per_second: float retries allowed per second regardless of the traffic
+        :param max_tokens: float maximum retries saved up
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self):
+        """
+        Take a retry from the budget.
+
+        :return: bool False when the budget is exhausted
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.min_per_second,
+                           self.max_tokens)
+        self._updated = now
+
+
+class RetryPolicy:
+    """
+    Retry the JSON-RPC requests failing with transient http errors.
+
+    Idempotent methods are retried on connection errors, timeouts and the 429, 502, 503 and
+    504 statuses. Other methods, e.g. `eth_sendRawTransaction`, are only retried when the
+    request was certainly not processed: the connection could not be opened or the request
+    was rate limited (429).
+
+    Retries wait with exponential backoff and jitter, or the time asked by a `Retry-After`
+    header, and share a `RetryBudget`.
+    """
+
+    def __init__(self, max_retries=4, base_delay=0.1, max_delay=10.0, budget=None):
+        """
+
+        :param max_retries: int maximum retries of a request
+        :param base_delay: float seconds of the first retry interval
+        :param max_delay: float maximum seconds to wait for a retry, requests asked to wait
+            longer with `Retry-After` are not retried
+        :param budget: RetryBudget, defaults to a new one
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+
+    @staticmethod
+    def is_idempotent(method):
+        return method in IDEMPOTENT_METHODS
+
+    def get_retry_delay(self, method, error, attempt):
+        """
+        Return the seconds to wait before retrying a failed request.
+
+        :param method: str JSON-RPC method, or list of methods of a batch
+        :param error: exception raised by the request
+        :param attempt: int number of the retry, starting at 0
+        :return: float seconds, or None if the request must not be retried
+        """
+        if attempt >= self.max_retries or not self._is_retryable(method, error):
+            return None
+
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        retry_after = self._get_retry_after(error)
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            delay = max(delay, retry_after)
+
+        if not self.budget.withdraw():
+            logger.debug(f'retry budget exhausted, not retrying {method}')
+            return None
+        return delay
+
+    def call(self, method, request):
+        """
+        Run a request, retrying it on transient errors.
+
+        :param method: str JSON-RPC method, or list of methods of a batch
+        :param request: callable sending the request
+        :return: the result of `request`
+        """
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return request()
+            except Exception as e:
+                delay = self.get_retry_delay(method, e, attempt)
+                if delay is None:
+                    raise
+                logger.debug(f'retrying {method} in {delay:.2f}s after error: {e}')
+                time.sleep(delay)
+                attempt += 1
+
+    async def call_async(self, method, request):
+        """
+        Run an asyncio request, retrying it on transient errors.
+
+        :param method: str JSON-RPC method, or list of methods of a batch
+        :param request: callable returning the request coroutine
+        :return: the result of `request`
+        """
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await request()
+            except Exception as e:
+                delay = self.get_retry_delay(method, e, attempt)
+                if delay is None:
+                    raise
+                logger.debug(f'retrying {method} in {delay:.2f}s after error: {e}')
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _is_retryable(self, method, error):
+        methods = method if isinstance(method, (list, tuple)) else [method]
+        status = self._get_status(error)
+        if all(self.is_idempotent(m) for m in methods):
+            return status in RETRY_STATUSES or (status is None and isinstance(
+                error, (requests.ConnectionError, requests.Timeout,
+                        aiohttp.ClientConnectionError, asyncio.TimeoutError)))
+        return status in REJECTED_STATUSES or isinstance(
+            error, (requests.exceptions.ConnectTimeout, aiohttp.ClientConnectorError))
+
+    @staticmethod
+    def _get_status(error):
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status
+        return None
+
+    @staticmethod
+    def _get_retry_after(error):
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            headers = error.response.headers
+        elif isinstance(error, aiohttp.ClientResponseError):
+            headers = error.headers or {}
+        else:
+            return None
+
+        value = headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(date.timestamp() - time.time(), 0.0)
+
+
+# policy shared by the providers, so they draw on the same retry budget
+default_retry_policy = RetryPolicy()
@@ -0,0 +1,365 @@
+"""
+    RPC Metrics
+
+    Hooks called for every JSON-RPC request sent by the http providers, and a collector
+    keeping per method, contract and endpoint counters and latency histograms.
+
+    Without hooks the providers only check the empty `hooks` tuple, so the instrumentation
+    costs nothing until it is enabled.
+"""
+import bisect
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+RPCEvent = namedtuple(
+    'RPCEvent',
+    'method endpoint contract duration request_bytes response_bytes error_code'
+)
+RPCEvent.__doc__ = """
+A JSON-RPC request sent by a provider.
+
+`contract` is the name of the contract wrapper the request was made for, empty when it is not
+known. `error_code` is the JSON-RPC error code, the http status or the exception name of a
+failed request, and None for a successful one.
+"""
+
+_rpc_contract = contextvars.ContextVar('rpc_contract', default=None)
+
+# callables taking an RPCEvent, called by the http providers after every request
+hooks = ()
+
+
+def add_hook(hook):
+    """
+    Call `hook` with an `RPCEvent` after every request sent by the http providers.
+
+    :param hook: callable taking an RPCEvent
+    """
+    global hooks
+    hooks = hooks + (hook,)
+
+
+def remove_hook(hook):
+    """
+    Stop calling a hook added with `add_hook`.
+
+    :param hook: callable
+    """
+    global hooks
+    hooks = tuple(h for h in hooks if h != hook)
+
+
+def call_hooks(method, params, endpoint, start, request_bytes, response_bytes, response=None,
+               error=None):
+    """
+    Build the `RPCEvent` of a request and pass it to the hooks.
+
+    :param method: str JSON-RPC method
+    :param params: list of params of the request
+    :param endpoint: str url the request was sent to
+    :param start: float `time.perf_counter()` when the request started
+    :param request_bytes: int size of the request payload
+    :param response_bytes: int size of the response payload
+    :param response: dict JSON-RPC response
+    :param error: exception raised by the request
+    """
+    event = RPCEvent(method, endpoint, get_request_address(method, params),
+                     time.perf_counter() - start, request_bytes, response_bytes,
+                     get_error_code(response, error))
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception as e:
+            logger.debug(f'RPC hook {hook} failed: {e}')
+
+
+@contextlib.contextmanager
+def rpc_contract(address):
+    """
+    Attribute the requests sent within the block to a contract, for the requests that do
+    not carry the contract address, e.g. `eth_sendRawTransaction`.
+
+    :param address: hex str address of the contract
+    """
+    token = _rpc_contract.set(address)
+    try:
+        yield
+    finally:
+        _rpc_contract.reset(token)
+
+
+def get_request_address(method, params):
+    """
+    Return the contract address a JSON-RPC request is made for.
+
+    :param method: str JSON-RPC method
+    :param params: list of params of the request
+    :return: hex str address, or None
+    """
+    if params and isinstance(params[0], dict):
+        address = params[0].get('to') or params[0].get('address')
+        if isinstance(address, str):
+            return address
+    return _rpc_contract.get()
+
+
+def get_endpoint_label(endpoint):
+    """
+    Reduce an endpoint url to its scheme, host and port. Providers like Infura and Alchemy
+    put the API key in the path, which must not end up in the metric labels.
+
+    :param endpoint: str url the request was sent to
+    :return: str
+    """
+    if not endpoint:
+        return ''
+    parts = urlsplit(endpoint)
+    if not (parts.scheme and parts.hostname):
+        return endpoint
+    host = f'[{parts.hostname}]' if ':' in parts.hostname else parts.hostname
+    try:
+        port = f':{parts.port}' if parts.port else ''
+    except ValueError:
+        port = ''
+    return f'{parts.scheme}://{host}{port}'
+
+
+def get_error_code(response=None, error=None):
+    """
+    Return the error code of a JSON-RPC request.
+
+    :param response: dict JSON-RPC response
+    :param error: exception raised by the request
+    :return: str error code, or None if the request succeeded
+    """
+    if error is not None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        if status is None:
+            status = getattr(error, 'status', None)
+        return str(status) if isinstance(status, int) else type(error).__name__
+    if isinstance(response, dict) and isinstance(response.get('error'), dict):
+        return str(response['error'].get('code'))
+    return None
+
+
+class _Series:
+
+    def __init__(self, buckets):
+        self.count = 0
+        self.duration = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.errors = {}
+
+
+class RPCMetrics:
+    """
+    Collect counters and latency histograms of the JSON-RPC requests, labelled by method,
+    contract and endpoint. The endpoint label is the scheme, host and port of the url, or
+    the alias given for it in `endpoint_aliases`.
+
+    Example:
+        metrics = RPCMetrics.enable()
+        ...
+        print(metrics.snapshot())
+        metrics.serve(9100)  # expose /metrics to Prometheus
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    PREFIX = 'contracts_lib_rpc'
+
+    def __init__(self, buckets=None, endpoint_aliases=None):
+        """
+
+        :param buckets: list of float upper bounds in seconds of the latency histogram
+        :param endpoint_aliases: dict of endpoint urls and the label to use for them
+        """
+        self.buckets = tuple(sorted(buckets or self.BUCKETS))
+        self._endpoint_labels = dict(endpoint_aliases or {})
+        self._series = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @staticmethod
+    def enable(buckets=None, endpoint_aliases=None):
+        """
+        Record the requests of all the http providers in a new collector.
+
+        :param buckets: list of float upper bounds in seconds of the latency histogram
+        :param endpoint_aliases: dict of endpoint urls and the label to use for them
+        :return: RPCMetrics
+        """
+        metrics = RPCMetrics(buckets, endpoint_aliases)
+        add_hook(metrics.record)
+        return metrics
+
+    def disable(self):
+        """Stop recording the requests, and stop the http server."""
+        remove_hook(self.record)
+        self.stop_server()
+
+    def record(self, event):
+        """
+        Add a request to the metrics.
+
+        :param event: RPCEvent
+        """
+        key = (event.method, self._get_contract_name(event.contract),
+               self._get_endpoint_label(event.endpoint))
+        bucket = bisect.bisect_left(self.buckets, event.duration)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.buckets)
+            series.count += 1
+            series.duration += event.duration
+            series.request_bytes += event.request_bytes
+            series.response_bytes += event.response_bytes
+            series.bucket_counts[bucket] += 1
+            if event.error_code is not None:
+                series.errors[event.error_code] = series.errors.get(event.error_code, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        """
+        Return the current metrics.
+
+        :return: list of dict, one per method, contract and endpoint
+        """
+        bounds = self.buckets + (float('inf'),)
+        with self._lock:
+            snapshot = [{
+                'method': method,
+                'contract': contract,
+                'endpoint': endpoint,
+                'count': series.count,
+                'duration': series.duration,
+                'request_bytes': series.request_bytes,
+                'response_bytes': series.response_bytes,
+                'errors': dict(series.errors),
+                'buckets': dict(zip(bounds, series.bucket_counts)),
+            } for (method, contract, endpoint), series in self._series.items()]
+        return sorted(snapshot, key=lambda item: (item['method'], item['contract'],
+                                                  item['endpoint']))
+
+    def to_openmetrics(self):
+        """
+        Return the metrics in the OpenMetrics text format, which Prometheus scrapes.
+
+        :return: str
+        """
+        prefix = self.PREFIX
+        requests, errors, durations, request_bytes, response_bytes = [], [], [], [], []
+        for item in self.snapshot():
+            labels = _format_labels(
+                method=item['method'], contract=item['contract'], endpoint=item['endpoint'])
+            requests.append(f'{prefix}_requests_total{{{labels}}} {item["count"]}')
+            request_bytes.append(
+                f'{prefix}_request_bytes_total{{{labels}}} {item["request_bytes"]}')
+            response_bytes.append(
+                f'{prefix}_response_bytes_total{{{labels}}} {item["response_bytes"]}')
+            for code, count in sorted(item['errors'].items()):
+                error_labels = f'{labels},{_format_labels(code=code)}'
+                errors.append(f'{prefix}_errors_total{{{error_labels}}} {count}')
+            cumulative = 0
+            for bound, count in item['buckets'].items():
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                durations.append(
+                    f'{prefix}_request_duration_seconds_bucket{{{labels},le="{le}"}} '
+                    f'{cumulative}')
+            durations.append(
+                f'{prefix}_request_duration_seconds_count{{{labels}}} {item["count"]}')
+            durations.append(
+                f'{prefix}_request_duration_seconds_sum{{{labels}}} {item["duration"]}')
+
+        lines = [
+            f'# TYPE {prefix}_requests counter',
+            f'# HELP {prefix}_requests JSON-RPC requests sent.',
+            *requests,
+            f'# TYPE {prefix}_errors counter',
+            f'# HELP {prefix}_errors JSON-RPC requests failed, by error code.',
+            *errors,
+            f'# TYPE {prefix}_request_duration_seconds histogram',
+            f'# HELP {prefix}_request_duration_seconds Latency of the JSON-RPC requests.',
+            *durations,
+            f'# TYPE {prefix}_request_bytes counter',
+            f'# HELP {prefix}_request_bytes Bytes of the JSON-RPC requests.',
+            *request_bytes,
+            f'# TYPE {prefix}_response_bytes counter',
+            f'# HELP {prefix}_response_bytes Bytes of the JSON-RPC responses.',
+            *response_bytes,
+            '# EOF',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        """
+        Expose the metrics on `http://<host>:<port>/metrics` from a background thread.
+
+        :param port: int port, 0 picks a free one
+        :param host: str interface to listen on, '0.0.0.0' to accept remote scrapers
+        :return: ThreadingHTTPServer
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                data = metrics.to_openmetrics().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; '
+                                                 'charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.stop_server()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='RPCMetricsServer',
+                         daemon=True).start()
+        return self._server
+
+    def stop_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _get_endpoint_label(self, endpoint):
+        label = self._endpoint_labels.get(endpoint)
+        if label is None:
+            label = self._endpoint_labels[endpoint] = get_endpoint_label(endpoint)
+        return label
+
+    @staticmethod
+    def _get_contract_name(address):
+        if not address:
+            return ''
+        from contracts_lib_py.contract_handler import ContractHandler
+
+        return ContractHandler.get_name_by_address(address) or address
+
+
+def _format_labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
@@ -1,40 +1,228 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import weakref
+
 from web3 import Web3
+from web3.eth import AsyncEth
+from web3.net import AsyncNet
 
+from contracts_lib_py.exceptions import ChainIdMismatch
+from contracts_lib_py.web3.async_http_provider import CustomAsyncHTTPProvider
 from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from contracts_lib_py.web3.pooled_http_provider import PooledHTTPProvider
+
+logger = logging.getLogger(__name__)
 
 
 class Web3Provider(object):
-    """Provides the Web3 instance."""
+    """
+    Provides the Web3 instance.
+
+    The default instance is shared by the whole process. `use_web3()` binds another
+    instance to the current thread or asyncio task, so a process can work with several
+    networks at once, e.g. with one `Keeper` per network.
+
+    Example:
+        polygon = Web3Provider.get_network_web3('https://polygon-rpc.com')
+        with Web3Provider.use_web3(polygon):
+            keeper = Keeper.get_instance()
+    """
     _web3 = None
+    _async_web3 = None
+    _context_web3 = contextvars.ContextVar('web3', default=None)
+    _network_web3s = dict()
+    _chain_identities = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
 
     @staticmethod
     def get_web3(keeper_url=None, provider=None):
         """Return the web3 instance to interact with the ethereum client."""
+        context_web3 = Web3Provider._context_web3.get()
+        if context_web3 is not None:
+            return context_web3
+
         if Web3Provider._web3 is None:
+            Web3Provider._web3 = Web3Provider.create_web3(keeper_url, provider)
+        return Web3Provider._web3
+
+    @staticmethod
+    def set_web3(web3):
+        Web3Provider._web3 = web3
+        Web3Provider.clear_chain_identity(web3)
+
+    @staticmethod
+    def create_web3(keeper_url=None, provider=None):
+        """
+        Return a new web3 instance, without setting it as the default one.
+
+        :param keeper_url: str url of the ethereum client, or list of urls of several
+            endpoints of the same network, balanced with a `PooledHTTPProvider`
+        :param provider: provider instance, used instead of `keeper_url`
+        :return: Web3 instance
+        """
+        if not provider:
+            assert keeper_url, 'keeper_url or a provider instance is required.'
+            if isinstance(keeper_url, (list, tuple)):
+                provider = PooledHTTPProvider(list(keeper_url))
+            else:
+                provider = CustomHTTPProvider(keeper_url)
+
+        web3 = Web3(provider)
+        # Reset attributes to avoid lint issue about no attribute
+        web3.EthereumTesterProvider = getattr(web3, 'EthereumTesterProvider')
+        web3.HTTPProvider = getattr(web3, 'HTTPProvider')
+        web3.IPCProvider = getattr(web3, 'IPCProvider')
+        web3.Iban = getattr(web3, 'Iban')
+        web3.RequestManager = getattr(web3, 'RequestManager')
+        web3.WebsocketProvider = getattr(web3, 'WebsocketProvider')
+        web3.codec = getattr(web3, 'codec')
+        web3.eth = getattr(web3, 'eth')
+        web3.geth = getattr(web3, 'geth')
+        web3.manager = getattr(web3, 'manager')
+        web3.net = getattr(web3, 'net')
+        web3.parity = getattr(web3, 'parity')
+        web3.provider = getattr(web3, 'provider')
+        web3.testing = getattr(web3, 'testing')
+        web3.version = getattr(web3, 'version')
+        return web3
+
+    @staticmethod
+    def get_network_web3(keeper_url):
+        """
+        Return the web3 instance of a network, created on the first call for its url.
+
+        :param keeper_url: str url of the ethereum client, or list of urls of several
+            endpoints of the same network
+        :return: Web3 instance
+        """
+        key = tuple(keeper_url) if isinstance(keeper_url, (list, tuple)) else keeper_url
+        with Web3Provider._lock:
+            if key not in Web3Provider._network_web3s:
+                Web3Provider._network_web3s[key] = Web3Provider.create_web3(keeper_url)
+            return Web3Provider._network_web3s[key]
+
+    @staticmethod
+    @contextlib.contextmanager
+    def use_web3(web3):
+        """
+        Make `get_web3()` return a web3 instance in the current thread or asyncio task,
+        until the block exits.
+
+        :param web3: Web3 instance
+        """
+        token = Web3Provider._context_web3.set(web3)
+        try:
+            yield web3
+        finally:
+            Web3Provider._context_web3.reset(token)
+
+    @staticmethod
+    def get_network_id(web3=None):
+        """
+        Return the network id (`net_version`) of a web3 instance, read once and cached.
+
+        :param web3: Web3 instance, defaults to `get_web3()`
+        :return: Network id, int
+        """
+        return Web3Provider._get_chain_identity(web3)[2]
+
+    @staticmethod
+    def get_chain_id(web3=None, verify=False):
+        """
+        Return the chain id (`eth_chainId`) of a web3 instance, used to sign transactions.
+        It is read once and cached, and defaults to the network id for the clients that do not
+        provide `eth_chainId`. The cache is dropped when the provider or its endpoint change.
+
+        :param web3: Web3 instance, defaults to `get_web3()`
+        :param verify: bool read `eth_chainId` again the first time the cached value is used
+            to sign a transaction, and raise `ChainIdMismatch` if it changed
+        :return: Chain id, int
+        """
+        web3 = web3 or Web3Provider.get_web3()
+        identity = Web3Provider._get_chain_identity(web3)
+        if verify and not identity[4]:
+            identity = Web3Provider._verify_chain_identity(web3, identity)
+        return identity[3]
+
+    @staticmethod
+    def clear_chain_identity(web3=None):
+        """
+        Drop the cached network and chain ids of a web3 instance, they are read again on the
+        next use. The cache is also dropped when the provider of the instance is replaced.
+
+        :param web3: Web3 instance, defaults to `get_web3()`
+        """
+        web3 = web3 or Web3Provider.get_web3()
+        with Web3Provider._lock:
+            Web3Provider._chain_identities.pop(web3, None)
+
+    @staticmethod
+    def _get_chain_identity(web3):
+        web3 = web3 or Web3Provider.get_web3()
+        provider = web3.provider
+        endpoint = getattr(provider, 'endpoint_uri', None)
+        previous = Web3Provider._chain_identities.get(web3)
+        if previous is not None and previous[0] is provider and previous[1] == endpoint:
+            return previous
+
+        network_id = int(web3.net.version)
+        try:
+            chain_id = int(web3.eth.chain_id)
+        except ValueError as e:
+            logger.warning(f'eth_chainId is not available, signing transactions with the '
+                           f'network id {network_id} as chain id: {e}')
+            chain_id = network_id
+        if chain_id != network_id:
+            logger.warning(f'network id {network_id} differs from chain id {chain_id}, '
+                           f'transactions are signed with the chain id')
+        if previous is not None and previous[3] != chain_id:
+            logger.warning(f'the provider of {web3} switched from chain id {previous[3]} to '
+                           f'{chain_id}')
+
+        # the last item tells whether the chain id was checked again before signing with it
+        identity = (provider, endpoint, network_id, chain_id, False)
+        with Web3Provider._lock:
+            Web3Provider._chain_identities[web3] = identity
+        return identity
+
+    @staticmethod
+    def _verify_chain_identity(web3, identity):
+        try:
+            chain_id = int(web3.eth.chain_id)
+        except ValueError:
+            # the client has no eth_chainId, the network id is the only id it reports
+            chain_id = int(web3.net.version)
+        if chain_id != identity[3]:
+            Web3Provider.clear_chain_identity(web3)
+            raise ChainIdMismatch(identity[3], chain_id)
+
+        identity = identity[:4] + (True,)
+        with Web3Provider._lock:
+            Web3Provider._chain_identities[web3] = identity
+        return identity
+
+    @staticmethod
+    def get_async_web3(keeper_url=None, provider=None):
+        """Return the asyncio web3 instance to interact with the ethereum client."""
+        if Web3Provider._async_web3 is None:
             if not provider:
+                if not keeper_url and Web3Provider._web3 is not None:
+                    keeper_url = getattr(Web3Provider._web3.provider, 'endpoint_uri', None)
                 assert keeper_url, 'keeper_url or a provider instance is required.'
-                provider = CustomHTTPProvider(keeper_url)
+                if isinstance(keeper_url, (list, tuple)):
+                    keeper_url = keeper_url[0]
+                provider = CustomAsyncHTTPProvider(keeper_url)
 
-            Web3Provider._web3 = Web3(provider)
-            # Reset attributes to avoid lint issue about no attribute
-            Web3Provider._web3.EthereumTesterProvider = getattr(Web3Provider._web3, 'EthereumTesterProvider')
-            Web3Provider._web3.HTTPProvider = getattr(Web3Provider._web3, 'HTTPProvider')
-            Web3Provider._web3.IPCProvider = getattr(Web3Provider._web3, 'IPCProvider')
-            Web3Provider._web3.Iban = getattr(Web3Provider._web3, 'Iban')
-            Web3Provider._web3.RequestManager = getattr(Web3Provider._web3, 'RequestManager')
-            Web3Provider._web3.WebsocketProvider = getattr(Web3Provider._web3, 'WebsocketProvider')
-            Web3Provider._web3.codec = getattr(Web3Provider._web3, 'codec')
-            Web3Provider._web3.eth = getattr(Web3Provider._web3, 'eth')
-            Web3Provider._web3.geth = getattr(Web3Provider._web3, 'geth')
-            Web3Provider._web3.manager = getattr(Web3Provider._web3, 'manager')
-            Web3Provider._web3.net = getattr(Web3Provider._web3, 'net')
-            Web3Provider._web3.parity = getattr(Web3Provider._web3, 'parity')
-            Web3Provider._web3.provider = getattr(Web3Provider._web3, 'provider')
-            Web3Provider._web3.testing = getattr(Web3Provider._web3, 'testing')
-            Web3Provider._web3.version = getattr(Web3Provider._web3, 'version')
+            Web3Provider._async_web3 = Web3(
+                provider,
+                middlewares=[],
+                modules={'eth': (AsyncEth,), 'net': (AsyncNet,)}
+            )
 
-        return Web3Provider._web3
+        return Web3Provider._async_web3
 
     @staticmethod
-    def set_web3(web3):
-        Web3Provider._web3 = web3
+    def set_async_web3(web3):
+        Web3Provider._async_web3 = web3
@@ -29,9 +29,11 @@ test_requirements = [
     'codacy-coverage',
     'coverage',
     'docker',
+    'eth-tester[py-evm]',
     'mccabe',
     'pylint',
     'pytest',
+    'pytest-benchmark',
     'pytest-watch',
 ]
 
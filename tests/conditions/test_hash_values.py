@@ -0,0 +1,60 @@
+"""Test the local hash of the condition values."""
+import os
+
+from web3 import Web3
+
+from contracts_lib_py.conditions.condition_base import ConditionBase
+from contracts_lib_py.keeper import Keeper
+
+
+def _random_value(abi_type):
+    if abi_type.endswith(']'):
+        base_type, size = abi_type[:abi_type.rindex('[')], abi_type[abi_type.rindex('[') + 1:-1]
+        return [_random_value(base_type) for _ in range(int(size) if size else 2)]
+    if abi_type == 'bytes32':
+        return '0x' + os.urandom(32).hex()
+    if abi_type == 'address':
+        return Web3.toChecksumAddress('0x' + os.urandom(20).hex())
+    if abi_type.startswith('uint'):
+        return int.from_bytes(os.urandom(8), 'big')
+    if abi_type == 'bool':
+        return os.urandom(1)[0] % 2 == 0
+    if abi_type == 'string':
+        return os.urandom(8).hex()
+    raise AssertionError(f'unexpected type {abi_type}')
+
+
+def test_local_hash_values_match_the_contracts():
+    keeper = Keeper.get_instance()
+    conditions = [contract for contract in keeper.contract_name_to_instance.values()
+                  if isinstance(contract, ConditionBase)]
+    assert conditions
+    for condition in conditions:
+        for fn_abi in condition.contract.abi:
+            if not fn_abi.get('name', '').startswith('hashValues') or \
+                    fn_abi['stateMutability'] != 'pure':
+                continue
+            types = [_input['type'] for _input in fn_abi['inputs']]
+            args = [_random_value(abi_type) for abi_type in types]
+            contract_hash = condition.contract.get_function_by_signature(
+                f'{fn_abi["name"]}({",".join(types)})')(*args).call()
+            assert condition._compute_hash_values(fn_abi['name'], fn_abi, args, {}) == \
+                contract_hash, f'{condition.name}.{fn_abi["name"]}({",".join(types)})'
+
+
+def test_hash_values_are_verified_once():
+    keeper = Keeper.get_instance()
+    did = '0x' + os.urandom(32).hex()
+    grantee = Web3.toChecksumAddress('0x' + os.urandom(20).hex())
+    contract_hash = keeper.access_condition.contract.caller.hashValues(did, grantee)
+
+    assert keeper.access_condition.hash_values(did, grantee) == contract_hash
+    assert ConditionBase._verified_hash_functions[
+        (keeper.access_condition.address, 'hashValues(bytes32,address)')]
+    assert keeper.access_condition.hash_values(did, grantee) == contract_hash
+
+    ConditionBase.disable_local_hash_values()
+    try:
+        assert keeper.access_condition.hash_values(did, grantee) == contract_hash
+    finally:
+        ConditionBase.enable_local_hash_values()
@@ -0,0 +1,89 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RPCError(Exception):
+    """Raised by a handler to answer with a JSON-RPC error."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class LocalRPCServer:
+    """Minimal JSON-RPC server running in a background thread, used to test the providers."""
+
+    def __init__(self, handlers=None):
+        self.handlers = handlers or {}
+        self.posts = []
+        self.status_code = 200
+        # number of requests answered with `status_code` before answering normally,
+        # None to always answer with it
+        self.failures = None
+        self.headers = {}
+        self.delay = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _answer(self, rpc_request):
+        handler = self.handlers.get(rpc_request['method'])
+        if handler is None:
+            return {'jsonrpc': '2.0', 'id': rpc_request['id'],
+                    'error': {'code': -32601, 'message': 'Method not found'}}
+        try:
+            result = handler(*rpc_request['params'])
+        except RPCError as e:
+            return {'jsonrpc': '2.0', 'id': rpc_request['id'],
+                    'error': {'code': e.code, 'message': e.message}}
+        return {'jsonrpc': '2.0', 'id': rpc_request['id'], 'result': result}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                server.posts.append(body)
+                if server.delay:
+                    threading.Event().wait(server.delay)
+                if server.status_code != 200 and server.failures != 0:
+                    if server.failures is not None:
+                        server.failures -= 1
+                    self.send_response(server.status_code)
+                    for key, value in server.headers.items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    return
+
+                if isinstance(body, list):
+                    # answer in reverse order, clients must match responses by id
+                    response = [server._answer(item) for item in reversed(body)]
+                else:
+                    response = server._answer(body)
+                data = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
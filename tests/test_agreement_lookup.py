@@ -0,0 +1,77 @@
+import uuid
+
+from web3 import Web3
+
+from contracts_lib_py.agreements.agreement_lookup import AgreementLookup, find_deployment_block
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from contracts_lib_py.web3_provider import Web3Provider
+from tests.resources.rpc_server import LocalRPCServer
+
+
+def test_find_deployment_block():
+    keeper = Keeper.get_instance()
+    web3 = Web3Provider.get_web3()
+    block = find_deployment_block(keeper.access_template.address)
+    assert block <= web3.eth.block_number
+    assert web3.eth.get_code(keeper.access_template.address, block)
+    if block > 0:
+        assert not web3.eth.get_code(keeper.access_template.address, block - 1)
+    # the result is cached
+    assert find_deployment_block(keeper.access_template.address) == block
+
+
+def test_deployment_block_is_cached_per_chain():
+    address = '0x' + '42' * 20
+
+    def handlers(chain_id, deployment_block):
+        return {
+            'net_version': lambda: str(chain_id),
+            'eth_chainId': lambda: hex(chain_id),
+            'eth_blockNumber': lambda: hex(100),
+            'eth_getCode': lambda _, block: '0x60' if int(block, 16) >= deployment_block else '0x',
+        }
+
+    with LocalRPCServer(handlers(1001, 10)) as server_a, \
+            LocalRPCServer(handlers(1002, 70)) as server_b:
+        web3_a = Web3(CustomHTTPProvider(server_a.url))
+        web3_b = Web3(CustomHTTPProvider(server_b.url))
+        assert find_deployment_block(address, web3_a) == 10
+        assert find_deployment_block(address, web3_b) == 70
+        server_a.posts.clear()
+        assert find_deployment_block(address, web3_a) == 10
+        assert server_a.posts == []
+
+
+def test_unknown_agreements_are_not_cached():
+    keeper = Keeper.get_instance()
+    lookup = AgreementLookup()
+    agreement_ids = ['0x' + '11' * 32, '0x' + '22' * 32]
+    assert lookup.get_agreements_created(keeper.access_template, agreement_ids) == [None, None]
+    assert lookup.get_agreement_created(keeper.access_template, agreement_ids[0]) is None
+    assert len(lookup._cache) == 0
+
+
+def test_get_agreements(publisher_account, consumer_account):
+    keeper = Keeper.get_instance()
+    access_template = keeper.access_template
+    keeper.agreement_manager.set_templates({access_template.address: access_template})
+
+    did_seed = Web3.keccak(text=uuid.uuid4().hex)
+    keeper.did_registry.register(did_seed, Web3.keccak(text='checksum'),
+                                 url='http://localhost:5000', account=publisher_account)
+    did = keeper.did_registry.hash_did(did_seed, publisher_account.address)
+    agreement_id_seed = Web3.keccak(text=uuid.uuid4().hex).hex()
+    agreement_id = keeper.agreement_manager.hash_id(agreement_id_seed, consumer_account.address)
+    condition_seeds = [Web3.keccak(text=uuid.uuid4().hex) for _ in range(3)]
+    assert access_template.create_agreement(
+        agreement_id_seed, did, condition_seeds, [0, 0, 0], [0, 0, 0],
+        consumer_account.address, consumer_account)
+
+    unknown_id = '0x' + '33' * 32
+    agreement, unknown = keeper.agreement_manager.get_agreements([agreement_id, unknown_id])
+    assert unknown is None
+    assert agreement.did == did
+    assert agreement.template_id == access_template.address
+    assert agreement.condition_id_seeds == [seed.hex() for seed in condition_seeds]
+    assert keeper.agreement_manager.get_agreement(agreement_id) == agreement
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+from web3 import Web3
+from web3.eth import AsyncEth
+from web3.net import AsyncNet
+
+from contracts_lib_py.async_contract_base import AsyncContractBase
+from contracts_lib_py.async_keeper import AsyncKeeper
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.nonce_manager import NonceManager
+from contracts_lib_py.wallet import Wallet
+from contracts_lib_py.web3.async_http_provider import CustomAsyncHTTPProvider
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from contracts_lib_py.web3_provider import Web3Provider
+from tests.resources.helper_functions import get_keeper_url
+from tests.resources.rpc_server import LocalRPCServer
+
+
+def _async_keeper():
+    return AsyncKeeper(Keeper.get_instance(), Web3Provider.get_async_web3(get_keeper_url()))
+
+
+def test_async_calls(publisher_account):
+    keeper = Keeper.get_instance()
+    async_keeper = _async_keeper()
+
+    async def run():
+        results = await asyncio.gather(
+            async_keeper.get_network_id(),
+            async_keeper.token.call('balanceOf', publisher_account.address),
+            async_keeper.condition_manager.call('getConditionListSize'),
+        )
+        await async_keeper.close()
+        return results
+
+    network_id, balance, num_conditions = asyncio.run(run())
+    assert network_id == keeper.get_network_id()
+    assert balance == keeper.token.get_token_balance(publisher_account.address)
+    assert num_conditions == keeper.condition_manager.get_num_condition()
+
+
+def test_async_send_transaction(publisher_account, consumer_account):
+    keeper = Keeper.get_instance()
+    async_keeper = _async_keeper()
+    amount = keeper.token.get_allowance(publisher_account.address, consumer_account.address) + 1
+
+    async def run():
+        tx_hash = await async_keeper.token.send_transaction(
+            'approve',
+            (consumer_account.address, amount),
+            transact={'from': publisher_account.address,
+                      'passphrase': publisher_account.password,
+                      'keyfile': publisher_account.key_file}
+        )
+        successful = await async_keeper.token.is_tx_successful(tx_hash)
+        await async_keeper.close()
+        return successful
+
+    assert asyncio.run(run())
+    assert keeper.token.get_allowance(publisher_account.address, consumer_account.address) == amount
+
+
+
+def test_nonce_error_resyncs_the_nonces(monkeypatch):
+    address = '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'
+    nonce_manager = NonceManager()
+    monkeypatch.setattr(Wallet, 'nonce_manager', nonce_manager)
+    chain = {'transaction_count': 5}
+    handlers = {
+        'net_version': lambda: '8996',
+        'eth_chainId': lambda: hex(8996),
+        'eth_getTransactionCount': lambda *args: hex(chain['transaction_count']),
+    }
+    with LocalRPCServer(handlers) as server:
+        web3 = Web3(CustomHTTPProvider(server.url))
+        async_web3 = Web3(CustomAsyncHTTPProvider(server.url), middlewares=[],
+                          modules={'eth': (AsyncEth,), 'net': (AsyncNet,)})
+        async_base = AsyncContractBase(SimpleNamespace(web3=web3, contract=None), async_web3)
+        nonces = [nonce_manager.next_nonce(web3, address) for _ in range(3)]
+        assert nonces == [5, 6, 7]
+
+        # 5 and 6 reached the client pool, 7 was rejected
+        chain['transaction_count'] = 7
+        tx = {'from': address, 'nonce': 7, 'chainId': 8996}
+        asyncio.run(async_base._reclaim_nonce(tx, True, ValueError('nonce too low')))
+        assert nonce_manager.pending_nonces(web3, address) == [5, 6]
+        assert nonce_manager.next_nonce(web3, address) == 7
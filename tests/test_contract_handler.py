@@ -0,0 +1,111 @@
+import json
+import os
+import weakref
+
+import pytest
+
+from contracts_lib_py.contract_handler import ContractHandler
+
+ADDRESS = '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'
+# the network name is set with KEEPER_NETWORK_NAME, the id is not read from a client
+NETWORK_ID = 8996
+
+
+def _write_artifact(path, version):
+    path.write_text(json.dumps({
+        'address': ADDRESS,
+        'abi': [],
+        'version': version,
+        'bytecode': '0x6080604052',
+    }))
+
+
+def test_contract_definition_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('KEEPER_NETWORK_NAME', 'development')
+    monkeypatch.setattr(ContractHandler, 'cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(ContractHandler, '_definition_caches', {})
+    artifacts_path = tmp_path / 'artifacts'
+    artifacts_path.mkdir()
+    artifact = artifacts_path / 'CachedContract.Development.json'
+    _write_artifact(artifact, 'v1.0.0')
+    # the other artifacts are not read to load a contract
+    (artifacts_path / 'OtherContract.development.json').write_text('not json')
+
+    definition = ContractHandler.get_contract_definition('CachedContract', str(artifacts_path),
+                                                         NETWORK_ID)
+    assert definition == {'address': ADDRESS, 'abi': [], 'version': 'v1.0.0'}
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+    assert list(ContractHandler._get_definition_cache(str(artifacts_path))) == [artifact.name]
+
+    # a new process reads the definition from the cache
+    ContractHandler._definition_caches.clear()
+    cache = ContractHandler._get_definition_cache(str(artifacts_path))
+    assert cache[artifact.name][1] == definition
+
+    # the cache is invalidated when the artifact changes
+    _write_artifact(artifact, 'v1.0.10')
+    definition = ContractHandler.get_contract_definition('CachedContract', str(artifacts_path),
+                                                         NETWORK_ID)
+    assert definition['version'] == 'v1.0.10'
+    assert ContractHandler.get_contract_dict_by_name(
+        'CachedContract', str(artifacts_path), NETWORK_ID)['bytecode'] == '0x6080604052'
+
+
+def _network_web3(network_id):
+    from web3 import EthereumTesterProvider, Web3
+
+    def net_version_middleware(make_request, web3):
+        def middleware(method, params):
+            if method == 'net_version':
+                return {'result': str(network_id)}
+            if method == 'eth_chainId':
+                return {'result': hex(network_id)}
+            return make_request(method, params)
+        return middleware
+
+    web3 = Web3(EthereumTesterProvider())
+    web3.middleware_onion.add(net_version_middleware)
+    return web3
+
+
+def test_contracts_are_kept_per_network(tmp_path, monkeypatch):
+    pytest.importorskip('eth_tester')
+    from contracts_lib_py.keeper import Keeper
+    from contracts_lib_py.web3_provider import Web3Provider
+
+    monkeypatch.setenv('KEEPER_NETWORK_NAME', 'development')
+    monkeypatch.setattr(ContractHandler, 'cache_dir', None)
+    monkeypatch.setattr(ContractHandler, 'artifacts_path', str(tmp_path))
+    monkeypatch.setattr(ContractHandler, '_contracts', {})
+    monkeypatch.setattr(ContractHandler, '_bound_contracts', weakref.WeakKeyDictionary())
+    _write_artifact(tmp_path / 'NetworkContract.development.json', 'v1.0.0')
+    web3_a, web3_b = _network_web3(1001), _network_web3(1002)
+
+    contract_a = ContractHandler.get('NetworkContract', web3_a)
+    assert ContractHandler.has('NetworkContract', web3_a)
+    assert not ContractHandler.has('NetworkContract', web3_b)
+    with Web3Provider.use_web3(web3_b):
+        assert Web3Provider.get_web3() is web3_b
+        contract_b = ContractHandler.get('NetworkContract')
+    assert Web3Provider.get_web3() is not web3_b
+
+    assert contract_a.web3 is web3_a
+    assert contract_b.web3 is web3_b
+    assert ContractHandler.get('NetworkContract', web3_a) is contract_a
+    assert set(ContractHandler._contracts) == {(1001, 'NetworkContract'),
+                                               (1002, 'NetworkContract')}
+
+    # another web3 instance of the same chain gets the contract bound to itself
+    web3_c = _network_web3(1001)
+    contract_c = ContractHandler.get('NetworkContract', web3_c)
+    assert contract_c.web3 is web3_c
+    assert contract_c.address == contract_a.address
+    assert ContractHandler.get('NetworkContract', web3_c) is contract_c
+    assert ContractHandler.get('NetworkContract', web3_a) is contract_a
+    assert len(ContractHandler._contracts) == 2
+
+    # the keeper helpers use the web3 instance the keeper is bound to
+    keeper_b = Keeper.get_instance(str(tmp_path), web3=web3_b)
+    assert keeper_b.get_network_id() == 1002
+    address = web3_b.eth.accounts[0]
+    assert keeper_b.get_ether_balance(address) == web3_b.eth.get_balance(address)
@@ -0,0 +1,140 @@
+import time
+from types import SimpleNamespace
+
+from eth_abi import encode_abi
+from web3 import Web3
+
+from contracts_lib_py import event_index
+from contracts_lib_py.did_register_cache import DIDRegisterCache
+from contracts_lib_py.didregistry import DIDRegistry
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from tests.resources.rpc_server import LocalRPCServer
+
+ADDRESS = '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'
+OWNER = '0x068Ed00cF0441e4829D9784fCBe7b9e26D4BD8d0'
+PROVIDER = '0x1D7B3EC46d3c0b81c2E7d85b62B2abB0b3CB5Bd0'
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+DID = '0x' + '11' * 32
+UNREGISTERED_DID = '0x' + '22' * 32
+REGISTER_TYPES = ['address', 'bytes32', 'string', 'address', 'uint256', 'address[]', 'uint256',
+                  'uint256', 'uint256']
+ABI = [
+    {'type': 'function', 'name': 'getDIDRegister', 'stateMutability': 'view',
+     'inputs': [{'name': '_did', 'type': 'bytes32'}],
+     'outputs': [{'name': f'out{i}', 'type': t} for i, t in enumerate(REGISTER_TYPES)]},
+    {'type': 'function', 'name': 'getPermission', 'stateMutability': 'view',
+     'inputs': [{'name': '_did', 'type': 'bytes32'}, {'name': '_grantee', 'type': 'address'}],
+     'outputs': [{'name': '', 'type': 'bool'}]},
+]
+GET_DID_REGISTER = Web3.keccak(text='getDIDRegister(bytes32)')[:4].hex()
+CHAIN_ID = 8996
+
+
+def _eth_call(transaction, block):
+    if transaction['data'].startswith(GET_DID_REGISTER):
+        if transaction['data'].endswith(UNREGISTERED_DID[2:]):
+            return '0x' + encode_abi(REGISTER_TYPES, [
+                ZERO_ADDRESS, b'\x00' * 32, '', ZERO_ADDRESS, 0, [], 0, 0, 0
+            ]).hex()
+        return '0x' + encode_abi(REGISTER_TYPES, [
+            OWNER, b'\x00' * 32, 'http://localhost:5000', OWNER, 12, [PROVIDER], 0, 0, 0
+        ]).hex()
+    return '0x' + encode_abi(['bool'], [True]).hex()
+
+
+def _eth_calls(server):
+    return len([post for post in server.posts if post['method'] == 'eth_call'])
+
+
+def _did_registry(url):
+    web3 = Web3(CustomHTTPProvider(url))
+    contract = web3.eth.contract(address=ADDRESS, abi=ABI)
+    handler = SimpleNamespace(get=lambda name: contract,
+                              get_contract_version=lambda name: 'v2.0.0')
+    return DIDRegistry('DIDRegistry', {'ContractHandler': handler})
+
+
+def test_cache_expiration_and_eviction():
+    cache = DIDRegisterCache(ttl=0.1, max_size=2)
+    keys = [DIDRegisterCache.make_key(CHAIN_ID, ADDRESS, bytes([i]) * 32) for i in range(3)]
+    assert keys[0] == DIDRegisterCache.make_key(CHAIN_ID, ADDRESS.lower(), '00' * 32)
+    assert keys[0] != DIDRegisterCache.make_key(CHAIN_ID + 1, ADDRESS, '00' * 32)
+    assert DIDRegisterCache.make_key(CHAIN_ID, ADDRESS, 'did:nv:' + '00' * 32) is None
+
+    assert cache.get(keys[0], 'register', lambda: 1) == 1
+    assert cache.get(keys[0], 'register', lambda: 2) == 1
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    cache.get(keys[1], 'register', lambda: 1)
+    cache.get(keys[2], 'register', lambda: 1)
+    assert len(cache) == 2
+    assert cache.get(keys[0], 'register', lambda: 3) == 3
+
+    time.sleep(0.15)
+    assert cache.get(keys[0], 'register', lambda: 4) == 4
+
+
+def test_invalidation():
+    cache = DIDRegisterCache()
+    key = DIDRegisterCache.make_key(CHAIN_ID, ADDRESS, DID)
+    cache.get(key, 'register', lambda: 1)
+    cache.get(key, ('permission', OWNER.lower()), lambda: True)
+    cache.invalidate(key)
+    assert len(cache) == 0
+
+    # a value read while the did is invalidated is not stored
+    def loader():
+        cache.invalidate(key)
+        return 2
+
+    assert cache.get(key, 'register', loader) == 2
+    assert cache.get(key, 'register', lambda: 3) == 3
+
+    cache.on_indexed_log({'event': 'Approval', 'address': ADDRESS, 'args': {}}, CHAIN_ID)
+    assert len(cache) == 1
+    log = {'event': 'DIDAttributeRegistered', 'address': ADDRESS,
+           'args': {'_did': Web3.toBytes(hexstr=DID)}}
+    # the registry at the same address on another chain is another registry
+    cache.on_indexed_log(log, CHAIN_ID + 1)
+    assert len(cache) == 1
+    cache.on_indexed_log(log, CHAIN_ID)
+    assert len(cache) == 0
+
+
+def test_lookups_share_the_register():
+    handlers = {
+        'eth_call': _eth_call,
+        'net_version': lambda: str(CHAIN_ID),
+        'eth_chainId': lambda: hex(CHAIN_ID),
+    }
+    with LocalRPCServer(handlers) as server:
+        did_registry = _did_registry(server.url)
+        cache = DIDRegistry.enable_register_cache()
+        try:
+            assert cache.on_indexed_log in event_index.hooks
+            assert did_registry.get_did_owner(DID) == OWNER
+            assert did_registry.get_did_providers(DID) == [PROVIDER]
+            assert did_registry.is_did_provider(DID, PROVIDER.lower()) is True
+            assert did_registry.is_did_provider(DID, OWNER) is False
+            assert did_registry.get_block_number_updated(DID) == 12
+            assert did_registry.get_did_register(DID)['url'] == 'http://localhost:5000'
+            assert did_registry.get_permission(DID, OWNER) is True
+            assert did_registry.get_permission(DID, OWNER) is True
+            assert _eth_calls(server) == 2
+
+            cache.on_indexed_log({'event': 'DIDAttributeRegistered', 'address': ADDRESS,
+                                  'args': {'_did': Web3.toBytes(hexstr=DID)}}, CHAIN_ID)
+            assert did_registry.get_did_owner(DID) == OWNER
+            assert _eth_calls(server) == 3
+
+            # a did that is not registered yet is read again every time
+            assert did_registry.get_did_owner(UNREGISTERED_DID) == ZERO_ADDRESS
+            assert did_registry.get_block_number_updated(UNREGISTERED_DID) == 0
+            assert _eth_calls(server) == 5
+        finally:
+            DIDRegistry.disable_register_cache()
+        assert event_index.hooks == ()
+
+        did_registry.get_did_providers(DID)
+        did_registry.get_did_providers(DID)
+        assert _eth_calls(server) == 7
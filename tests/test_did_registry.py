@@ -167,6 +167,36 @@ def test_grant_permissions():
     assert not did_registry.get_permission(asset_id, test_address)
 
 
+def test_register_cache():
+    register_account = get_publisher_account()
+    did_registry = DIDRegistry.get_instance()
+    w3 = Web3
+
+    did_seed = new_did()
+    asset_id = did_registry.hash_did(did_seed, register_account.address)
+    test_address = w3.toChecksumAddress('068ed00cf0441e4829d9784fcbe7b9e26d4bd8d0')
+
+    cache = DIDRegistry.enable_register_cache()
+    try:
+        assert did_registry.get_block_number_updated(asset_id) == 0
+        did_registry.register(did_seed, w3.keccak(text='checksum'), url='http://localhost:5000',
+                              account=register_account)
+        assert did_registry.get_did_owner(asset_id) == register_account.address
+        assert did_registry.get_block_number_updated(asset_id) > 0
+        assert did_registry.is_did_provider(asset_id, test_address) is False
+        assert cache.stats()['hits'] == 2
+
+        assert did_registry.add_provider(asset_id, test_address, register_account)
+        assert did_registry.is_did_provider(asset_id, test_address) is True
+        assert not did_registry.get_permission(asset_id, test_address)
+        assert did_registry.grant_permission(asset_id, test_address, register_account)
+        assert did_registry.get_permission(asset_id, test_address)
+        assert did_registry.transfer_did_ownership(asset_id, test_address, register_account)
+        assert did_registry.get_did_owner(asset_id) == test_address
+    finally:
+        DIDRegistry.disable_register_cache()
+
+
 def test_provenance_events():
     register_account = get_publisher_account()
     did_registry = DIDRegistry.get_instance()
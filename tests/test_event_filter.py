@@ -0,0 +1,116 @@
+import pytest
+from web3 import Web3
+
+from contracts_lib_py.event_filter import EventFilter
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from contracts_lib_py.web3_provider import Web3Provider
+from tests.resources.rpc_server import LocalRPCServer, RPCError
+
+
+@pytest.fixture
+def rpc_web3():
+    web3 = Web3Provider.get_web3()
+    yield
+    Web3Provider.set_web3(web3)
+
+
+APPROVAL_ABI = [{
+    'anonymous': False,
+    'inputs': [
+        {'indexed': True, 'name': 'owner', 'type': 'address'},
+        {'indexed': True, 'name': 'spender', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ],
+    'name': 'Approval',
+    'type': 'event'
+}]
+
+
+def _log_queries(server):
+    return [(int(post['params'][0]['fromBlock'], 16), int(post['params'][0]['toBlock'], 16))
+            for post in server.posts if post['method'] == 'eth_getLogs']
+
+
+def _event_filter(server, **kwargs):
+    web3 = Web3(CustomHTTPProvider(server.url))
+    Web3Provider.set_web3(web3)
+    event = web3.eth.contract(address='0x' + '01' * 20, abi=APPROVAL_ABI).events.Approval
+    return EventFilter('Approval', event, {}, **kwargs)
+
+
+def test_cursor_and_adaptive_chunks(rpc_web3):
+    head = {'block': 1000}
+    failed = []
+
+    def get_logs(log_filter):
+        from_block, to_block = int(log_filter['fromBlock'], 16), int(log_filter['toBlock'], 16)
+        if to_block - from_block >= 300:
+            failed.append((from_block, to_block))
+            raise RPCError(-32005, 'query exceeds max block range 300')
+        return []
+
+    handlers = {
+        'net_version': lambda: '8996',
+        'eth_blockNumber': lambda: hex(head['block']),
+        'eth_getLogs': get_logs,
+    }
+    with LocalRPCServer(handlers) as server:
+        event_filter = _event_filter(server, from_block=100, to_block='latest',
+                                     confirmations=5)
+        assert event_filter.chunk_size is None
+        assert event_filter.get_new_entries() == []
+        queries = [query for query in _log_queries(server) if query not in failed]
+        # the whole range is scanned once, in chunks that never exceed a size that failed
+        assert queries[0][0] == 100 and queries[-1][1] == 995
+        assert all(queries[i][1] + 1 == queries[i + 1][0] for i in range(len(queries) - 1))
+        failed_sizes = [end - start + 1 for start, end in failed]
+        assert failed_sizes == sorted(failed_sizes, reverse=True)
+        assert event_filter.cursor == 996
+
+        # only the new blocks are queried
+        server.posts.clear()
+        head['block'] = 1010
+        event_filter.get_new_entries()
+        assert _log_queries(server)[-1] == (996, 1005)
+        assert event_filter.cursor == 1006
+
+        # the chunks settle on the provider limit, without more failed queries
+        server.posts.clear()
+        failed.clear()
+        for _ in range(3):
+            event_filter.get_all_entries()
+        assert _log_queries(server)[0][0] == 100
+        assert len(failed) <= 3
+        server.posts.clear()
+        failed.clear()
+        event_filter.get_all_entries()
+        assert failed == []
+        assert event_filter.chunk_size == 300
+
+
+def test_range_is_queried_at_once(rpc_web3):
+    handlers = {
+        'net_version': lambda: '8996',
+        'eth_blockNumber': lambda: hex(50000000),
+        'eth_getLogs': lambda log_filter: [],
+    }
+    with LocalRPCServer(handlers) as server:
+        event_filter = _event_filter(server, from_block=0, to_block='latest')
+        assert event_filter.get_all_entries() == []
+        assert _log_queries(server) == [(0, 50000000)]
+
+
+def test_range_error_is_raised_at_min_chunk(rpc_web3):
+    def get_logs(log_filter):
+        raise RPCError(-32005, 'query returned more than 10000 results')
+
+    handlers = {
+        'net_version': lambda: '8996',
+        'eth_blockNumber': lambda: '0x10',
+        'eth_getLogs': get_logs,
+    }
+    with LocalRPCServer(handlers) as server:
+        event_filter = _event_filter(server, from_block=0, to_block='latest', chunk_size=4)
+        with pytest.raises(ValueError):
+            event_filter.get_all_entries()
+        assert event_filter.chunk_size == EventFilter.MIN_CHUNK_SIZE
@@ -0,0 +1,129 @@
+from eth_abi import encode_abi
+from web3 import Web3
+
+from contracts_lib_py import event_index
+from contracts_lib_py.event_filter import EventFilter
+from contracts_lib_py.event_index import EventIndex
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from tests.resources.rpc_server import LocalRPCServer
+from tests.test_event_filter import APPROVAL_ABI
+
+ADDRESS = '0x' + '01' * 20
+OWNER = '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'
+
+
+def _approval_filter(argument_filters):
+    keeper = Keeper.get_instance()
+    return EventFilter('Approval', keeper.token.contract.events.Approval, argument_filters,
+                       from_block=0, to_block='latest')
+
+
+def test_get_all_entries_from_index(publisher_account, tmp_path):
+    keeper = Keeper.get_instance()
+    spender = keeper.escrow_payment_condition.address
+    assert keeper.token.token_approve(spender, 11, publisher_account)
+    argument_filters = {'owner': publisher_account.address, 'spender': spender}
+    chain_entries = _approval_filter(argument_filters).get_all_entries()
+
+    index = EventFilter.enable_event_index(str(tmp_path / 'events.db'))
+    try:
+        assert _approval_filter(argument_filters).get_all_entries() == chain_entries
+        checkpoint = index.checkpoint(keeper.token.contract.events.Approval)
+        assert checkpoint is not None
+
+        # new logs are indexed incrementally
+        assert keeper.token.token_approve(spender, 12, publisher_account)
+        entries = _approval_filter(argument_filters).get_all_entries()
+        assert entries[:-1] == chain_entries
+        assert entries[-1].args.value == 12
+        assert index.checkpoint(keeper.token.contract.events.Approval) > checkpoint
+
+        # addresses given as bytes match too, as in the DIDRegistry filters
+        assert _approval_filter({
+            'owner': Web3.toBytes(hexstr=publisher_account.address),
+            'spender': [spender, keeper.lock_payment_condition.address]
+        }).get_all_entries()[-1] == entries[-1]
+    finally:
+        EventFilter.disable_event_index()
+
+    # the checkpoint is kept in the database
+    index = EventIndex(str(tmp_path / 'events.db'))
+    assert index.checkpoint(keeper.token.contract.events.Approval) is not None
+    index.close()
+
+
+def _approval_log(block_number, block_hash, tx_hash, value):
+    return {
+        'address': ADDRESS,
+        'topics': [Web3.keccak(text='Approval(address,address,uint256)').hex(),
+                   '0x' + encode_abi(['address'], [OWNER]).hex(),
+                   '0x' + encode_abi(['address'], [OWNER]).hex()],
+        'data': '0x' + encode_abi(['uint256'], [value]).hex(),
+        'blockNumber': hex(block_number),
+        'blockHash': block_hash,
+        'transactionHash': tx_hash,
+        'transactionIndex': '0x0',
+        'logIndex': '0x0',
+        'removed': False,
+    }
+
+
+def test_reorganized_logs_are_removed():
+    chain = {'head': 10, 'fork': '11'}
+    moved_tx, dropped_tx = '0x' + '22' * 32, '0x' + '33' * 32
+
+    def block_hash(block_number):
+        # the blocks from 5 are replaced by the fork
+        return '0x' + (chain['fork'] if block_number >= 5 else '00') * 31 + f'{block_number:02x}'
+
+    def get_logs(log_filter):
+        if chain['fork'] == '11':
+            logs = [_approval_log(6, block_hash(6), moved_tx, 1),
+                    _approval_log(7, block_hash(7), dropped_tx, 2)]
+        else:
+            # one transaction is mined again in a later block, the other one is dropped
+            logs = [_approval_log(8, block_hash(8), moved_tx, 1)]
+        from_block, to_block = int(log_filter['fromBlock'], 16), int(log_filter['toBlock'], 16)
+        return [log for log in logs if from_block <= int(log['blockNumber'], 16) <= to_block]
+
+    handlers = {
+        'net_version': lambda: '8996',
+        'eth_chainId': lambda: hex(8996),
+        'eth_blockNumber': lambda: hex(chain['head']),
+        'eth_getBlockByNumber': lambda number, full: {
+            'number': number, 'hash': block_hash(int(number, 16)),
+            'parentHash': block_hash(int(number, 16) - 1)},
+        'eth_getLogs': get_logs,
+    }
+    hooked = []
+
+    def hook(log, chain_id):
+        hooked.append(log)
+
+    event_index.add_hook(hook)
+    index = EventIndex(reorg_depth=8)
+    try:
+        with LocalRPCServer(handlers) as server:
+            web3 = Web3(CustomHTTPProvider(server.url))
+            event = web3.eth.contract(address=ADDRESS, abi=APPROVAL_ABI).events.Approval
+            assert [log.args.value for log in index.get_entries(event)] == [1, 2]
+            assert len(hooked) == 2
+
+            # the block of the checkpoint is the same, the logs are kept
+            chain['head'] = 12
+            index.sync()
+            assert len(index.get_entries(event)) == 2
+            assert len(hooked) == 2
+
+            chain.update(head=14, fork='44')
+            index.sync()
+            entries = index.get_entries(event)
+            assert [(log.blockNumber, log.transactionHash.hex()) for log in entries] == \
+                [(8, moved_tx)]
+            assert [(log.transactionHash.hex(), log.get('removed')) for log in hooked[2:]] == \
+                [(dropped_tx, True), (moved_tx, None)]
+            assert index.checkpoint(event) == 14
+    finally:
+        event_index.remove_hook(hook)
+        index.close()
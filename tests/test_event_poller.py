@@ -0,0 +1,130 @@
+import threading
+import time
+
+from eth_abi import encode_abi
+from web3 import Web3
+
+from contracts_lib_py.event_listener import EventListener
+from contracts_lib_py.event_poller import EventPoller
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from contracts_lib_py.web3_provider import Web3Provider
+from tests.resources.rpc_server import LocalRPCServer, RPCError
+from tests.test_event_filter import APPROVAL_ABI
+
+ADDRESS = '0x' + '01' * 20
+OWNER = '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'
+
+
+def test_subscriptions_share_one_thread(publisher_account, consumer_account):
+    keeper = Keeper.get_instance()
+    poller = EventPoller(Web3Provider.get_web3(), poll_interval=0.2)
+    received = []
+    approval = keeper.token.contract.events.Approval
+    spenders = [keeper.lock_payment_condition.address, keeper.escrow_payment_condition.address]
+
+    threads_before = threading.active_count()
+    subscriptions = [
+        poller.subscribe(approval, {'owner': publisher_account.address, 'spender': spender},
+                         lambda event, spender: received.append((spender, event)),
+                         timeout=60, args=[spender])
+        for spender in spenders
+    ]
+    # a subscription that never matches times out
+    poller.subscribe(approval, {'owner': consumer_account.address, 'spender': spenders[0]},
+                     lambda event, spender: received.append((spender, event)),
+                     timeout=1, args=['timeout'])
+    assert threading.active_count() <= threads_before + 1
+
+    time.sleep(0.5)
+    for i, spender in enumerate(spenders):
+        assert keeper.token.token_approve(spender, i + 1, publisher_account)
+
+    deadline = time.time() + 30
+    while len(received) < 3 and time.time() < deadline:
+        time.sleep(0.2)
+
+    events = dict(received)
+    assert events['timeout'] is None
+    for i, spender in enumerate(spenders):
+        assert events[spender].args.value == i + 1
+    assert all(not subscription.active for subscription in subscriptions)
+    assert poller.subscription_count == 0
+
+
+def test_listen_once_finds_past_events(publisher_account):
+    keeper = Keeper.get_instance()
+    spender = keeper.access_condition.address
+    assert keeper.token.token_approve(spender, 3, publisher_account)
+
+    event = EventListener(
+        'NeverminedToken', 'Approval',
+        filters={'owner': publisher_account.address, 'spender': spender}
+    ).listen_once(None, timeout=30, blocking=True)
+    assert event.args.spender == spender
+
+
+def _approval_log(block_number, value):
+    return {
+        'address': ADDRESS,
+        'topics': [Web3.keccak(text='Approval(address,address,uint256)').hex(),
+                   '0x' + encode_abi(['address'], [OWNER]).hex(),
+                   '0x' + encode_abi(['address'], [OWNER]).hex()],
+        'data': '0x' + encode_abi(['uint256'], [value]).hex(),
+        'blockNumber': hex(block_number),
+        'blockHash': '0x' + '11' * 32,
+        'transactionHash': '0x' + '22' * 32,
+        'transactionIndex': '0x0',
+        'logIndex': '0x0',
+        'removed': False,
+    }
+
+
+def test_poll_advances_in_chunks():
+    state = {'head': 100, 'down': False}
+    queries = []
+
+    def get_logs(log_filter):
+        from_block, to_block = int(log_filter['fromBlock'], 16), int(log_filter['toBlock'], 16)
+        if state['down']:
+            raise RPCError(-32000, 'upstream unavailable')
+        if to_block - from_block >= 300:
+            raise RPCError(-32005, 'query exceeds max block range 300')
+        queries.append((from_block, to_block))
+        return [_approval_log(1050, 7)] if from_block <= 1050 <= to_block else []
+
+    handlers = {
+        'net_version': lambda: '8996',
+        'eth_chainId': lambda: hex(8996),
+        'eth_blockNumber': lambda: hex(state['head']),
+        'eth_getLogs': get_logs,
+    }
+    with LocalRPCServer(handlers) as server:
+        web3 = Web3(CustomHTTPProvider(server.url))
+        event = web3.eth.contract(address=ADDRESS, abi=APPROVAL_ABI).events.Approval
+        poller = EventPoller(web3, poll_interval=0.05)
+        received = []
+        subscription = poller.subscribe(event, {'owner': OWNER}, received.append, once=False)
+        try:
+            assert _wait_for(lambda: poller._last_block == 100)
+
+            # the blocks added during an outage are polled once it is over
+            state.update(head=1100, down=True)
+            time.sleep(0.3)
+            assert poller._last_block == 100
+            state['down'] = False
+            assert _wait_for(lambda: poller._last_block == 1100 and received)
+        finally:
+            poller.unsubscribe(subscription)
+
+        assert received[0].args.value == 7
+        assert queries[0][0] == 101 and queries[-1][1] == 1100
+        assert all(queries[i][1] + 1 == queries[i + 1][0] for i in range(len(queries) - 1))
+        assert all(end - start < 300 for start, end in queries)
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.05)
+    return condition()
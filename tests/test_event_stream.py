@@ -0,0 +1,50 @@
+from contracts_lib_py.event_stream import EventStream
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.web3_provider import Web3Provider
+
+
+def _values(stream_events, kind):
+    return [e.log.args.value for e in stream_events if e.kind == kind]
+
+
+def test_event_stream_confirmations(publisher_account):
+    keeper = Keeper.get_instance()
+    spender = keeper.nft_access_condition.address
+    stream = EventStream(keeper.token.contract.events.Approval,
+                         {'owner': publisher_account.address, 'spender': spender},
+                         confirmations=2, history_size=8)
+    assert stream.poll() == []
+
+    assert keeper.token.token_approve(spender, 21, publisher_account)
+    stream_events = stream.poll()
+    assert _values(stream_events, EventStream.ADDED) == [21]
+    assert _values(stream_events, EventStream.CONFIRMED) == []
+
+    assert keeper.token.token_approve(spender, 22, publisher_account)
+    assert keeper.token.token_approve(spender, 23, publisher_account)
+    stream_events = stream.poll()
+    assert _values(stream_events, EventStream.ADDED) == [22, 23]
+    assert _values(stream_events, EventStream.CONFIRMED) == [21]
+    assert len(stream.headers) <= 8
+
+
+def test_event_stream_reorg(publisher_account):
+    keeper = Keeper.get_instance()
+    web3 = Web3Provider.get_web3()
+    spender = keeper.nft_access_condition.address
+    stream = EventStream(keeper.token.contract.events.Approval,
+                         {'owner': publisher_account.address, 'spender': spender},
+                         confirmations=3)
+    stream.poll()
+
+    snapshot_id = web3.manager.request_blocking('evm_snapshot', [])
+    assert keeper.token.token_approve(spender, 31, publisher_account)
+    assert _values(stream.poll(), EventStream.ADDED) == [31]
+
+    # replace the block with the approval by two empty ones
+    web3.manager.request_blocking('evm_revert', [snapshot_id])
+    web3.manager.request_blocking('evm_mine', [])
+    web3.manager.request_blocking('evm_mine', [])
+    stream_events = stream.poll()
+    assert _values(stream_events, EventStream.REMOVED) == [31]
+    assert _values(stream_events, EventStream.CONFIRMED) == []
@@ -0,0 +1,131 @@
+import time
+
+from web3 import Web3
+
+from contracts_lib_py.fee_oracle import (
+    FeeData,
+    FeeOracle,
+    FixedCapFeeStrategy,
+    MultiplierFeeStrategy,
+    PercentileFeeStrategy
+)
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from tests.resources.rpc_server import LocalRPCServer, RPCError
+
+GWEI = 10 ** 9
+
+
+def _fee_history(block_count, newest_block, percentiles, head=0x20):
+    return {
+        'oldestBlock': hex(head - int(block_count, 16) + 1),
+        'baseFeePerGas': [hex(10 * GWEI)] * int(block_count, 16) + [hex(12 * GWEI)],
+        'gasUsedRatio': [0.5] * int(block_count, 16),
+        'reward': [[hex(i * GWEI)] for i in range(1, int(block_count, 16) + 1)],
+    }
+
+
+def _rpc_methods(server):
+    return [post['method'] for post in server.posts]
+
+
+def test_fee_history_is_cached():
+    with LocalRPCServer({'eth_feeHistory': _fee_history}) as server:
+        oracle = FeeOracle(Web3(CustomHTTPProvider(server.url)), PercentileFeeStrategy(blocks=5))
+        fees = oracle.get_fees()
+        assert fees == {
+            'type': 2,
+            'maxPriorityFeePerGas': 3 * GWEI,
+            'maxFeePerGas': 2 * 12 * GWEI + 3 * GWEI,
+        }
+        assert oracle.get_fee_data().block_number == 0x20
+        for _ in range(5):
+            assert oracle.get_fees() == fees
+        assert _rpc_methods(server) == ['eth_feeHistory']
+
+        oracle.cache_ttl = 0
+        oracle.get_fees()
+        assert _rpc_methods(server) == ['eth_feeHistory', 'eth_feeHistory']
+
+
+def test_fallbacks():
+    pending_block = {'number': '0x21', 'baseFeePerGas': hex(10 * GWEI)}
+    handlers = {
+        'eth_getBlockByNumber': lambda block, full: pending_block,
+        'eth_maxPriorityFeePerGas': lambda: hex(2 * GWEI),
+        'eth_gasPrice': lambda: hex(5 * GWEI),
+        'eth_blockNumber': lambda: '0x20',
+    }
+    with LocalRPCServer(handlers) as server:
+        oracle = FeeOracle(Web3(CustomHTTPProvider(server.url)), cache_ttl=0)
+        assert oracle.get_fees() == {
+            'type': 2, 'maxPriorityFeePerGas': 2 * GWEI, 'maxFeePerGas': 22 * GWEI}
+        assert oracle.get_fee_data().block_number == 0x20
+        # eth_feeHistory is not tried again once the client rejected it
+        assert _rpc_methods(server).count('eth_feeHistory') == 1
+
+        # a pending block without base fee is a network without EIP-1559, it is not read again
+        pending_block.pop('baseFeePerGas')
+        assert oracle.get_fees() == {'gasPrice': 5 * GWEI}
+        server.posts.clear()
+        assert oracle.get_fees() == {'gasPrice': 5 * GWEI}
+        assert _rpc_methods(server) == ['eth_blockNumber', 'eth_gasPrice']
+
+
+def test_transient_errors_do_not_change_the_source():
+    failures = {'count': 1}
+
+    def fee_history(*args):
+        if failures['count']:
+            failures['count'] -= 1
+            raise RPCError(-32000, 'header not found')
+        return _fee_history(*args)
+
+    handlers = {
+        'eth_feeHistory': fee_history,
+        'eth_gasPrice': lambda: hex(5 * GWEI),
+        'eth_blockNumber': lambda: '0x20',
+    }
+    with LocalRPCServer(handlers) as server:
+        oracle = FeeOracle(Web3(CustomHTTPProvider(server.url)), cache_ttl=0)
+        # the pending block is not supported either, the gas price is used this time
+        assert oracle.get_fees() == {'gasPrice': 5 * GWEI}
+        assert oracle.get_fees()['type'] == 2
+        assert _rpc_methods(server).count('eth_feeHistory') == 2
+
+
+def test_background_refresh():
+    block_number = {'value': 0x20}
+    handlers = {
+        'eth_feeHistory': lambda *args: _fee_history(*args, head=block_number['value']),
+        'eth_blockNumber': lambda: hex(block_number['value']),
+    }
+    with LocalRPCServer(handlers) as server:
+        oracle = FeeOracle(Web3(CustomHTTPProvider(server.url)), cache_ttl=0)
+        oracle.start(poll_interval=0.05)
+        try:
+            time.sleep(0.3)
+            # the fee data is only read again when there is a new block
+            assert _rpc_methods(server).count('eth_feeHistory') == 1
+            oracle.get_fees()
+            assert _rpc_methods(server).count('eth_feeHistory') == 1
+
+            block_number['value'] = 0x21
+            time.sleep(0.3)
+            assert _rpc_methods(server).count('eth_feeHistory') == 2
+        finally:
+            oracle.stop()
+        assert not oracle.running
+
+
+def test_strategies():
+    fee_data = FeeData(1, 10 * GWEI, [1 * GWEI, 2 * GWEI, 30 * GWEI], None)
+    assert PercentileFeeStrategy(min_priority_fee=5 * GWEI).fees(fee_data) == {
+        'type': 2, 'maxPriorityFeePerGas': 5 * GWEI, 'maxFeePerGas': 25 * GWEI}
+    assert MultiplierFeeStrategy(multiplier=1.5).fees(fee_data) == {
+        'type': 2, 'maxPriorityFeePerGas': 3 * GWEI, 'maxFeePerGas': 33 * GWEI}
+    assert FixedCapFeeStrategy(15 * GWEI, 1 * GWEI).fees(fee_data) == {
+        'type': 2, 'maxPriorityFeePerGas': 1 * GWEI, 'maxFeePerGas': 15 * GWEI}
+
+    legacy_data = FeeData(1, None, None, 20 * GWEI)
+    assert MultiplierFeeStrategy(multiplier=1.5).fees(legacy_data) == {'gasPrice': 30 * GWEI}
+    assert FixedCapFeeStrategy(15 * GWEI).fees(legacy_data) == {'gasPrice': 15 * GWEI}
@@ -0,0 +1,69 @@
+import time
+
+from contracts_lib_py.gas_estimate_cache import GasEstimateCache
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.web3.contract import CustomContractFunction
+
+CONTRACT = '0x0000000000000000000000000000000000000001'
+SENDER = '0x0000000000000000000000000000000000000002'
+CALLDATA = '0x095ea7b3' + '00' * 64
+CHAIN_ID = 8996
+
+
+def _receipt(tx_hash, status, gas_used):
+    return {'transactionHash': tx_hash, 'status': status, 'gasUsed': gas_used}
+
+
+def test_make_key():
+    key = GasEstimateCache.make_key(CHAIN_ID, CONTRACT, CALLDATA, {'from': SENDER})
+    assert key == GasEstimateCache.make_key(
+        CHAIN_ID, CONTRACT, '0x095ea7b3' + '11' * 64, {'from': SENDER.lower()})
+    assert key != GasEstimateCache.make_key(
+        CHAIN_ID, CONTRACT, CALLDATA + '00' * 32, {'from': SENDER})
+    assert key != GasEstimateCache.make_key(CHAIN_ID, CONTRACT, CALLDATA, {'from': CONTRACT})
+    assert key != GasEstimateCache.make_key(
+        CHAIN_ID, CONTRACT, CALLDATA, {'from': SENDER, 'value': 1})
+    assert key != GasEstimateCache.make_key(CHAIN_ID + 1, CONTRACT, CALLDATA, {'from': SENDER})
+
+
+def test_cache_margin_and_expiration():
+    cache = GasEstimateCache(ttl=0.1, safety_margin=0.5)
+    key = GasEstimateCache.make_key(CHAIN_ID, CONTRACT, CALLDATA, {'from': SENDER})
+    assert cache.get(key) is None
+    cache.set(key, 100000)
+    assert cache.get(key) == 150000
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    time.sleep(0.15)
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+def test_out_of_gas_drops_estimate():
+    cache = GasEstimateCache()
+    key = GasEstimateCache.make_key(CHAIN_ID, CONTRACT, CALLDATA, {'from': SENDER})
+    cache.set(key, 100000)
+    gas = cache.get(key)
+
+    # a revert that did not use all the gas keeps the estimate
+    cache.track(b'\x01' * 32, key, gas)
+    assert not cache.report_receipt(_receipt(b'\x01' * 32, 0, gas // 2))
+    assert cache.get(key) == gas
+
+    cache.track(b'\x02' * 32, key, gas)
+    assert cache.report_receipt(_receipt(b'\x02' * 32, 0, gas))
+    assert cache.get(key) is None
+
+
+def test_transact_uses_cache(publisher_account):
+    keeper = Keeper.get_instance()
+    gas_cache = CustomContractFunction.enable_gas_estimate_cache()
+    try:
+        assert keeper.token.token_approve(keeper.lock_payment_condition.address, 1,
+                                          publisher_account)
+        assert gas_cache.stats()['misses'] == 1
+        assert keeper.token.token_approve(keeper.lock_payment_condition.address, 2,
+                                          publisher_account)
+        assert gas_cache.stats()['hits'] == 1
+    finally:
+        CustomContractFunction.disable_gas_estimate_cache()
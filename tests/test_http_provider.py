@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from contracts_lib_py.web3.retry import RetryBudget, RetryPolicy
+from tests.resources.rpc_server import LocalRPCServer
+
+
+def _handlers():
+    return {
+        'eth_blockNumber': lambda: '0x10',
+        'eth_getBalance': lambda address, block: address,
+    }
+
+
+def test_make_batch_request():
+    with LocalRPCServer(_handlers()) as server:
+        provider = CustomHTTPProvider(server.url)
+        responses = provider.make_batch_request([
+            ('eth_blockNumber', []),
+            ('eth_getBalance', ['0x01', 'latest']),
+            ('eth_unknown', []),
+        ])
+        assert len(server.posts) == 1
+        assert responses[0]['result'] == '0x10'
+        assert responses[1]['result'] == '0x01'
+        assert responses[2]['error']['code'] == -32601
+
+
+def test_batch_context():
+    with LocalRPCServer(_handlers()) as server:
+        provider = CustomHTTPProvider(server.url)
+        with provider.batch() as batch:
+            block = batch.add('eth_blockNumber', [])
+            balances = [batch.add('eth_getBalance', [hex(i), 'latest']) for i in range(5)]
+            failing = batch.add('eth_unknown')
+            assert not server.posts
+
+        assert len(server.posts) == 1
+        assert block.result() == '0x10'
+        assert [b.result() for b in balances] == [hex(i) for i in range(5)]
+        with pytest.raises(ValueError):
+            failing.result()
+
+
+def test_coalescing_window():
+    with LocalRPCServer(_handlers()) as server:
+        provider = CustomHTTPProvider(server.url, batch_window=0.2)
+        assert provider.batching_enabled
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda i: provider.make_request('eth_getBalance', [hex(i), 'latest']),
+                range(8)
+            ))
+
+        assert [r['result'] for r in results] == [hex(i) for i in range(8)]
+        assert len(server.posts) < 8
+
+        provider.disable_batching()
+        assert provider.make_request('eth_blockNumber', [])['result'] == '0x10'
+
+
+def _http_error(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.HTTPError(response=response)
+
+
+def test_retry_policy_separates_idempotent_methods():
+    policy = RetryPolicy(base_delay=0.01)
+    assert policy.get_retry_delay('eth_call', _http_error(503), 0) is not None
+    assert policy.get_retry_delay('eth_getLogs', requests.ConnectionError(), 0) is not None
+    assert policy.get_retry_delay(['eth_call', 'eth_getLogs'], _http_error(502), 0) is not None
+    assert policy.get_retry_delay('eth_call', _http_error(400), 0) is None
+    assert policy.get_retry_delay('eth_call', _http_error(503), policy.max_retries) is None
+
+    # transactions are only sent again when they were certainly not processed
+    assert policy.get_retry_delay('eth_sendRawTransaction', _http_error(503), 0) is None
+    assert policy.get_retry_delay('eth_sendRawTransaction', requests.ReadTimeout(), 0) is None
+    assert policy.get_retry_delay('eth_sendRawTransaction', _http_error(429), 0) is not None
+    assert policy.get_retry_delay(
+        ['eth_call', 'eth_sendRawTransaction'], requests.ConnectionError(), 0) is None
+
+
+def test_retry_policy_honors_retry_after():
+    policy = RetryPolicy(base_delay=0.01, max_delay=5)
+    assert policy.get_retry_delay('eth_call', _http_error(429, {'Retry-After': '2'}), 0) == 2
+    assert policy.get_retry_delay('eth_call', _http_error(429, {'Retry-After': '60'}), 0) is None
+
+
+def test_retry_budget_limits_retries():
+    policy = RetryPolicy(base_delay=0, budget=RetryBudget(
+        ratio=0.5, min_per_second=0, max_tokens=2))
+    assert policy.get_retry_delay('eth_call', _http_error(503), 0) is not None
+    assert policy.get_retry_delay('eth_call', _http_error(503), 0) is not None
+    assert policy.get_retry_delay('eth_call', _http_error(503), 0) is None
+    policy.budget.deposit()
+    policy.budget.deposit()
+    assert policy.get_retry_delay('eth_call', _http_error(503), 0) is not None
+
+
+def test_transient_errors_are_retried():
+    with LocalRPCServer(_handlers()) as server:
+        provider = CustomHTTPProvider(server.url, retry_policy=RetryPolicy(base_delay=0.01))
+        server.status_code = 503
+        server.failures = 2
+        assert provider.make_request('eth_blockNumber', [])['result'] == '0x10'
+        assert len(server.posts) == 3
+
+        server.posts.clear()
+        server.failures = 1
+        with pytest.raises(requests.HTTPError):
+            provider.make_request('eth_sendRawTransaction', ['0x01'])
+        assert len(server.posts) == 1
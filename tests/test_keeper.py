@@ -6,8 +6,12 @@ from web3 import Web3
 from contracts_lib_py import Keeper
 from contracts_lib_py.contract_handler import ContractHandler
 from contracts_lib_py.utils import prepare_prefixed_hash, add_ethereum_prefix_and_hash_msg
+from contracts_lib_py.web3_provider import Web3Provider
 from tests.resources.helper_functions import get_publisher_account, get_resource_path
 
+# the Keeper helpers are combomethods, pylint does not know they can be called on the class
+# pylint: disable=no-value-for-parameter
+
 
 def test_keeper_instance():
     keeper = Keeper(ContractHandler.artifacts_path)
@@ -15,6 +19,20 @@ def test_keeper_instance():
     assert isinstance(keeper.get_instance(), Keeper)
 
 
+def test_contracts_are_loaded_lazily():
+    keeper = Keeper.get_instance()
+    assert 'did_registry' not in keeper.__dict__
+    did_registry = keeper.did_registry
+    assert keeper.did_registry is did_registry
+    assert 'agreement_manager' not in keeper.__dict__
+
+    assert keeper.preload() is keeper
+    assert keeper.contract_name_to_instance['DIDRegistry'] is did_registry
+    assert keeper.agreement_manager.templates[keeper.access_template.address] is \
+        keeper.access_template
+    assert keeper.get_contract('AccessCondition') is keeper.access_condition
+
+
 def test_ec_recover():
     test_values = [
         ('0xe2DD09d719Da89e5a3D0F2549c7E24566e947260',
@@ -51,6 +69,11 @@ def test_get_network_id():
     assert network_id in Keeper._network_name_map
 
 
+def test_get_network_id_of_instance():
+    keeper = Keeper.get_instance()
+    assert keeper.get_network_id() == Web3Provider.get_network_id(keeper.web3)
+
+
 def test_get_network_name():
     name = Keeper.get_network_name(Keeper.get_network_id())
     assert name in Keeper._network_name_map.values()
@@ -0,0 +1,51 @@
+import uuid
+
+from web3 import Web3
+
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.multicall import Multicall
+from contracts_lib_py.web3_provider import Web3Provider
+
+
+def _random_ids(n):
+    return [Web3.keccak(text=uuid.uuid4().hex).hex() for _ in range(n)]
+
+
+def test_get_condition_states():
+    keeper = Keeper.get_instance()
+    condition_ids = _random_ids(5)
+    states = keeper.condition_manager.get_condition_states(condition_ids)
+    assert states == [keeper.condition_manager.get_condition_state(_id) for _id in condition_ids]
+
+
+def test_get_token_balances(publisher_account, consumer_account):
+    keeper = Keeper.get_instance()
+    addresses = [publisher_account.address, consumer_account.address]
+    assert keeper.token.get_token_balances(addresses) == [
+        keeper.token.get_token_balance(address) for address in addresses
+    ]
+
+
+def test_keeper_multicall(publisher_account):
+    keeper = Keeper.get_instance()
+    results = keeper.multicall([
+        keeper.token.contract.functions.balanceOf(publisher_account.address),
+        keeper.token.contract.functions.totalSupply(),
+        keeper.condition_manager.contract.functions.getConditionListSize(),
+    ])
+    assert results == [
+        keeper.token.get_token_balance(publisher_account.address),
+        keeper.token.total_supply(),
+        keeper.condition_manager.get_num_condition(),
+    ]
+
+
+def test_multicall_fallback_without_contract():
+    keeper = Keeper.get_instance()
+    multicall = Multicall(Web3Provider.get_web3())
+    multicall._checked = True
+    assert multicall.address is None
+    calls = [keeper.condition_manager.contract.functions.getConditionState(_id)
+             for _id in _random_ids(3)]
+    assert multicall.call(calls) == [call.call() for call in calls]
+    assert multicall.call([]) == []
@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from contracts_lib_py.nonce_manager import NonceManager
+from contracts_lib_py.wallet import Wallet
+from contracts_lib_py.web3.contract import _send_raw_transaction
+from contracts_lib_py.web3_provider import Web3Provider
+
+ADDRESS = '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'
+
+
+class _Web3:
+    """Web3 stand-in with the transaction count of every address on a chain."""
+
+    def __init__(self, chain_id, transaction_count, **eth):
+        self.provider = None
+        self.net = SimpleNamespace(version=str(chain_id))
+        self.eth = SimpleNamespace(chain_id=chain_id,
+                                   get_transaction_count=lambda *args: transaction_count, **eth)
+
+
+def test_next_nonce_is_sequential(publisher_account):
+    web3 = Web3Provider.get_web3()
+    address = publisher_account.address
+    chain_nonce = web3.eth.get_transaction_count(address, 'pending')
+    nonce_manager = NonceManager()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        nonces = list(executor.map(lambda _: nonce_manager.next_nonce(web3, address), range(20)))
+
+    assert sorted(nonces) == list(range(chain_nonce, chain_nonce + 20))
+    assert nonce_manager.pending_nonces(web3, address) == sorted(nonces)
+
+
+def test_release_and_gaps(publisher_account):
+    web3 = Web3Provider.get_web3()
+    address = publisher_account.address
+    chain_nonce = web3.eth.get_transaction_count(address, 'pending')
+    nonce_manager = NonceManager()
+
+    first = nonce_manager.next_nonce(web3, address)
+    second = nonce_manager.next_nonce(web3, address)
+    third = nonce_manager.next_nonce(web3, address)
+    assert (first, second, third) == (chain_nonce, chain_nonce + 1, chain_nonce + 2)
+
+    # releasing the last nonce just moves the counter back
+    nonce_manager.release(web3, address, third)
+    assert nonce_manager.next_nonce(web3, address) == third
+
+    # releasing a nonce in the middle is reused by the next allocation
+    nonce_manager.release(web3, address, second)
+    assert chain_nonce in nonce_manager.find_gaps(web3, address)
+    assert nonce_manager.next_nonce(web3, address) == second
+
+    nonce_manager.confirm(web3, address, first)
+    assert first not in nonce_manager.pending_nonces(web3, address)
+
+    assert nonce_manager.resync(web3, address) == chain_nonce
+    assert nonce_manager.next_nonce(web3, address) == chain_nonce
+    assert nonce_manager.find_gaps(web3, address) == [chain_nonce]
+
+
+def test_is_nonce_error():
+    assert NonceManager.is_nonce_error(ValueError({'code': -32000, 'message': 'nonce too low'}))
+    assert NonceManager.is_nonce_error(ValueError('replacement transaction underpriced'))
+    assert not NonceManager.is_nonce_error(ValueError('execution reverted'))
+    assert not NonceManager.is_nonce_error(ValueError('already known'))
+
+
+def test_is_known_transaction_error():
+    assert NonceManager.is_known_transaction_error(ValueError('already known'))
+    assert NonceManager.is_known_transaction_error(
+        ValueError({'code': -32000, 'message': 'known transaction: 0x1234'}))
+    assert not NonceManager.is_known_transaction_error(ValueError('nonce too low'))
+
+
+def test_report_receipt_confirms_nonces():
+    address = ADDRESS
+    web3 = _Web3(8996, 7)
+    nonce_manager = NonceManager()
+    nonces = [nonce_manager.next_nonce(web3, address) for _ in range(3)]
+    tx_hash = '0x' + '22' * 32
+    nonce_manager.track(web3, address, nonces[1], tx_hash)
+
+    assert not nonce_manager.report_receipt({'transactionHash': '0x' + '33' * 32})
+    assert nonce_manager.report_receipt({'transactionHash': tx_hash})
+    # the receipt of nonce 8 means nonce 7 is not pending anymore either
+    assert nonce_manager.pending_nonces(web3, address) == [9]
+    assert not nonce_manager.report_receipt({'transactionHash': tx_hash})
+
+
+def test_nonces_are_kept_per_chain():
+    nonce_manager = NonceManager()
+    web3_a, web3_b = _Web3(1001, 5), _Web3(1002, 40)
+    assert [nonce_manager.next_nonce(web3_a, ADDRESS) for _ in range(2)] == [5, 6]
+    assert nonce_manager.next_nonce(web3_b, ADDRESS.lower()) == 40
+
+    nonce_manager.release(web3_b, ADDRESS, 40)
+    assert nonce_manager.pending_nonces(web3_a, ADDRESS) == [5, 6]
+    assert nonce_manager.pending_nonces(web3_b, ADDRESS) == []
+    nonce_manager.reset(web3_a, ADDRESS)
+    assert nonce_manager.next_nonce(web3_a, ADDRESS) == 5
+    assert nonce_manager.next_nonce(web3_b, ADDRESS) == 40
+
+
+def test_failed_broadcast_releases_nonce(monkeypatch):
+    address = ADDRESS
+    nonce_manager = NonceManager()
+    monkeypatch.setattr(Wallet, 'nonce_manager', nonce_manager)
+
+    def send_raw_transaction(raw_tx):
+        raise ValueError({'code': -32000, 'message': 'insufficient funds for gas * price + value'})
+
+    web3 = _Web3(8996, 3, sendRawTransaction=send_raw_transaction)
+
+    def sign_tx(tx):
+        tx['nonce'] = nonce_manager.next_nonce(web3, address)
+        return b'\x01'
+
+    wallet = SimpleNamespace(address=address, sign_tx=sign_tx)
+    with pytest.raises(ValueError):
+        _send_raw_transaction(web3, wallet, {'from': address}, 'approve')
+    assert nonce_manager.pending_nonces(web3, address) == []
+    assert nonce_manager.next_nonce(web3, address) == 3
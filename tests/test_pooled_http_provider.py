@@ -0,0 +1,91 @@
+import time
+
+from contracts_lib_py.web3.pooled_http_provider import PooledHTTPProvider
+from tests.resources.rpc_server import LocalRPCServer
+
+
+def _handlers(name):
+    return {
+        'eth_blockNumber': lambda: name,
+        'eth_sendRawTransaction': lambda data: name,
+        'eth_getTransactionCount': lambda address, block: name,
+    }
+
+
+def _methods(server):
+    return [post['method'] for post in server.posts]
+
+
+def test_reads_fail_over_to_healthy_endpoints():
+    with LocalRPCServer(_handlers('a')) as a, LocalRPCServer(_handlers('b')) as b:
+        a.status_code = 500
+        provider = PooledHTTPProvider([a.url, b.url], hedge=False, max_consecutive_errors=2)
+        for _ in range(4):
+            assert provider.make_request('eth_blockNumber', [])['result'] == 'b'
+
+        stats = {s['endpoint_uri']: s for s in provider.get_stats()}
+        assert not stats[a.url]['healthy']
+        assert stats[b.url]['healthy']
+        # the failing endpoint is skipped once marked down
+        assert len(a.posts) == 2
+        assert len(b.posts) == 4
+
+
+def test_reads_go_to_the_fastest_endpoint():
+    with LocalRPCServer(_handlers('a')) as a, LocalRPCServer(_handlers('b')) as b:
+        a.delay = 0.05
+        provider = PooledHTTPProvider([a.url, b.url], hedge=False)
+        for _ in range(6):
+            provider.make_request('eth_blockNumber', [])
+        assert provider.make_request('eth_blockNumber', [])['result'] == 'b'
+        assert len(a.posts) == 1
+
+
+def test_slow_reads_are_hedged():
+    with LocalRPCServer(_handlers('a')) as a, LocalRPCServer(_handlers('b')) as b:
+        provider = PooledHTTPProvider([a.url, b.url], hedge_delay=0.1)
+        # measure both endpoints, then slow down the fastest one
+        provider.make_request('eth_blockNumber', [])
+        provider.make_request('eth_blockNumber', [])
+        fastest, other = provider._rank_endpoints()
+        server = a if fastest.endpoint_uri == a.url else b
+        server.delay = 1
+
+        start = time.perf_counter()
+        response = provider.make_request('eth_blockNumber', [])
+        assert time.perf_counter() - start < 0.8
+        assert response['result'] == ('b' if server is a else 'a')
+        assert provider.hedged_requests == 1
+
+
+def test_transactions_are_pinned_to_the_primary():
+    with LocalRPCServer(_handlers('a')) as a, LocalRPCServer(_handlers('b')) as b:
+        a.delay = 0.05
+        provider = PooledHTTPProvider([a.url, b.url], primary_uri=a.url, hedge=False)
+        for _ in range(3):
+            provider.make_request('eth_blockNumber', [])
+            assert provider.make_request('eth_sendRawTransaction', ['0x01'])['result'] == 'a'
+            assert provider.make_request(
+                'eth_getTransactionCount', ['0x' + '01' * 20, 'pending'])['result'] == 'a'
+        assert _methods(a).count('eth_sendRawTransaction') == 3
+        assert 'eth_sendRawTransaction' not in _methods(b)
+        assert 'eth_getTransactionCount' not in _methods(b)
+
+
+def test_reads_after_a_transaction_go_to_the_primary():
+    with LocalRPCServer(_handlers('a')) as a, LocalRPCServer(_handlers('b')) as b:
+        a.delay = 0.05
+        provider = PooledHTTPProvider([a.url, b.url], primary_uri=a.url, hedge=False,
+                                      read_your_writes=0.5)
+        for _ in range(3):
+            provider.make_request('eth_blockNumber', [])
+        assert provider.make_request('eth_blockNumber', [])['result'] == 'b'
+
+        # the receipts are only known by the primary right after the transaction is sent
+        provider.make_request('eth_getTransactionReceipt', ['0x' + '22' * 32])
+        assert 'eth_getTransactionReceipt' not in _methods(b)
+
+        provider.make_request('eth_sendRawTransaction', ['0x01'])
+        assert provider.make_request('eth_blockNumber', [])['result'] == 'a'
+        time.sleep(0.6)
+        assert provider.make_request('eth_blockNumber', [])['result'] == 'b'
@@ -0,0 +1,98 @@
+import json
+from types import SimpleNamespace
+
+from eth_account import Account
+from web3 import Web3
+
+from contracts_lib_py import ContractBase
+from contracts_lib_py.profiler import Profile
+from contracts_lib_py.wallet import Wallet
+from contracts_lib_py.web3 import rpc_metrics
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from tests.resources.rpc_server import LocalRPCServer
+
+ADDRESS = Web3.toChecksumAddress('0x00bd138abd70e2f00903268f3db08f2d25677c9e')
+ABI = [{'type': 'function', 'name': 'value', 'stateMutability': 'view', 'inputs': [],
+        'outputs': [{'name': '', 'type': 'uint256'}]}]
+
+
+class Counter(ContractBase):
+
+    def get_value(self):
+        return self.contract.caller.value()
+
+    def get_values(self, count):
+        return [self.get_value() for _ in range(count)]
+
+    def sign(self, key_file, password):
+        return Wallet(self.web3, key_file, password).sign(b'\x01' * 32)
+
+
+def _counter(url):
+    web3 = Web3(CustomHTTPProvider(url))
+    contract = web3.eth.contract(address=ADDRESS, abi=ABI)
+    handler = SimpleNamespace(get=lambda name: contract,
+                              get_contract_version=lambda name: 'v2.0.0')
+    return Counter('Counter', {'ContractHandler': handler})
+
+
+def _eth_call(transaction, block):
+    return '0x' + (7).to_bytes(32, 'big').hex()
+
+
+def test_methods_are_profiled():
+    with LocalRPCServer({'eth_call': _eth_call}) as server:
+        counter = _counter(server.url)
+        get_value = Counter.get_value
+        with Profile() as p:
+            assert counter.get_values(3) == [7, 7, 7]
+        # the methods are only wrapped within the block
+        assert Counter.get_value is get_value
+        assert rpc_metrics.hooks == ()
+
+    by_method = {item['method']: item for item in p.snapshot()}
+    get_values = by_method['Counter.get_values']
+    assert get_values['calls'] == 1
+    assert get_values['rpc_count'] == 3
+    assert get_values['rpc_methods'] == {'eth_call': 3}
+    assert get_values['request_bytes'] > 0 and get_values['response_bytes'] > 0
+    assert 0 < get_values['io'] <= get_values['wall']
+    assert get_values['decode'] > 0
+
+    assert by_method['Counter.get_value']['calls'] == 3
+    assert by_method['Counter.get_value']['rpc_count'] == 3
+    assert p.total.rpc_count == 3
+    assert 'Counter.get_values' in p.report()
+
+    stacks = dict(line.rsplit(' ', 1) for line in p.to_folded().splitlines())
+    assert set(stacks) == {'Counter.get_values', 'Counter.get_values;Counter.get_value'}
+
+
+def test_signing_time_is_profiled(tmp_path):
+    # create and encrypt are combomethods, called on an instance for pylint
+    account = Account()
+    key_file = tmp_path / 'key.json'
+    key_file.write_text(json.dumps(
+        account.encrypt(account.create().key, 'secret', kdf='pbkdf2', iterations=10)))
+    counter = _counter('http://127.0.0.1:1')
+
+    with Profile(cprofile=True) as p:
+        counter.sign(str(key_file), 'secret')
+
+    sign = p.snapshot()[0]
+    assert sign['method'] == 'Counter.sign'
+    assert sign['rpc_count'] == 0
+    assert 0 < sign['sign'] <= sign['wall']
+    p.dump_stats(str(tmp_path / 'sign.prof'))
+    assert (tmp_path / 'sign.prof').exists()
+    assert p.stats.total_calls > 0
+
+
+def test_calls_outside_the_block_are_not_profiled():
+    with LocalRPCServer({'eth_call': _eth_call}) as server:
+        counter = _counter(server.url)
+        with Profile() as p:
+            pass
+        counter.get_value()
+    assert p.snapshot() == []
+    assert p.total.rpc_count == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from contracts_lib_py.exceptions import TransactionReverted, TransactionTimeout
+from contracts_lib_py.keeper import Keeper
+from contracts_lib_py.tx_pipeline import TransactionPipeline
+from contracts_lib_py.web3_provider import Web3Provider
+
+
+def _transact(account, **kwargs):
+    return dict({'from': account.address,
+                 'passphrase': account.password,
+                 'keyfile': account.key_file}, **kwargs)
+
+
+def test_submit_transactions(publisher_account):
+    keeper = Keeper.get_instance()
+    spender = keeper.lock_payment_condition.address
+    futures = [
+        keeper.token.submit_transaction('approve', (spender, amount), _transact(publisher_account))
+        for amount in range(1, 6)
+    ]
+    receipts = [future.result(timeout=60) for future in futures]
+    assert all(receipt.status == 1 for receipt in receipts)
+    assert keeper.token.get_allowance(publisher_account.address, spender) == 5
+
+
+def test_reverted_transaction(publisher_account, consumer_account):
+    keeper = Keeper.get_instance()
+    balance = keeper.token.get_token_balance(publisher_account.address)
+    future = keeper.token.submit_transaction(
+        'transfer',
+        (consumer_account.address, balance + 1),
+        _transact(publisher_account, gas=200000)
+    )
+    with pytest.raises(TransactionReverted) as e:
+        future.result(timeout=60)
+    assert e.value.receipt.status == 0
+
+
+def test_timeout():
+    pipeline = TransactionPipeline(Web3Provider.get_web3(), poll_interval=0.1)
+    future = pipeline.track('0x' + '11' * 32, timeout=0.3)
+    with pytest.raises(TransactionTimeout):
+        future.result(timeout=10)
+    assert pipeline.pending_count == 0
@@ -1,6 +1,7 @@
 from web3 import Web3
 
-from contracts_lib_py.utils import split_signature
+from contracts_lib_py.utils import (generate_multi_value_hash, generate_multi_value_hashes,
+                                    split_signature)
 
 
 def test_split_signature():
@@ -15,3 +16,16 @@ def test_split_signature():
                                 b'\xf6f\xe7\xab\xea\x982Ds\x0bX\xd9\x94\xa42'
 
 
+def test_generate_multi_value_hashes():
+    types = ['bytes32', 'address', 'uint256', 'bool', 'int16', 'string', 'bytes', 'uint8[]',
+             'address[]', 'int8[]', 'bytes32[]']
+    rows = [
+        ['0x' + '01' * 32, '0x068Ed00cF0441e4829D9784fCBe7b9e26D4BD8d0', 2 ** 255, True, -2,
+         'did:nv:1', b'\x01\x02', [1, 255], ['0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'],
+         [-1, 127], [b'\x02' * 32]],
+        [b'\x03' * 32, '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e', 0, False, 300, '', b'', [],
+         [], [], []],
+    ]
+    assert generate_multi_value_hashes(types, rows) == \
+        [generate_multi_value_hash(types, values) for values in rows]
+    assert generate_multi_value_hashes(types, []) == []
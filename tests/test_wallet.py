@@ -1,10 +1,12 @@
-from contracts_lib_py.wallet import Wallet
+import json
+
+from contracts_lib_py.wallet import KeyCache, Wallet
 from contracts_lib_py.web3_provider import Web3Provider
 from tests.resources.helper_functions import get_publisher_account
 import pytest
 
 
-@pytest.mark.skip(reason="Skip while we are not using the get nonce method when signing txs.")
+@pytest.mark.skip(reason="The signed tx depends on the fee values of the network.")
 def test_sign_tx():
     # account_address = '0x00Bd138aBD70e2F00903268F3Db08f2D25677C9e'
     account = get_publisher_account()
@@ -27,11 +29,65 @@ def test_sign_tx():
         'nonce': 730,
         'gasPrice': 1000000000
     }
-    Wallet._last_tx_count[account.address] = tx_dict['nonce'] - 1
-
     tx_hash = (
         '0xf901aa7d843b9aca008302575894c354ba9ad5df1023c2640b14a09e61a500f2154680b90144534eb706ff3b98759dc7421dad1f42c4fbc00ceab99e4d849f884fa680398c8e65bcaf1a3f4b0356b3399ae841a2c6fce00787cf27dcf08e3b3e65065fea2498e621848f000000000000000000000000000000000000000000000000000000000000008000000000000000000000000000000000000000000000000000000000000000a000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000078687474703a2f2f6c6f63616c686f73743a353030302f6170692f76312f61717561726975732f6173736574732f64646f2f6469643a6f703a6666336239383735396463373432316461643166343263346662633030636561623939653464383439663838346661363830333938633865363562636166316100000000000000001ba07ff531911521dd7aab8ea4a96d219033f3b80447cdf5f94a930f10806dd1f8dca006ce5047b2f91a5d895ee0680e7da9168dc8f94899f2263ef26586028613342c'
     )
 
     signed_tx = wallet.sign_tx(tx_dict)
     assert signed_tx.hex() == tx_hash
+
+
+def test_key_cache(tmp_path):
+    web3 = Web3Provider.get_web3()
+    local_account = web3.eth.account.create()
+    key_file = tmp_path / 'key_file.json'
+    key_file.write_text(json.dumps(local_account.encrypt('secret')))
+    msg_hash = web3.keccak(text='key cache')
+
+    cache = Wallet.enable_key_cache(ttl=60)
+    try:
+        wallet = Wallet(web3, str(key_file), 'secret', address=local_account.address)
+        assert wallet.validate()
+        assert cache.stats() == {'hits': 0, 'misses': 1, 'size': 1}
+
+        signature = wallet.sign(msg_hash)
+        assert cache.stats()['hits'] == 1
+        assert web3.eth.account.recoverHash(msg_hash, signature=signature.signature) == \
+            local_account.address
+
+        # a different password is a different entry
+        with pytest.raises(ValueError):
+            Wallet(web3, str(key_file), 'wrong-password').validate()
+        assert cache.stats()['size'] == 1
+
+        cached_key = next(iter(cache._entries.values()))[0]
+        cache.evict(str(key_file))
+        assert len(cache) == 0
+        assert cached_key == bytearray(len(cached_key))
+
+        wallet.sign(msg_hash)
+        assert cache.stats() == {'hits': 1, 'misses': 3, 'size': 1}
+    finally:
+        Wallet.disable_key_cache()
+
+    assert Wallet.key_cache is None
+    assert len(cache) == 0
+
+
+def test_key_cache_expiration(tmp_path):
+    web3 = Web3Provider.get_web3()
+    local_account = web3.eth.account.create()
+    key_file = tmp_path / 'key_file.json'
+    key_file.write_text(json.dumps(local_account.encrypt('secret')))
+
+    cache = KeyCache(ttl=0)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return local_account.key
+
+    assert cache.get(str(key_file), 'secret', loader) == local_account.key
+    assert cache.get(str(key_file), 'secret', loader) == local_account.key
+    assert len(loads) == 2
+    assert cache.stats()['hits'] == 0
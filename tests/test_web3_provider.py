@@ -0,0 +1,73 @@
+import pytest
+from web3 import Web3
+
+from contracts_lib_py import Keeper
+from contracts_lib_py.exceptions import ChainIdMismatch
+from contracts_lib_py.web3.http_provider import CustomHTTPProvider
+from contracts_lib_py.web3_provider import Web3Provider
+from tests.resources.rpc_server import LocalRPCServer
+
+
+@pytest.fixture
+def rpc_web3():
+    web3 = Web3Provider.get_web3()
+    yield
+    Web3Provider.set_web3(web3)
+
+
+def _methods(server):
+    return [post['method'] for post in server.posts]
+
+
+def test_chain_identity_is_cached(rpc_web3):
+    handlers = {
+        'net_version': lambda: '80001',
+        'eth_chainId': lambda: hex(80001),
+    }
+    with LocalRPCServer(handlers) as server:
+        web3 = Web3(CustomHTTPProvider(server.url))
+        Web3Provider.set_web3(web3)
+        keeper = Keeper.get_instance(web3=web3)
+        assert keeper.get_network_id() == 80001
+        assert keeper.get_network_id() == 80001
+        assert Web3Provider.get_chain_id() == 80001
+        assert _methods(server) == ['net_version', 'eth_chainId']
+
+        # switching the provider reads the identity again
+        web3.provider = CustomHTTPProvider(server.url)
+        assert Web3Provider.get_network_id(web3) == 80001
+        assert _methods(server) == ['net_version', 'eth_chainId'] * 2
+
+        # and so does pointing the provider to another endpoint
+        web3.provider.endpoint_uri = server.url + '/'
+        assert Web3Provider.get_network_id(web3) == 80001
+        assert _methods(server) == ['net_version', 'eth_chainId'] * 3
+
+
+def test_chain_id_defaults_to_network_id(rpc_web3):
+    with LocalRPCServer({'net_version': lambda: '8996'}) as server:
+        Web3Provider.set_web3(Web3(CustomHTTPProvider(server.url)))
+        assert Web3Provider.get_chain_id() == 8996
+        assert Web3Provider.get_network_id() == 8996
+
+
+def test_chain_id_is_verified_before_signing(rpc_web3):
+    chain = {'id': 80001}
+    handlers = {
+        'net_version': lambda: str(chain['id']),
+        'eth_chainId': lambda: hex(chain['id']),
+    }
+    with LocalRPCServer(handlers) as server:
+        web3 = Web3(CustomHTTPProvider(server.url))
+        assert Web3Provider.get_chain_id(web3) == 80001
+        assert Web3Provider.get_chain_id(web3, verify=True) == 80001
+        assert Web3Provider.get_chain_id(web3, verify=True) == 80001
+        assert _methods(server) == ['net_version', 'eth_chainId', 'eth_chainId']
+
+        # the node behind the endpoint changed chain after the id was cached
+        web3 = Web3(CustomHTTPProvider(server.url))
+        assert Web3Provider.get_chain_id(web3) == 80001
+        chain['id'] = 137
+        with pytest.raises(ChainIdMismatch):
+            Web3Provider.get_chain_id(web3, verify=True)
+        assert Web3Provider.get_chain_id(web3, verify=True) == 137